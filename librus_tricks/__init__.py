@@ -2,6 +2,7 @@ from librus_tricks import exceptions
 from librus_tricks.auth import authorizer, load_json as __load_json
 from librus_tricks.classes import *
 from librus_tricks.core import SynergiaClient
+from librus_tricks.pool import SessionPool
 
 __name__ = 'librus_tricks'
 __title__ = 'librus_tricks'
@@ -9,26 +10,27 @@ __author__ = 'Backdoorek'
 __version__ = '0.8.0'
 
 
-def create_session(email, password, fetch_first=True, pickle=False, **kwargs):
+def create_session(email, password, fetch_first=True, pickle=False, transport=None, **kwargs):
     """
     Używaj tego tylko kiedy hasło do Portal Librus jest takie samo jako do Synergii.
 
     :param email: str
     :param password: str
     :param fetch_first: bool or int
+    :param librus_tricks.transport.SynergiaTransport transport: Pula połączeń http współdzielona przez sesje
     :rtype: librus_tricks.core.SynergiaClient
     :return: obiekt lub listę obiektów z sesjami
     """
     if fetch_first is True:
-        user = authorizer(email, password)[0]
-        session = SynergiaClient(user, **kwargs)
+        user = authorizer(email, password, transport=transport)[0]
+        session = SynergiaClient(user, transport=transport, **kwargs)
     elif fetch_first is False:
-        users = authorizer(email, password)
-        sessions = [SynergiaClient(user, **kwargs) for user in users]
+        users = authorizer(email, password, transport=transport)
+        sessions = [SynergiaClient(user, transport=transport, **kwargs) for user in users]
         return sessions
     else:
-        user = authorizer(email, password)[fetch_first]
-        session = SynergiaClient(user, **kwargs)
+        user = authorizer(email, password, transport=transport)[fetch_first]
+        session = SynergiaClient(user, transport=transport, **kwargs)
 
     if pickle:
         user.pickle_credentials()
@@ -46,7 +48,7 @@ def use_json(file=None, **kwargs):
         if jsons.__len__() > 1:
             raise FileExistsError('Zaleziono za dużo zapisanych sesji')
 
-        user = __load_json(open(jsons[0], 'r'))
+        user = __load_json(open(jsons[0], 'r', encoding='utf-8'))
     else:
         user = __load_json(file)
     session = SynergiaClient(user, **kwargs)
@@ -0,0 +1,523 @@
+import asyncio
+import functools
+import logging
+import time
+from datetime import timedelta
+
+import httpx
+
+from librus_tricks import cache as cache_lib
+from librus_tricks import codec as codec_lib
+from librus_tricks import exceptions, tools
+from librus_tricks.classes import *
+from librus_tricks.core import SynergiaClient
+
+
+class AsyncSynergiaClient:
+    """Asynchroniczna sesja z API Synergii"""
+
+    is_async = True
+
+    def __init__(self, user, api_url='https://api.librus.pl/2.0', user_agent='LibrusMobileApp',
+                 cache=None, identity_map_size=4096, http_client=None, max_concurrency=10,
+                 codec=None, stats=None, negative_cache_ttl=timedelta(minutes=5)):
+        """
+        Tworzy asynchroniczną sesję z API Synergii.
+
+        :param librus_tricks.auth.SynergiaUser user: Użytkownik sesji
+        :param str api_url: Bazowy url api
+        :param str user_agent: User-agent klienta http
+        :param librus_tricks.cache.CacheBase cache: Obiekt, który zarządza cache, domyślnie nowy
+            :class:`librus_tricks.cache.AlchemyCache` w pamięci. Wywołania cache są wykonywane w puli wątków, więc
+            nie blokują pętli zdarzeń
+        :param int identity_map_size: Maksymalna liczba złożonych obiektów trzymanych w pamięci sesji
+        :param httpx.AsyncClient http_client: Klient http, może być współdzielony przez wiele sesji
+        :param int max_concurrency: Maksymalna liczba równoległych zapytań http tej sesji
+        :param librus_tricks.codec.JSONCodec codec: Koder json odpowiedzi
+        :param librus_tricks.cache.CacheStats stats: Statystyki cache i zapytań http, domyślnie osobne dla sesji
+        :param timedelta negative_cache_ttl: Jak długo pamiętać odpowiedzi 404 i 403, None wyłącza
+        """
+        self.user = user
+        self.__own_http_client = http_client is None
+        if http_client is None:
+            http_client = httpx.AsyncClient(timeout=30)
+        self.session = http_client
+
+        self.__headers = {'User-Agent': user_agent, 'Authorization': f'Bearer {user.token}'}
+        self.__api_url = api_url
+        self.__semaphore = asyncio.Semaphore(max_concurrency)
+        self.stats = cache_lib.CacheStats() if stats is None else stats
+        self.negative_cache_ttl = negative_cache_ttl
+
+        if cache is None:
+            cache = cache_lib.AlchemyCache()
+        if cache_lib.CacheBase in cache.__class__.__bases__:
+            self.cache = cache
+        else:
+            raise exceptions.InvalidCacheManager(f'{cache} can not be a cache object!')
+
+        self.identity_map = cache_lib.ObjectIdentityMap(identity_map_size)
+        self.__in_flight = dict()
+        self.codec = codec_lib.get_default_codec() if codec is None else codec
+
+    def __repr__(self):
+        return f'<Async Synergia session for {self.user}>'
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def close(self):
+        """
+        Zamyka klienta http, o ile nie został przekazany z zewnątrz.
+        """
+        if self.__own_http_client:
+            await self.session.aclose()
+
+    @staticmethod
+    async def __blocking(function, *args, **kwargs):
+        """
+        Wykonuje synchroniczne wywołanie (cache w SQLAlchemy lub Redis) w puli wątków, żeby nie blokować pętli
+        zdarzeń.
+        """
+        return await asyncio.get_running_loop().run_in_executor(None, functools.partial(function, *args, **kwargs))
+
+    assembly_path = staticmethod(SynergiaClient.assembly_path)
+    cache_objects = SynergiaClient.cache_objects
+    known_objects = SynergiaClient.known_objects
+
+    # HTTP part
+
+    async def dispatch_http_code(self, response: httpx.Response, callback=None, callback_args=tuple(),
+                                 callback_kwargs=None):
+        """
+        Sprawdza czy serwer zgłasza błąd poprzez podanie kodu http, w przypadku błędu, rzuca wyjątkiem.
+
+        :param httpx.Response response:
+        :rtype: dict
+        :return: sprawdzona odpowiedź http
+        """
+        if callback_kwargs is None:
+            callback_kwargs = dict()
+
+        if response.status_code >= 400:
+            payload = SynergiaClient.error_payload(self.codec, response.content)
+        else:
+            payload = self.codec.loads(response.content)
+        if payload.get('Code') == 'TokenIsExpired':
+            logging.info('Server returned error code "TokenIsExpired", trying to obtain new token')
+            await asyncio.get_running_loop().run_in_executor(None, self.user.revalidate_user)
+            self.__headers['Authorization'] = f'Bearer {self.user.token}'
+            return await callback(*callback_args, **callback_kwargs)
+
+        if response.status_code >= 400:
+            raise SynergiaClient.http_error(response.status_code, response.url, payload)
+
+        return payload
+
+    async def get(self, *path, request_params=None):
+        """
+        Wykonuje odpowiednio spreparowane zapytanie http GET.
+
+        :param path: Ścieżka zawierająca węzeł API
+        :param dict request_params: dict zawierający parametry zapytania http
+        :return: json przekonwertowany na dict'a
+        :rtype: dict
+        """
+        if request_params is None:
+            request_params = dict()
+        path_str = self.assembly_path(*path, prefix=self.__api_url)
+        async with self.__semaphore:
+            started = time.perf_counter()
+            response = await self.session.get(path_str, headers=self.__headers, params=request_params)
+        self.stats.observe_fetch(cache_lib.endpoint_name(path), time.perf_counter() - started,
+                                 response.content.__len__())
+
+        return await self.dispatch_http_code(response, callback=self.get, callback_args=path,
+                                             callback_kwargs={'request_params': request_params})
+
+    async def post(self, *path, request_params=None):
+        """
+        Pozwala na dokonanie zapytania http POST.
+
+        :param path: Ścieżka zawierająca węzeł API
+        :param dict request_params: dict zawierający parametry zapytania http
+        :return: json przekonwertowany na dict'a
+        :rtype: dict
+        """
+        if request_params is None:
+            request_params = dict()
+        path_str = self.assembly_path(*path, prefix=self.__api_url)
+        async with self.__semaphore:
+            started = time.perf_counter()
+            response = await self.session.post(path_str, headers=self.__headers, params=request_params)
+        self.stats.observe_fetch(cache_lib.endpoint_name(path), time.perf_counter() - started,
+                                 response.content.__len__())
+
+        return await self.dispatch_http_code(response, callback=self.post, callback_args=path,
+                                             callback_kwargs={'request_params': request_params})
+
+    # Cache
+
+    async def get_cached_response(self, *path, http_params=None, max_lifetime=timedelta(hours=1), on_refresh=None):
+        """
+        Wykonuje zapytanie http GET z poprzednim sprawdzeniem cache.
+
+        Równoczesne zapytania o ten sam zasób są łączone w jedno zapytanie http.
+
+        :param path: Niezłożona ścieżka do węzła API
+        :param dict http_params: dict zawierający parametry zapytania http
+        :param max_lifetime: Maksymalny czas ważności cache dla tego zapytania http
+        :type max_lifetime: timedelta or librus_tricks.cache.StaleWhileRevalidate
+        :param on_refresh: Funkcja wywoływana z odpowiedzią pobraną z API (również przy odświeżaniu w tle)
+        :return: dict zawierający odpowiedź zapytania
+        :rtype: dict
+        """
+        uri = SynergiaClient.cache_uri(self.assembly_path(*path, prefix=self.__api_url), http_params)
+        response_cached = await self.__blocking(self.cache.get_query, uri, self.user.uid)
+        ttl = cache_lib.max_lifetime_of(max_lifetime)
+        flight_key = uri, tuple(sorted((http_params or dict()).items())), self.user.uid
+        endpoint = cache_lib.endpoint_name(path)
+
+        negative = None if response_cached is None else cache_lib.negative_status(response_cached.response)
+        if negative is not None:
+            if self.negative_cache_ttl and SynergiaClient.response_age(response_cached) <= self.negative_cache_ttl:
+                self.stats.add(endpoint, 'negative_hits')
+                raise SynergiaClient.http_error(negative[0], uri, negative[1])
+            response_cached = None
+
+        if response_cached is not None:
+            age = SynergiaClient.response_age(response_cached)
+            if age <= cache_lib.fresh_lifetime(max_lifetime):
+                self.stats.add(endpoint, 'hits')
+                return response_cached.response
+            if age <= ttl:
+                logging.debug('Response is stale, refreshing it in background')
+                self.stats.add(endpoint, 'stale')
+                self.__refresh_once(flight_key, uri, path, http_params, ttl, on_refresh)
+                return response_cached.response
+
+        self.stats.add(endpoint, 'misses')
+        return await asyncio.shield(self.__refresh_once(flight_key, uri, path, http_params, ttl, on_refresh))
+
+    def __refresh_once(self, flight_key, uri, path, http_params, ttl, on_refresh):
+        task = self.__in_flight.get(flight_key)
+        if task is None:
+            task = asyncio.ensure_future(self.__refresh_response(uri, path, http_params, ttl, on_refresh))
+            self.__in_flight[flight_key] = task
+            task.add_done_callback(lambda _: self.__in_flight.pop(flight_key, None))
+            task.add_done_callback(self.__log_failure)
+        return task
+
+    @staticmethod
+    def __log_failure(task):
+        # Odświeżanie w tle nie ma nikogo, kto odebrałby wyjątek
+        if not task.cancelled() and task.exception() is not None:
+            logging.warning('Refreshing response failed: %r', task.exception())
+
+    async def __refresh_response(self, uri, path, http_params, ttl, on_refresh):
+        try:
+            http_response = await self.get(*path, request_params=http_params)
+        except tuple(cache_lib.NEGATIVE_ERRORS.values()) as error:
+            if self.negative_cache_ttl:
+                await self.__blocking(self.cache.add_query, uri, cache_lib.negative_response(error), self.user.uid,
+                                      ttl=self.negative_cache_ttl)
+                self.stats.add(cache_lib.endpoint_name(path), 'negative_stored')
+            raise
+        await self.__blocking(self.cache.add_query, uri, http_response, self.user.uid, ttl=ttl)
+        self.stats.add(cache_lib.endpoint_name(path), 'refreshes')
+        if on_refresh is not None:
+            await self.__blocking(on_refresh, http_response)
+        return http_response
+
+    # API query part
+
+    async def return_objects(self, *path, cls, extraction_key=None, lifetime=timedelta(seconds=10),
+                             bypass_cache=False, prefetch=True):
+        """
+        Zwraca listę obiektów lub obiekt, wygenerowaną z danych danej ścieżki API.
+
+        W przeciwieństwie do :class:`librus_tricks.core.SynergiaClient` domyślnie pobiera wszystkie powiązane
+        obiekty, ponieważ property obiektów nie mogą wykonywać zapytań asynchronicznych.
+
+        :param str path: Niezłożona ścieżka do węzła API
+        :param cls: Klasa żądanych obiektów
+        :param str extraction_key: Klucz do wyjęcia danych
+        :param timedelta lifetime: Maksymalny czas ważności cache dla tego zapytania http
+        :param bool bypass_cache: Ustawienie tego parametru na True powoduje ignorowanie mechanizmu cache
+        :param prefetch: Nazwy property do pobrania hurtowo, ``True`` pobiera wszystkie
+        :type prefetch: tuple[str] or bool
+        :rtype: tuple[SynergiaGenericClass]
+        """
+        if bypass_cache:
+            raw = await self.get(*path)
+        else:
+            raw = await self.get_cached_response(
+                *path, max_lifetime=lifetime,
+                on_refresh=lambda response: self.cache_objects(cls, response, extraction_key)
+            )
+
+        if extraction_key is None:
+            extraction_key = SynergiaGenericClass.auto_extract(raw)
+
+        raw = raw[extraction_key]
+
+        if isinstance(raw, list):
+            objects = tuple(cls.assembly(stored_payload, self) for stored_payload in raw)
+        elif isinstance(raw, dict):
+            objects = cls.assembly(raw, self)
+        else:
+            return None
+
+        if prefetch:
+            await self.prefetch(objects, *(tuple() if prefetch is True else prefetch))
+        return objects
+
+    async def prefetch(self, objects, *relations, chunk_size=50):
+        """
+        Hurtowo i równolegle pobiera obiekty powiązane, patrz :meth:`librus_tricks.core.SynergiaClient.prefetch`.
+
+        :param objects: Obiekt lub krotka obiektów
+        :param str relations: Nazwy property do pobrania, brak nazw oznacza wszystkie powiązania
+        :param int chunk_size: Maksymalna liczba id w jednym zapytaniu
+        :return: Przekazane obiekty
+        """
+        if isinstance(objects, SynergiaGenericClass):
+            parents = (objects,)
+        else:
+            parents = objects
+
+        wanted = {}
+        bindings = []
+        lifetimes = {}
+        for parent in parents:
+            for attr, (uid, cls) in parent.objects.pending().items():
+                if relations and attr not in relations:
+                    continue
+                if cls not in lifetimes:
+                    lifetimes[cls] = cls.create_defaults().get('expire', timedelta(seconds=1))
+                known = self.identity_map.get(cls, uid, lifetimes[cls])
+                if known is not None:
+                    self.stats.add(cls.__name__, 'hits')
+                    parent.objects.set_value(attr, known)
+                    continue
+                wanted.setdefault(cls, set()).add(uid)
+                bindings.append((parent, attr, cls, uid))
+
+        fetched = {}
+        missing = {}
+        for cls, uids in wanted.items():
+            fetched[cls] = await self.__blocking(self.cache.get_objects, uids, cls, session=self)
+            for uid, cached_object in fetched[cls].items():
+                self.identity_map.put(cls, uid, cached_object)
+            missing[cls] = {uid for uid in uids if str(uid) not in fetched[cls]}
+            self.stats.add(cls.__name__, 'hits', uids.__len__() - missing[cls].__len__())
+            self.stats.add(cls.__name__, 'misses', missing[cls].__len__())
+
+        classes = tuple(cls for cls, uids in missing.items() if uids)
+        results = await asyncio.gather(*[self.__fetch_many(cls, missing[cls], chunk_size) for cls in classes])
+        for cls, result in zip(classes, results):
+            fetched[cls].update(result)
+
+        for parent, attr, cls, uid in bindings:
+            related = fetched[cls].get(str(uid))
+            if related is not None:
+                parent.objects.set_value(attr, related)
+
+        return objects
+
+    async def __fetch_many(self, cls, uids, chunk_size):
+        defaults = cls.create_defaults()
+        path = defaults.get('path', ('',))
+        if path == ('',):
+            logging.debug('%s has no API path, skipping prefetch', cls.__name__)
+            return {}
+
+        uids = sorted(uids, key=str)
+        chunks = [
+            self.assembly_path(*uids[chunk_start:chunk_start + chunk_size], sep=',', suffix=',')[1:]
+            for chunk_start in range(0, uids.__len__(), chunk_size)
+        ]
+        results = await asyncio.gather(*[
+            self.return_objects(*path, ids_computed, cls=cls, lifetime=defaults.get('expire', timedelta(seconds=10)),
+                                prefetch=False)
+            for ids_computed in chunks
+        ])
+
+        fetched = {}
+        for objects in results:
+            if isinstance(objects, SynergiaGenericClass):
+                objects = (objects,)
+            for fetched_object in objects or tuple():
+                fetched[str(fetched_object.uid)] = fetched_object
+                self.identity_map.put(cls, fetched_object.uid, fetched_object)
+        return fetched
+
+    async def resolve(self, parent, attr):
+        """
+        Asynchronicznie pobiera pojedynczy obiekt powiązany i przypina go do obiektu nadrzędnego.
+
+        :param SynergiaGenericClass parent: Obiekt nadrzędny
+        :param str attr: Nazwa property
+        :return: Żądany obiekt
+        """
+        pending = parent.objects.pending()
+        if attr in pending:
+            uid, cls = pending[attr]
+            parent.objects.set_value(attr, await self.get_object(cls, uid))
+        return parent.objects.assembly(attr)
+
+    async def get_object(self, cls, uid):
+        """
+        Asynchroniczny odpowiednik ``cls.create(uid=uid, session=session)``.
+
+        :param cls: Klasa żądanego obiektu
+        :param uid: Id obiektu
+        :return: Żądany obiekt
+        """
+        defaults = cls.create_defaults()
+        expire = defaults.get('expire', timedelta(seconds=1))
+
+        known = self.identity_map.get(cls, uid, expire)
+        if known is not None:
+            self.stats.add(cls.__name__, 'hits')
+            return known
+
+        cached = await self.__blocking(self.cache.get_object, uid, cls, session=self)
+        if cached is not None:
+            self.stats.add(cls.__name__, 'hits')
+            self.identity_map.put(cls, uid, cached)
+            return cached
+
+        self.stats.add(cls.__name__, 'misses')
+
+        path = defaults.get('path', ('',))
+        if path == ('',):
+            raise exceptions.APIPathIsEmpty(f'Path for {cls.__name__} class is empty!')
+
+        response = await self.get_cached_response(*path, uid, max_lifetime=expire)
+        extraction_key = defaults.get('extraction_key')
+        if extraction_key is None:
+            extraction_key = SynergiaGenericClass.auto_extract(response)
+
+        requested_object = cls.assembly(response[extraction_key], self)
+        self.identity_map.put(cls, uid, requested_object)
+        return requested_object
+
+    async def __by_ids(self, path, ids, cls, extraction_key, prefetch):
+        if ids.__len__() == 0:
+            return await self.return_objects(*path, cls=cls, extraction_key=extraction_key, prefetch=prefetch)
+
+        found = await self.__blocking(self.known_objects, cls, ids)
+        missing = [uid for uid in ids if str(uid) not in found]
+        if missing:
+            ids_computed = self.assembly_path(*missing, sep=',', suffix=',')[1:]
+            fetched = await self.return_objects(*path, ids_computed, cls=cls, extraction_key=extraction_key,
+                                                prefetch=False)
+            if isinstance(fetched, SynergiaGenericClass):
+                fetched = (fetched,)
+            for fetched_object in fetched or tuple():
+                found[str(fetched_object.uid)] = fetched_object
+                self.identity_map.put(cls, fetched_object.uid, fetched_object)
+
+        objects = tuple(found[str(uid)] for uid in ids if str(uid) in found)
+        if prefetch:
+            await self.prefetch(objects, *(tuple() if prefetch is True else prefetch))
+        return objects
+
+    async def grades(self, *grades, prefetch=True):
+        """
+        :param int grades: Id ocen
+        :rtype: tuple[librus_tricks.classes.SynergiaGrade]
+        """
+        return await self.__by_ids(('Grades',), grades, SynergiaGrade, 'Grades', prefetch)
+
+    async def attendances(self, *attendances, prefetch=True):
+        """
+        :param int attendances: Id obecności
+        :rtype: tuple[librus_tricks.classes.SynergiaAttendance]
+        """
+        return await self.__by_ids(('Attendances',), attendances, SynergiaAttendance, 'Attendances', prefetch)
+
+    async def exams(self, *exams, prefetch=True):
+        """
+        :param int exams: Id egzaminów
+        :rtype: tuple[librus_tricks.classes.SynergiaExam]
+        """
+        return await self.__by_ids(('HomeWorks',), exams, SynergiaExam, 'HomeWorks', prefetch)
+
+    async def colors(self, *colors):
+        """
+        :param int colors: Id kolorów
+        :rtype: tuple[librus_tricks.classes.SynergiaColor]
+        """
+        return await self.__by_ids(('Colors',), colors, SynergiaColor, 'Colors', False)
+
+    async def subjects(self, *subjects):
+        """
+        :param int subjects: Id przedmiotów
+        :rtype: tuple[librus_tricks.classes.SynergiaSubject]
+        """
+        return await self.__by_ids(('Subjects',), subjects, SynergiaSubject, 'Subjects', False)
+
+    async def messages(self, *messages, prefetch=True):
+        """
+        Wymaga mobilnych dodatków.
+
+        :param int messages: Id wiadomości
+        :rtype: tuple[librus_tricks.classes.SynergiaNativeMessage]
+        """
+        return await self.__by_ids(('Messages',), messages, SynergiaNativeMessage, 'Messages', prefetch)
+
+    async def news_feed(self, prefetch=True):
+        """
+        :rtype: tuple[librus_tricks.classes.SynergiaNews]
+        """
+        return await self.return_objects('SchoolNotices', cls=SynergiaNews, extraction_key='SchoolNotices',
+                                         prefetch=prefetch)
+
+    async def realizations(self, *realizations, prefetch=True):
+        """
+        :param int realizations: Id realizacji
+        :rtype: tuple[librus_tricks.classes.SynergiaRealization]
+        """
+        return await self.__by_ids(('Realizations',), realizations, SynergiaRealization, 'Realizations', prefetch)
+
+    async def school(self):
+        """
+        :rtype: librus_tricks.classes.SynergiaSchool
+        """
+        return await self.return_objects('Schools', cls=SynergiaSchool, extraction_key='School', prefetch=False)
+
+    async def lucky_number(self):
+        """
+        :rtype: int
+        """
+        return (await self.get('LuckyNumbers'))['LuckyNumber']['LuckyNumber']
+
+    async def timetable(self, for_date=None, expire=timedelta(minutes=5)):
+        """
+        Plan lekcji na cały tydzień, patrz :meth:`librus_tricks.core.SynergiaClient.timetable`.
+
+        :param datetime.datetime for_date: Data dnia, który ma być w planie lekcji, domyślnie dziś
+        :param expire: Maksymalny czas ważności cache dla planu
+        :rtype: librus_tricks.classes.SynergiaTimetable
+        """
+        monday = tools.get_actual_monday(for_date).isoformat()
+        timetable = self.identity_map.get(SynergiaTimetable, monday, expire)
+        if timetable is not None:
+            return timetable
+
+        matrix = await self.get_cached_response('Timetables', http_params={'weekStart': monday}, max_lifetime=expire)
+        timetable = SynergiaTimetable.assembly(matrix['Timetable'], self)
+        self.identity_map.put(SynergiaTimetable, monday, timetable)
+        return timetable
+
+    async def timetable_day(self, for_date):
+        """
+        :param datetime.datetime for_date: Data dnia
+        :rtype: librus_tricks.classes.SynergiaTimetableDay
+        """
+        return (await self.timetable(for_date)).days.get(for_date.date())
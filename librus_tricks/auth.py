@@ -1,10 +1,11 @@
 import logging
 from datetime import datetime, timedelta
 
-import requests
 from bs4 import BeautifulSoup
 
+from . import codec
 from .exceptions import *
+from .transport import get_default_transport
 
 # Some globals
 REDIRURL = 'http://localhost/bar'
@@ -40,11 +41,13 @@ class SynergiaUser:
     def __str__(self):
         return f'{self.name} {self.last_name}'
 
-    def revalidate_root(self):
+    def revalidate_root(self, transport=None):
         """
         Aktualizuje token do Portalu Librus.
+
+        :param librus_tricks.transport.SynergiaTransport transport: Pula połączeń http
         """
-        auth_session = requests.session()
+        auth_session = _auth_session(transport)
         new_tokens = auth_session.post(
             OAUTHURL,
             data={
@@ -60,12 +63,15 @@ class SynergiaUser:
         except KeyError:
             raise LibrusTricksAuthException('Invalid payload recived', new_tokens.json())
 
-    def revalidate_user(self):
+    def revalidate_user(self, transport=None):
         """
         Aktualizuje token dostępu do Synergii, który wygasa po 24h.
+
+        :param librus_tricks.transport.SynergiaTransport transport: Pula połączeń http
         """
+        auth_session = _auth_session(transport)
+
         def do_revalidation():
-            auth_session = requests.session()
             new_token = auth_session.get(
                 FRESHURL.format(login=self.login),
                 headers={'Authorization': f'Bearer {self.root_token}'}
@@ -76,7 +82,7 @@ class SynergiaUser:
         new_token = do_revalidation()
         if new_token.json().get('error') == 'access_denied':
             logging.info('Obtaing new token failed! Refreshing root token')
-            self.revalidate_root()
+            self.revalidate_root(transport)
             new_token = do_revalidation() # again...
 
         try:
@@ -84,10 +90,11 @@ class SynergiaUser:
         except KeyError:
             raise LibrusTricksAuthException('Invalid response received', new_token.json())
 
-    def check_is_expired(self, use_clock=True, use_query=True):
+    def check_is_expired(self, use_clock=True, use_query=True, transport=None):
         """
         :param bool use_clock: Sprawdza na podstawie czasu
         :param bool use_query: Sprawdza poprzez zapytanie http GET na ``/Me``
+        :param librus_tricks.transport.SynergiaTransport transport: Pula połączeń http
         :return: krotka z wynikami
         :rtype: tuple[bool]
         """
@@ -100,7 +107,8 @@ class SynergiaUser:
             else:
                 clock_resp = True
         if use_query:
-            test = requests.get('https://api.librus.pl/2.0/Me', headers={'Authorization': f'Bearer {self.token}'})
+            test = _auth_session(transport).get('https://api.librus.pl/2.0/Me',
+                                                headers={'Authorization': f'Bearer {self.token}'})
             if test.status_code == 401:
                 query_resp = False
             else:
@@ -119,20 +127,9 @@ class SynergiaUser:
         return self.check_is_expired(use_clock=False)[1]
 
     def dump_credentials(self, cred_file=None):
-        import json
         if cred_file is None:
-            cred_file = open(f'{self.login}.json', 'w')
-        json.dump({
-            'user_dict': {
-                'accessToken': self.token,
-                'studentName': f'{self.name} {self.last_name}',
-                'id': self.uid,
-                'login': self.login,
-            },
-            'root_token': self.root_token,
-            'revalidation_token': self.refresh_token,
-            'exp_in': int(self.expires_in.timestamp())
-        }, cred_file)
+            cred_file = open(f'{self.login}.json', 'w', encoding='utf-8')
+        cred_file.write(codec.dumps(self.dict_credentials()))
 
     def dict_credentials(self):
         return {
@@ -148,17 +145,23 @@ class SynergiaUser:
         }
 
 
+def _auth_session(transport=None):
+    if transport is None:
+        transport = get_default_transport()
+    return transport.new_session()
+
+
 def load_json(cred_file):
-    import json
-    return SynergiaUser(**json.load(cred_file))
+    return SynergiaUser(**codec.loads(cred_file.read()))
 
 
-def authorizer(email, password, user_agent=None):
+def authorizer(email, password, user_agent=None, transport=None):
     """
     Zwraca listę użytkowników dostępnych dla danego konta Librus Portal
 
     :param str email: Email do Portalu Librus
     :param str password: Hasło do Portalu Librus
+    :param librus_tricks.transport.SynergiaTransport transport: Pula połączeń http
     :return: Listę z użytkownikami połączonymi do konta Librus Synergia
     :rtype: list[librus_tricks.auth.SynergiaUser]
     """
@@ -167,7 +170,7 @@ def authorizer(email, password, user_agent=None):
         user_agent = choice([XIAOMI_USERAGENT, IPHONE_USERAGENT])
         logging.debug('No user-agent specified, using %s', user_agent)
 
-    auth_session = requests.session()
+    auth_session = _auth_session(transport)
     auth_session.headers.update({'User-Agent': user_agent, 'X-Requested-With': 'pl.librus.synergiaDru2'})
     site = auth_session.get(LIBRUSLOGINURL)
     soup = BeautifulSoup(site.text, 'html.parser')
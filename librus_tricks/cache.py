@@ -1,18 +1,296 @@
-from datetime import datetime
+import logging
+import re
+import threading
+from bisect import bisect_left
+from collections import OrderedDict, namedtuple
+from concurrent.futures import Future
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from functools import wraps
+from inspect import signature
+from urllib.parse import urlparse
 
-from sqlalchemy import create_engine, String, JSON, Column, DateTime, Integer
+from sqlalchemy import create_engine, event, String, JSON, Column, DateTime, Integer, UniqueConstraint, MetaData, \
+    Table, inspect, select, or_, text, tuple_, LargeBinary, func
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlalchemy.pool import StaticPool
 
+from librus_tricks import codec as codec_lib
+from librus_tricks import exceptions
+
+
+def endpoint_name(path):
+    """
+    Zwraca nazwę węzła API bez id, wersji api i parametrów, np. ``Users`` dla
+    ``https://api.librus.pl/2.0/Users/1,2,``.
+
+    :param path: Adres lub elementy ścieżki
+    :type path: str or tuple
+    :rtype: str
+    """
+    if isinstance(path, str):
+        path = urlparse(path).path.split('/')
+    elements = [str(element) for element in path if element not in ('', None)]
+    for index, element in enumerate(elements):
+        if re.fullmatch(r'\d+\.\d+', element):
+            elements = elements[index + 1:]
+            break
+    return '/'.join(element for element in elements if not element.replace(',', '').isdigit()) or '/'
+
+
+class CacheStats:
+    """
+    Statystyki cache dla każdego węzła API (np. ``Grades``) lub klasy obiektów (np. ``SynergiaTeacher``):
+    trafienia, chybienia, zwrócone stare wpisy, odświeżenia, usunięte wpisy, rozmiary danych oraz histogram czasu
+    pobierania danych z API.
+    """
+
+    FIELDS = ('hits', 'misses', 'stale', 'refreshes', 'evictions', 'fetches', 'bytes_fetched', 'bytes_stored',
+              'negative_hits', 'negative_stored')
+    LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  #: Granice przedziałów w s
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__counters = dict()
+        self.__latency = dict()
+
+    def add(self, name, field, value=1):
+        """
+        :param str name: Nazwa węzła API lub klasy
+        :param str field: Jedno z :attr:`FIELDS`
+        :param int value: Wartość dodawana do licznika
+        """
+        with self.__lock:
+            counters = self.__counters.get(name)
+            if counters is None:
+                counters = self.__counters[name] = dict.fromkeys(self.FIELDS, 0)
+            counters[field] += value
+
+    def observe_fetch(self, name, seconds, size=None):
+        """
+        Zapisuje pobranie danych z API.
+
+        :param str name: Nazwa węzła API
+        :param float seconds: Czas zapytania
+        :param int size: Rozmiar odpowiedzi w bajtach
+        """
+        self.add(name, 'fetches')
+        if size is not None:
+            self.add(name, 'bytes_fetched', size)
+        bucket = bisect_left(self.LATENCY_BUCKETS, seconds)
+        with self.__lock:
+            latency = self.__latency.get(name)
+            if latency is None:
+                latency = self.__latency[name] = {'sum': 0.0, 'buckets': [0] * (self.LATENCY_BUCKETS.__len__() + 1)}
+            latency['sum'] += seconds
+            latency['buckets'][bucket] += 1
+
+    def snapshot(self):
+        """
+        :return: dict w postaci ``{nazwa: {licznik: wartość, ..., 'latency': {'sum': s, 'buckets': {granica: n}}}}``,
+            ostatni przedział histogramu ma granicę ``inf``
+        :rtype: dict
+        """
+        with self.__lock:
+            snapshot = {name: counters.copy() for name, counters in self.__counters.items()}
+            for name, latency in self.__latency.items():
+                snapshot.setdefault(name, dict.fromkeys(self.FIELDS, 0))['latency'] = {
+                    'sum': latency['sum'],
+                    'buckets': dict(zip(self.LATENCY_BUCKETS + (float('inf'),), latency['buckets'])),
+                }
+        return snapshot
+
+    def totals(self):
+        """
+        :return: Liczniki zsumowane dla wszystkich nazw
+        :rtype: dict
+        """
+        totals = dict.fromkeys(self.FIELDS, 0)
+        with self.__lock:
+            for counters in self.__counters.values():
+                for field, value in counters.items():
+                    totals[field] += value
+        return totals
+
+    def hit_ratio(self, name=None):
+        """
+        :param str name: Nazwa węzła API lub klasy, domyślnie wszystkie
+        :rtype: float
+        """
+        counters = self.totals() if name is None else self.snapshot().get(name, dict.fromkeys(self.FIELDS, 0))
+        lookups = counters['hits'] + counters['stale'] + counters['misses']
+        return (counters['hits'] + counters['stale']) / lookups if lookups else 0.0
+
+    def reset(self):
+        with self.__lock:
+            self.__counters = dict()
+            self.__latency = dict()
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} {self.totals()}>'
+
+
+def _adapt_legacy_method(method, reference, added):
+    """
+    Opakowuje metodę backendu napisanego dla starszej wersji biblioteki, tak by nie dostawała parametrów, których
+    nie przyjmuje.
+
+    :param method: Metoda podklasy
+    :param reference: Ta sama metoda w :class:`CacheBase`
+    :param added: Nazwy parametrów dodanych w nowszych wersjach
+    :return: ``method`` lub funkcja ją opakowująca
+    """
+    parameters = signature(method).parameters
+    if all(name in parameters for name in added) or \
+            any(parameter.kind is parameter.VAR_KEYWORD for parameter in parameters.values()):
+        return method
+    reference_signature = signature(reference)
+    logging.debug('%s does not accept %s, these arguments will be skipped', method.__qualname__, added)
+
+    @wraps(method)
+    def adapter(self, *args, **kwargs):
+        arguments = reference_signature.bind(self, *args, **kwargs).arguments
+        result = method(
+            *(value for name, value in arguments.items() if name not in added),
+            **{name: value for name, value in arguments.items() if name in added and name in parameters}
+        )
+        # Obiekt złożony dla ``syn_session`` jest wiązany z sesją, która o niego prosiła
+        if result is not None and 'session' not in parameters and arguments.get('session') is not None:
+            return result.bind(arguments['session'])
+        return result
+
+    return adapter
+
 
 class CacheBase:
-    def add_object(self, uid, cls, resource):
+    #: Parametry metod dodane po pierwszej wersji, backendy, które ich nie przyjmują, nadal działają
+    ADDED_PARAMETERS = {
+        'add_object': ('last_load', 'ttl'),
+        'add_query': ('last_load', 'ttl'),
+        'get_object': ('session',),
+    }
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for name, added in CacheBase.ADDED_PARAMETERS.items():
+            method = cls.__dict__.get(name)
+            if method is not None:
+                setattr(cls, name, _adapt_legacy_method(method, getattr(CacheBase, name), added))
+
+    @property
+    def stats(self):
+        """
+        Statystyki backendu: trafienia i chybienia odczytów, usunięte wpisy i zapisane bajty.
+
+        :rtype: CacheStats
+        """
+        stats = self.__dict__.get('_stats')
+        if stats is None:
+            stats = self.__dict__.setdefault('_stats', CacheStats())
+        return stats
+
+    def add_object(self, uid, cls, resource, last_load=None, ttl=None):
+        """
+        :param datetime last_load: Czas pobrania danych, domyślnie teraz
+        :param timedelta ttl: Czas przechowywania wpisu, domyślnie ustawiony dla całego cache
+        """
         pass
 
-    def get_object(self, uid, cls):
+    def add_objects(self, objects, ttl=None):
+        """
+        Zapisuje wiele obiektów naraz, backendy powinny to robić w jednej transakcji.
+
+        :param objects: Krotki ``(uid, cls, resource)`` lub ``(uid, cls, resource, last_load)``
+        :param timedelta ttl: Czas przechowywania wpisów, domyślnie ustawiony dla całego cache
+        """
+        for uid, cls, resource, *last_load in objects:
+            self.add_object(uid, cls, resource, *last_load, ttl=ttl)
+
+    def get_object(self, uid, cls, session=None):
+        """
+        :param uid: Id obiektu
+        :param cls: Klasa obiektu
+        :param librus_tricks.core.SynergiaClient session: Sesja, z którą jest składany obiekt, domyślnie
+            ``syn_session``
+        :return: Obiekt lub None
+        """
         raise NotImplementedError('get_object require implementation')
 
+    def get_objects(self, uids, cls, session=None):
+        """
+        Pobiera wiele obiektów jednej klasy naraz, backendy sieciowe powinny to robić w jednym zapytaniu.
+
+        :param uids: Id obiektów
+        :param cls: Klasa obiektów
+        :param librus_tricks.core.SynergiaClient session: Sesja, z którą są składane obiekty, domyślnie
+            ``syn_session``
+        :return: dict w postaci ``{str(id): obiekt}`` zawierający tylko znalezione obiekty
+        :rtype: dict
+        """
+        found = {}
+        for uid in uids:
+            instance = self.get_object(uid, cls, session=session)
+            if instance is not None:
+                found[str(uid)] = instance
+        return found
+
+    def keep_instances(self, max_size=4096, lifetime=timedelta(minutes=1)):
+        """
+        Włącza trzymanie złożonych obiektów w pamięci procesu. Trafienie w cache obiektów nie dekoduje wtedy json
+        i nie wywołuje ``__init__`` klasy (parsowanie dat, tworzenie powiązań). Obiekt złożony dla innej sesji jest
+        zwracany jako kopia z :meth:`librus_tricks.classes.SynergiaGenericClass.bind`, więc nigdy nie trafia do
+        cudzej sesji.
+
+        :param int max_size: Maksymalna liczba obiektów, 0 wyłącza ten tryb
+        :param timedelta lifetime: Czas, przez który obiekt jest zwracany bez sprawdzania backendu (ważne, gdy
+            baza jest współdzielona z innymi procesami)
+        :return: Ten sam cache
+        """
+        self._instances = ObjectIdentityMap(max_size) if max_size > 0 else None
+        self._instance_lifetime = lifetime
+        return self
+
+    def keep_resources(self, enabled=True):
+        """
+        Obiekty złożone z tego cache zachowują dane z API (``export_resource()``) niezależnie od
+        ``keep_resource`` ich klasy.
+
+        :param bool enabled: Włącza lub wyłącza ten tryb
+        :return: Ten sam cache
+        """
+        self._keep_resources = enabled
+        return self
+
+    def _kept_instance(self, uid, cls, session):
+        instances = self.__dict__.get('_instances')
+        if instances is None:
+            return None
+        instance = instances.get(cls, uid, self._instance_lifetime)
+        if instance is None:
+            return None
+        return instance.bind(session)
+
+    def _assembly(self, uid, cls, resource, session):
+        instance = cls.assembly(resource, session)
+        if self.__dict__.get('_keep_resources') and instance._json_resource is None:
+            instance._json_resource = resource
+        instances = self.__dict__.get('_instances')
+        if instances is not None:
+            instances.put(cls, uid, instance)
+        return instance
+
+    def _forget_instances(self, objects=None):
+        instances = self.__dict__.get('_instances')
+        if instances is None:
+            return
+        if objects is None:
+            instances.clear()
+            return
+        for uid, cls, *_ in objects:
+            instances.discard(cls, uid)
+
     def del_object(self, uid):
         raise NotImplementedError('del_object require implementation')
 
@@ -22,9 +300,25 @@ class CacheBase:
     def count_object(self):
         raise NotImplementedError('count_object require implementation')
 
-    def add_query(self, uri, response, user_id):
+    def add_query(self, uri, response, user_id, last_load=None, ttl=None):
+        """
+        Zapisuje odpowiedź, nadpisując poprzedni wpis dla tego samego ``(uri, user_id)``.
+
+        :param datetime last_load: Czas pobrania odpowiedzi, domyślnie teraz
+        :param timedelta ttl: Czas przechowywania wpisu, domyślnie ustawiony dla całego cache
+        """
         pass
 
+    def add_queries(self, queries, ttl=None):
+        """
+        Zapisuje wiele odpowiedzi naraz, backendy powinny to robić w jednej transakcji.
+
+        :param queries: Obiekty :data:`CachedQuery`
+        :param timedelta ttl: Czas przechowywania wpisów, domyślnie ustawiony dla całego cache
+        """
+        for query in queries:
+            self.add_query(query.uri, query.response, query.owner, query.last_load, ttl)
+
     def get_query(self, uri, user_id):
         raise NotImplementedError('get_query require implementation')
 
@@ -37,12 +331,60 @@ class CacheBase:
     def count_queries(self):
         raise NotImplementedError('count_queries require implementation')
 
+    def sweep_expired(self, batch_size=1000):
+        """
+        Usuwa wygasłe wpisy.
+
+        :return: Liczba usuniętych wpisów
+        :rtype: int
+        """
+        return 0
+
+    def iter_queries(self):
+        """
+        Zwraca wszystkie ważne (niewygasłe) odpowiedzi.
+
+        :rtype: collections.Iterable[CachedQuery]
+        """
+        raise NotImplementedError('iter_queries require implementation')
+
+    def iter_objects(self):
+        """
+        Zwraca wszystkie ważne (niewygasłe) obiekty.
+
+        :rtype: collections.Iterable[CachedObject]
+        """
+        raise NotImplementedError('iter_objects require implementation')
+
+    def export_snapshot(self, target):
+        """
+        Zapisuje zawartość cache do pliku, patrz :mod:`librus_tricks.snapshot`.
+
+        :param target: Ścieżka lub plik otwarty w trybie binarnym
+        :rtype: librus_tricks.snapshot.SnapshotReport
+        """
+        from librus_tricks import snapshot
+
+        return snapshot.dump(self, target)
+
+    def import_snapshot(self, source, ttl=None):
+        """
+        Wczytuje plik zapisany przez :meth:`export_snapshot`, również z innego backendu.
+
+        :param source: Ścieżka lub plik otwarty w trybie binarnym
+        :param timedelta ttl: Czas przechowywania wpisów, domyślnie ustawiony dla całego cache
+        :rtype: librus_tricks.snapshot.SnapshotReport
+        """
+        from librus_tricks import snapshot
+
+        return snapshot.load(self, source, ttl=ttl)
+
     def about_backend(self):
         raise NotImplementedError('required providing info about cache provider')
 
 
 class DumbCache(CacheBase):
-    def get_object(self, uid, cls):
+    def get_object(self, uid, cls, session=None):
         return
 
     def get_query(self, uri, user_id):
@@ -52,83 +394,1277 @@ class DumbCache(CacheBase):
         return f'<Just dumb cache>'
 
 
+class StaleWhileRevalidate:
+    """
+    Polityka ważności cache, którą można podać wszędzie tam, gdzie przyjmowany jest czas ważności (``expire``,
+    ``max_lifetime``, ``lifetime``).
+
+    Wpis młodszy niż ``fresh`` jest zwracany od razu. Wpis starszy jest nadal zwracany od razu, a jego odświeżenie
+    odbywa się w tle. Dopiero wpis starszy niż ``max_age`` wymusza oczekiwanie na nowe zapytanie http.
+    """
+
+    def __init__(self, fresh, max_age):
+        """
+        :param timedelta fresh: Czas, przez który wpis jest aktualny
+        :param timedelta max_age: Maksymalny wiek wpisu, który może zostać zwrócony
+        """
+        if max_age < fresh:
+            raise ValueError('max_age can not be shorter than fresh')
+        self.fresh = fresh
+        self.max_age = max_age
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} fresh for {self.fresh}, stale up to {self.max_age}>'
+
+
+def fresh_lifetime(lifetime):
+    """
+    Zwraca czas, przez który wpis jest aktualny.
+
+    :param lifetime: timedelta lub :class:`StaleWhileRevalidate`
+    :rtype: timedelta
+    """
+    if isinstance(lifetime, StaleWhileRevalidate):
+        return lifetime.fresh
+    return lifetime
+
+
+def max_lifetime_of(lifetime):
+    """
+    Zwraca maksymalny wiek wpisu, który może zostać zwrócony.
+
+    :param lifetime: timedelta lub :class:`StaleWhileRevalidate`
+    :rtype: timedelta
+    """
+    if isinstance(lifetime, StaleWhileRevalidate):
+        return lifetime.max_age
+    return lifetime
+
+
+NEGATIVE_RESPONSE_KEY = '__librus_tricks_error__'  #: Klucz wpisu zapamiętującego błąd http zamiast odpowiedzi
+NEGATIVE_ERRORS = {404: exceptions.SynergiaAPIEndpointNotFound, 403: exceptions.SynergiaForbidden}
+
+
+def negative_response(error):
+    """
+    Tworzy wpis cache zapamiętujący błąd 404 lub 403 (np. moduł wyłączony przez szkołę) zamiast odpowiedzi.
+
+    :param librus_tricks.exceptions.LibrusTricksException error: Wyjątek zwrócony przez API
+    :return: dict do zapisania przez ``add_query`` lub None, jeżeli błąd nie jest zapamiętywany
+    :rtype: dict
+    """
+    for status_code, error_cls in NEGATIVE_ERRORS.items():
+        if isinstance(error, error_cls):
+            payload = error.args[1] if error.args.__len__() > 1 else None
+            return {NEGATIVE_RESPONSE_KEY: {'status': status_code, 'payload': payload}}
+    return None
+
+
+def negative_status(response):
+    """
+    :param response: Odpowiedź zapisana w cache
+    :return: ``(kod http, odpowiedź serwera)`` dla wpisu utworzonego przez :func:`negative_response`,
+        w przeciwnym razie None
+    :rtype: tuple
+    """
+    if isinstance(response, dict) and NEGATIVE_RESPONSE_KEY in response:
+        error = response[NEGATIVE_RESPONSE_KEY]
+        return error['status'], error['payload']
+    return None
+
+
+class ObjectIdentityMap:
+    """
+    Mapa tożsamości złożonych obiektów w obrębie sesji, kluczem jest para (klasa, id).
+
+    Przechowuje ograniczoną liczbę obiektów (najdawniej używane są usuwane jako pierwsze), więc wielokrotne
+    odwołania do tego samego obiektu (np. typu obecności) nie powtarzają składania obiektu.
+    """
+
+    def __init__(self, max_size=4096):
+        """
+        :param int max_size: Maksymalna liczba przechowywanych obiektów, 0 wyłącza mapę
+        """
+        self.max_size = max_size
+        self.__storage = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def get(self, cls, uid, max_lifetime):
+        """
+        Zwraca wcześniej złożony obiekt, o ile nie jest starszy niż ``max_lifetime``.
+
+        :param cls: Klasa żądanego obiektu
+        :param uid: Id żądanego obiektu
+        :param max_lifetime: Maksymalny czas ważności obiektu (timedelta lub :class:`StaleWhileRevalidate`)
+        :return: Obiekt lub None
+        """
+        max_lifetime = fresh_lifetime(max_lifetime)
+        key = (cls, str(uid))
+        with self.__lock:
+            stored = self.__storage.get(key)
+            if stored is None:
+                return None
+            loaded, instance = stored
+            if datetime.now() - loaded > max_lifetime:
+                del self.__storage[key]
+                return None
+            self.__storage.move_to_end(key)
+            return instance
+
+    def put(self, cls, uid, instance):
+        """
+        Zapisuje złożony obiekt.
+
+        :param cls: Klasa obiektu
+        :param uid: Id obiektu
+        :param instance: Obiekt
+        """
+        if self.max_size <= 0:
+            return
+        key = (cls, str(uid))
+        with self.__lock:
+            self.__storage[key] = datetime.now(), instance
+            self.__storage.move_to_end(key)
+            while self.__storage.__len__() > self.max_size:
+                self.__storage.popitem(last=False)
+
+    def discard(self, cls, uid):
+        with self.__lock:
+            self.__storage.pop((cls, str(uid)), None)
+
+    def clear(self):
+        with self.__lock:
+            self.__storage.clear()
+
+    def __len__(self):
+        return self.__storage.__len__()
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} with {self.__len__()}/{self.max_size} objects>'
+
+
+class RequestCoalescer:
+    """
+    Łączy równoczesne zapytania o ten sam zasób w jedno zapytanie http.
+
+    Pierwszy wątek wykonuje zapytanie, pozostałe czekają na jego wynik (lub wyjątek).
+    """
+
+    def __init__(self):
+        self.__in_flight = dict()
+        self.__lock = threading.Lock()
+
+    def do(self, key, fetch):
+        """
+        Wykonuje ``fetch`` lub czeka na wynik trwającego wywołania z tym samym kluczem.
+
+        :param key: Klucz zapytania, np. ``(uri, parametry, id użytkownika, id cache)``
+        :param fetch: Funkcja bez argumentów wykonująca zapytanie
+        :return: Wynik ``fetch``
+        """
+        with self.__lock:
+            future = self.__in_flight.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = Future()
+                self.__in_flight[key] = future
+
+        if not is_leader:
+            logging.debug('Waiting for in-flight request %s', key)
+            return future.result()
+
+        return self.__lead(key, future, fetch)
+
+    def do_in_background(self, key, fetch, executor):
+        """
+        Zleca wykonanie ``fetch`` w tle, o ile zapytanie z tym samym kluczem nie jest już wykonywane.
+
+        :param key: Klucz zapytania
+        :param fetch: Funkcja bez argumentów wykonująca zapytanie
+        :param concurrent.futures.Executor executor: Pula wątków wykonująca zapytania
+        :rtype: concurrent.futures.Future
+        """
+        with self.__lock:
+            if key in self.__in_flight:
+                return self.__in_flight[key]
+            future = Future()
+            self.__in_flight[key] = future
+
+        future.add_done_callback(self.__log_background_error)
+        executor.submit(self.__lead, key, future, fetch)
+        return future
+
+    def __lead(self, key, future, fetch):
+        try:
+            result = fetch()
+        except BaseException as error:
+            future.set_exception(error)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self.__lock:
+                del self.__in_flight[key]
+
+    @staticmethod
+    def __log_background_error(future):
+        if future.exception() is not None:
+            logging.warning('Background refresh failed: %r', future.exception())
+
+    def __len__(self):
+        return self.__in_flight.__len__()
+
+
+CachedObject = namedtuple('CachedObject', ('uid', 'name', 'resource', 'last_load'))
+CachedObject.__doc__ = 'Obiekt zapisany w cache, ``name`` to nazwa jego klasy'
+CachedQuery = namedtuple('CachedQuery', ('uri', 'owner', 'response', 'last_load'))
+CachedQuery.__doc__ = 'Wpis z cache zapytań zwracany przez :class:`MemoryCache`'
+
+
+class MemoryCache(CacheBase):
+    """
+    Cache trzymany w pamięci procesu, bez bazy danych.
+
+    Wpisy są usuwane po przekroczeniu czasu ważności ``ttl`` albo, jako najdawniej używane, po przekroczeniu
+    ``max_entries`` wpisów lub ``max_bytes`` bajtów (rozmiar odpowiedzi zapisanej jako json). Odpowiedzi nie są
+    kopiowane, więc nie należy ich modyfikować.
+    """
+
+    def __init__(self, max_entries=10000, max_bytes=64 * 1024 * 1024, ttl=timedelta(hours=1), sizeof=None,
+                 compression=None):
+        """
+        :param int max_entries: Maksymalna liczba wpisów (zapytań i obiektów razem)
+        :param int max_bytes: Maksymalny łączny rozmiar wpisów w bajtach
+        :param timedelta ttl: Czas, po którym wpis jest usuwany, None wyłącza wygasanie
+        :param sizeof: Funkcja zwracająca rozmiar wpisu w bajtach, domyślnie długość json
+        :param librus_tricks.codec.PayloadCompressor compression: Kompresja odpowiedzi, które są wtedy dekodowane
+            przy każdym odczycie
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.compression = compression
+        self.syn_session = None
+        self.__sizeof = sizeof or (lambda payload: codec_lib.dumpb(payload).__len__())
+        # klucz -> (wpis, rozmiar, czas wygaśnięcia), klucze to ('query', uri, owner) i ('object', uid, nazwa klasy)
+        self.__storage = OrderedDict()
+        self.__size = 0
+        self.__lock = threading.RLock()
+
+    def __put(self, key, entry, payload, ttl, size=None):
+        size = self.__sizeof(payload) if size is None else size
+        ttl = self.ttl if ttl is None else ttl
+        expires = None if ttl is None else datetime.now() + ttl
+        self.__pop(key)
+        self.__storage[key] = entry, size, expires
+        self.__size += size
+        self.stats.add(self.__stats_name(key), 'bytes_stored', size)
+        while self.__storage and (self.__storage.__len__() > self.max_entries or self.__size > self.max_bytes):
+            self.__evict(next(iter(self.__storage)))
+
+    def __get(self, key):
+        stored = self.__storage.get(key)
+        if stored is None:
+            self.stats.add(self.__stats_name(key), 'misses')
+            return None
+        entry, _, expires = stored
+        if expires is not None and expires <= datetime.now():
+            self.__evict(key)
+            self.stats.add(self.__stats_name(key), 'misses')
+            return None
+        self.__storage.move_to_end(key)
+        self.stats.add(self.__stats_name(key), 'hits')
+        return entry
+
+    @staticmethod
+    def __stats_name(key):
+        return endpoint_name(key[1]) if key[0] == 'query' else key[2]
+
+    def __evict(self, key):
+        self.__pop(key)
+        self.stats.add(self.__stats_name(key), 'evictions')
+
+    def __pop(self, key):
+        stored = self.__storage.pop(key, None)
+        if stored is not None:
+            self.__size -= stored[1]
+
+    def __remove(self, kind):
+        for key in [key for key in self.__storage if key[0] == kind]:
+            self.__pop(key)
+
+    def add_object(self, uid, cls, resource, last_load=None, ttl=None):
+        self._forget_instances([(uid, cls)])
+        with self.__lock:
+            self.__put(('object', str(uid), cls.__name__), (resource, last_load or datetime.now()), resource, ttl)
+
+    def add_objects(self, objects, ttl=None):
+        with self.__lock:
+            for uid, cls, resource, *last_load in objects:
+                self.add_object(uid, cls, resource, *last_load, ttl=ttl)
+
+    def get_object(self, uid, cls, session=None):
+        session = session or self.syn_session
+        instance = self._kept_instance(uid, cls, session)
+        if instance is not None:
+            self.stats.add(cls.__name__, 'hits')
+            return instance
+        with self.__lock:
+            entry = self.__get(('object', str(uid), cls.__name__))
+        if entry is None:
+            return None
+        return self._assembly(uid, cls, entry[0], session)
+
+    def get_objects(self, uids, cls, session=None):
+        session = session or self.syn_session
+        found = {}
+        for uid in uids:
+            instance = self._kept_instance(uid, cls, session)
+            if instance is not None:
+                found[str(uid)] = instance
+        self.stats.add(cls.__name__, 'hits', found.__len__())
+        with self.__lock:
+            entries = {
+                str(uid): self.__get(('object', str(uid), cls.__name__)) for uid in uids if str(uid) not in found
+            }
+        found.update(
+            (uid, self._assembly(uid, cls, entry[0], session)) for uid, entry in entries.items() if entry is not None
+        )
+        return found
+
+    def del_object(self, uid):
+        self._forget_instances()
+        with self.__lock:
+            for key in [key for key in self.__storage if key[0] == 'object' and key[1] == str(uid)]:
+                self.__pop(key)
+
+    def clear_objects(self):
+        self._forget_instances()
+        with self.__lock:
+            self.__remove('object')
+
+    def count_object(self):
+        with self.__lock:
+            return sum(1 for key in self.__storage if key[0] == 'object')
+
+    def add_query(self, uri, response, user_id, last_load=None, ttl=None):
+        size = None
+        if self.compression is not None:
+            response = self.compression.pack(response)
+            size = response.__len__()
+        with self.__lock:
+            self.__put(('query', uri, user_id), CachedQuery(uri, user_id, response, last_load or datetime.now()),
+                       response, ttl, size)
+
+    def get_query(self, uri, user_id):
+        """
+
+        :rtype: CachedQuery
+        """
+        with self.__lock:
+            cached = self.__get(('query', uri, user_id))
+        if cached is not None and isinstance(cached.response, bytes):
+            return cached._replace(response=codec_lib.PayloadCompressor.unpack(cached.response))
+        return cached
+
+    def del_query(self, uri, user_id):
+        with self.__lock:
+            self.__pop(('query', uri, user_id))
+
+    def clear_queries(self):
+        with self.__lock:
+            self.__remove('query')
+
+    def count_queries(self):
+        with self.__lock:
+            return sum(1 for key in self.__storage if key[0] == 'query')
+
+    def __valid_entries(self, kind):
+        now = datetime.now()
+        with self.__lock:
+            return [
+                (key, entry) for key, (entry, _, expires) in self.__storage.items()
+                if key[0] == kind and (expires is None or expires > now)
+            ]
+
+    def iter_queries(self):
+        for _, cached in self.__valid_entries('query'):
+            if isinstance(cached.response, bytes):
+                cached = cached._replace(response=codec_lib.PayloadCompressor.unpack(cached.response))
+            yield cached
+
+    def iter_objects(self):
+        for (_, uid, name), (resource, last_load) in self.__valid_entries('object'):
+            yield CachedObject(uid, name, resource, last_load)
+
+    def sweep_expired(self, batch_size=1000):
+        now = datetime.now()
+        with self.__lock:
+            expired = [key for key, (_, _, expires) in self.__storage.items() if expires is not None and expires <= now]
+            for key in expired:
+                self.__evict(key)
+        return expired.__len__()
+
+    @property
+    def size(self):
+        """
+        Łączny rozmiar wpisów w bajtach.
+
+        :rtype: int
+        """
+        return self.__size
+
+    def about_backend(self):
+        return f'In-memory LRU cache ({self.__storage.__len__()}/{self.max_entries} entries, ' \
+               f'{self.__size}/{self.max_bytes} bytes)'
+
+    def __len__(self):
+        return self.__storage.__len__()
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} with {self.__len__()} entries taking {self.__size} bytes>'
+
+
+class TieredCache(CacheBase):
+    """
+    Dwupoziomowy cache: mały i szybki cache w pamięci procesu (L1) przed wolniejszym, współdzielonym cache (L2),
+    np. :class:`AlchemyCache` na wspólnej bazie PostgreSQL.
+
+    Odczyty sprawdzają najpierw L1, a trafienie w L2 jest kopiowane do L1 (razem z oryginalnym ``last_load``).
+    Zapisy i usunięcia trafiają do obu poziomów, wpis w L1 nie żyje dłużej niż ``ttl`` zapisu ani niż ``ttl`` L1.
+    """
+
+    def __init__(self, l2, l1=None):
+        """
+        :param CacheBase l2: Wolniejszy, współdzielony cache
+        :param CacheBase l1: Szybki cache, domyślnie :class:`MemoryCache` na 1024 wpisy ważne 5 minut
+        """
+        self.l1 = MemoryCache(max_entries=1024, ttl=timedelta(minutes=5)) if l1 is None else l1
+        self.l2 = l2
+        # Obiekty z L2 są przepisywane do L1, więc muszą zachować dane z API
+        self.l2.keep_resources()
+
+    def __l1_ttl(self, ttl):
+        limit = getattr(self.l1, 'ttl', None)
+        if ttl is None or limit is None:
+            return ttl
+        return min(ttl, limit)
+
+    @property
+    def syn_session(self):
+        return self.l2.syn_session
+
+    @syn_session.setter
+    def syn_session(self, session):
+        self.l1.syn_session = session
+        self.l2.syn_session = session
+
+    def add_object(self, uid, cls, resource, last_load=None, ttl=None):
+        self.l2.add_object(uid, cls, resource, last_load, ttl)
+        self.l1.add_object(uid, cls, resource, last_load, self.__l1_ttl(ttl))
+
+    def add_objects(self, objects, ttl=None):
+        objects = list(objects)
+        self.l2.add_objects(objects, ttl)
+        self.l1.add_objects(objects, self.__l1_ttl(ttl))
+
+    def get_object(self, uid, cls, session=None):
+        instance = self.l1.get_object(uid, cls, session)
+        if instance is None:
+            instance = self.l2.get_object(uid, cls, session)
+            if instance is not None:
+                self.__fill_l1(cls, {uid: instance})
+        self.stats.add(cls.__name__, 'misses' if instance is None else 'hits')
+        return instance
+
+    def get_objects(self, uids, cls, session=None):
+        found = self.l1.get_objects(uids, cls, session)
+        missing = [uid for uid in uids if str(uid) not in found]
+        if missing:
+            from_l2 = self.l2.get_objects(missing, cls, session)
+            self.__fill_l1(cls, from_l2)
+            found.update(from_l2)
+        self.stats.add(cls.__name__, 'hits', found.__len__())
+        self.stats.add(cls.__name__, 'misses', uids.__len__() - found.__len__())
+        return found
+
+    def __fill_l1(self, cls, instances):
+        # Własne backendy składają obiekty przez cls.assembly, bez danych z API, takich obiektów nie da się
+        # przepisać do L1
+        kept = [(uid, cls, instance._json_resource) for uid, instance in instances.items()
+                if instance._json_resource is not None]
+        if kept.__len__() < instances.__len__():
+            logging.debug('%s does not keep resources, %s objects not copied to L1',
+                          self.l2.__class__.__name__, instances.__len__() - kept.__len__())
+        if kept:
+            self.l1.add_objects(kept)
+
+    def del_object(self, uid):
+        self.l1.del_object(uid)
+        self.l2.del_object(uid)
+
+    def clear_objects(self):
+        self.l1.clear_objects()
+        self.l2.clear_objects()
+
+    def count_object(self):
+        return self.l2.count_object()
+
+    def add_query(self, uri, response, user_id, last_load=None, ttl=None):
+        self.l2.add_query(uri, response, user_id, last_load, ttl)
+        self.l1.add_query(uri, response, user_id, last_load, self.__l1_ttl(ttl))
+
+    def add_queries(self, queries, ttl=None):
+        queries = list(queries)
+        self.l2.add_queries(queries, ttl)
+        self.l1.add_queries(queries, self.__l1_ttl(ttl))
+
+    def get_query(self, uri, user_id):
+        cached = self.l1.get_query(uri, user_id)
+        if cached is None:
+            cached = self.l2.get_query(uri, user_id)
+            if cached is not None:
+                self.l1.add_query(uri, cached.response, user_id, cached.last_load)
+        self.stats.add(endpoint_name(uri), 'misses' if cached is None else 'hits')
+        return cached
+
+    def del_query(self, uri, user_id):
+        self.l1.del_query(uri, user_id)
+        self.l2.del_query(uri, user_id)
+
+    def clear_queries(self):
+        self.l1.clear_queries()
+        self.l2.clear_queries()
+
+    def count_queries(self):
+        return self.l2.count_queries()
+
+    def iter_queries(self):
+        return self.l2.iter_queries()
+
+    def iter_objects(self):
+        return self.l2.iter_objects()
+
+    def keep_instances(self, max_size=4096, lifetime=timedelta(minutes=1)):
+        """
+        Włącza trzymanie złożonych obiektów w L1, patrz :meth:`CacheBase.keep_instances`.
+        """
+        self.l1.keep_instances(max_size, lifetime)
+        return self
+
+    def sweep_expired(self, batch_size=1000):
+        return self.l1.sweep_expired(batch_size) + self.l2.sweep_expired(batch_size)
+
+    def about_backend(self):
+        return f'L1: {self.l1.about_backend()}, L2: {self.l2.about_backend()}'
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} L1={self.l1!r} L2={self.l2!r}>'
+
+
+class RedisCache(CacheBase):
+    """
+    Cache w bazie klucz-wartość zgodnej z protokołem Redis (Redis, Valkey, KeyDB), współdzielony przez wiele
+    procesów.
+
+    Wpisy wygasają po stronie serwera (``SET ... PX``), obiekty są pobierane hurtowo przez ``MGET`` w jednym
+    pipeline, a wartości są zapisywane jako zwarty json ``[czas pobrania, dane]``.
+    """
+
+    MGET_CHUNK_SIZE = 1000
+
+    def __init__(self, client, prefix='librus:', ttl=timedelta(days=1), compression=None):
+        """
+        :param client: Klient bazy, np. ``redis.Redis()`` lub ``fakeredis.FakeRedis()``
+        :param str prefix: Prefiks kluczy
+        :param timedelta ttl: Czas, po którym wpis wygasa, None wyłącza wygasanie
+        :param librus_tricks.codec.PayloadCompressor compression: Kompresja zapisywanych wartości
+        """
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+        self.compression = compression
+        self.syn_session = None
+
+    def __query_key(self, uri, user_id):
+        return f'{self.prefix}q:{user_id}:{uri}'
+
+    def __object_key(self, uid, name):
+        return f'{self.prefix}o:{name}:{uid}'
+
+    def __dump(self, payload, last_load):
+        value = [round((last_load or datetime.now()).timestamp(), 3), payload]
+        if self.compression is None:
+            return codec_lib.dumpb(value)
+        return self.compression.pack(value)
+
+    @staticmethod
+    def __load(raw):
+        if raw[:1] in (b'[', '['):
+            timestamp, payload = codec_lib.loads(raw)
+        else:
+            timestamp, payload = codec_lib.PayloadCompressor.unpack(raw)
+        return datetime.fromtimestamp(timestamp), payload
+
+    def __set(self, client, key, value, ttl, name):
+        self.stats.add(name, 'bytes_stored', value.__len__())
+        ttl = self.ttl if ttl is None else ttl
+        if ttl is None:
+            client.set(key, value)
+        else:
+            client.set(key, value, px=max(1, int(ttl.total_seconds() * 1000)))
+
+    def __delete_matching(self, pattern):
+        keys = []
+        for key in self.client.scan_iter(match=pattern, count=self.MGET_CHUNK_SIZE):
+            keys.append(key)
+            if keys.__len__() >= self.MGET_CHUNK_SIZE:
+                self.client.delete(*keys)
+                keys = []
+        if keys:
+            self.client.delete(*keys)
+
+    def __count_matching(self, pattern):
+        return sum(1 for _ in self.client.scan_iter(match=pattern, count=self.MGET_CHUNK_SIZE))
+
+    def add_object(self, uid, cls, resource, last_load=None, ttl=None):
+        self._forget_instances([(uid, cls)])
+        self.__set(self.client, self.__object_key(uid, cls.__name__), self.__dump(resource, last_load), ttl,
+                   cls.__name__)
+
+    def add_objects(self, objects, ttl=None):
+        objects = list(objects)
+        self._forget_instances(objects)
+        pipe = self.client.pipeline(transaction=False)
+        for uid, cls, resource, *last_load in objects:
+            dumped = self.__dump(resource, last_load[0] if last_load else None)
+            self.__set(pipe, self.__object_key(uid, cls.__name__), dumped, ttl, cls.__name__)
+        pipe.execute()
+
+    def get_object(self, uid, cls, session=None):
+        session = session or self.syn_session
+        instance = self._kept_instance(uid, cls, session)
+        if instance is not None:
+            self.stats.add(cls.__name__, 'hits')
+            return instance
+        raw = self.client.get(self.__object_key(uid, cls.__name__))
+        self.stats.add(cls.__name__, 'misses' if raw is None else 'hits')
+        if raw is None:
+            return None
+        return self._assembly(uid, cls, self.__load(raw)[1], session)
+
+    def get_objects(self, uids, cls, session=None):
+        session = session or self.syn_session
+        kept = {}
+        for uid in uids:
+            instance = self._kept_instance(uid, cls, session)
+            if instance is not None:
+                kept[str(uid)] = instance
+        self.stats.add(cls.__name__, 'hits', kept.__len__())
+        uids = [str(uid) for uid in uids if str(uid) not in kept]
+        pipe = self.client.pipeline(transaction=False)
+        for chunk_start in range(0, uids.__len__(), self.MGET_CHUNK_SIZE):
+            chunk = uids[chunk_start:chunk_start + self.MGET_CHUNK_SIZE]
+            pipe.mget([self.__object_key(uid, cls.__name__) for uid in chunk])
+        raws = [raw for chunk in pipe.execute() for raw in chunk]
+        found = sum(1 for raw in raws if raw is not None)
+        self.stats.add(cls.__name__, 'hits', found)
+        self.stats.add(cls.__name__, 'misses', raws.__len__() - found)
+        kept.update(
+            (uid, self._assembly(uid, cls, self.__load(raw)[1], session)) for uid, raw in zip(uids, raws)
+            if raw is not None
+        )
+        return kept
+
+    def del_object(self, uid):
+        self._forget_instances()
+        self.__delete_matching(self.__object_key(uid, '*'))
+
+    def clear_objects(self):
+        self._forget_instances()
+        self.__delete_matching(f'{self.prefix}o:*')
+
+    def count_object(self):
+        return self.__count_matching(f'{self.prefix}o:*')
+
+    def add_query(self, uri, response, user_id, last_load=None, ttl=None):
+        self.__set(self.client, self.__query_key(uri, user_id), self.__dump(response, last_load), ttl,
+                   endpoint_name(uri))
+
+    def add_queries(self, queries, ttl=None):
+        pipe = self.client.pipeline(transaction=False)
+        for query in queries:
+            self.__set(pipe, self.__query_key(query.uri, query.owner), self.__dump(query.response, query.last_load),
+                       ttl, endpoint_name(query.uri))
+        pipe.execute()
+
+    def get_query(self, uri, user_id):
+        """
+
+        :rtype: CachedQuery
+        """
+        raw = self.client.get(self.__query_key(uri, user_id))
+        self.stats.add(endpoint_name(uri), 'misses' if raw is None else 'hits')
+        if raw is None:
+            return None
+        last_load, response = self.__load(raw)
+        return CachedQuery(uri, user_id, response, last_load)
+
+    def del_query(self, uri, user_id):
+        self.client.delete(self.__query_key(uri, user_id))
+
+    def clear_queries(self):
+        self.__delete_matching(f'{self.prefix}q:*')
+
+    def count_queries(self):
+        return self.__count_matching(f'{self.prefix}q:*')
+
+    def __iter_matching(self, pattern):
+        keys = []
+        for key in self.client.scan_iter(match=pattern, count=self.MGET_CHUNK_SIZE):
+            keys.append(key)
+            if keys.__len__() >= self.MGET_CHUNK_SIZE:
+                yield from zip(keys, self.client.mget(keys))
+                keys = []
+        if keys:
+            yield from zip(keys, self.client.mget(keys))
+
+    def __iter_entries(self, kind):
+        start = f'{self.prefix}{kind}:'.__len__()
+        for key, raw in self.__iter_matching(f'{self.prefix}{kind}:*'):
+            if raw is None:
+                continue
+            if isinstance(key, bytes):
+                key = key.decode('utf-8')
+            first, second = key[start:].split(':', 1)
+            yield first, second, self.__load(raw)
+
+    def iter_queries(self):
+        for owner, uri, (last_load, response) in self.__iter_entries('q'):
+            yield CachedQuery(uri, owner, response, last_load)
+
+    def iter_objects(self):
+        for name, uid, (last_load, resource) in self.__iter_entries('o'):
+            yield CachedObject(uid, name, resource, last_load)
+
+    def about_backend(self):
+        return f'Redis protocol cache {self.client!r} with prefix {self.prefix}'
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} {self.client!r} with prefix {self.prefix}>'
+
+
+class CacheSweeper:
+    """
+    Wątek w tle, który co ``interval`` usuwa wygasłe wpisy z cache (:meth:`CacheBase.sweep_expired`).
+
+    >>> sweeper = CacheSweeper(session.cache).start()
+    """
+
+    def __init__(self, cache, interval=timedelta(minutes=10), batch_size=1000):
+        """
+        :param CacheBase cache: Obiekt cache
+        :param timedelta interval: Odstęp pomiędzy kolejnymi przebiegami
+        :param int batch_size: Liczba wierszy usuwanych w jednej transakcji
+        """
+        self.cache = cache
+        self.interval = interval
+        self.batch_size = batch_size
+        self.__stopped = threading.Event()
+        self.__thread = None
+
+    def run_once(self):
+        """
+        :return: Liczba usuniętych wpisów
+        :rtype: int
+        """
+        try:
+            return self.cache.sweep_expired(self.batch_size)
+        except Exception as error:
+            logging.warning('Cache sweep failed: %r', error)
+            return 0
+
+    def __loop(self):
+        while not self.__stopped.wait(self.interval.total_seconds()):
+            self.run_once()
+
+    def start(self):
+        if self.__thread is None or not self.__thread.is_alive():
+            self.__stopped.clear()
+            self.__thread = threading.Thread(target=self.__loop, name='librus-cache-sweeper', daemon=True)
+            self.__thread.start()
+        return self
+
+    def stop(self):
+        self.__stopped.set()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} every {self.interval} for {self.cache!r}>'
+
+
 class AlchemyCache(CacheBase):
+    """
+    Cache w bazie danych obsługiwanej przez SQLAlchemy.
+
+    Wpisy są wyszukiwane po unikalnych indeksach ``(uri, owner)`` oraz ``(uid, name)``, a ich odświeżenie to jedno
+    zapytanie ``INSERT ... ON CONFLICT DO UPDATE`` (SQLite, PostgreSQL, MySQL). Baza w starym formacie jest
+    migrowana przy otwarciu, patrz :meth:`migrate_schema`.
+
+    Każdy wpis ma zapisany czas wygaśnięcia (``expires_at``), wygasłe wpisy nie są zwracane, a usuwa je
+    :meth:`sweep_expired` lub :class:`CacheSweeper`. Odczyty nie tworzą obiektów ORM, więc sesja SQLAlchemy nie
+    rośnie wraz z liczbą odczytanych wpisów.
+
+    Obiekt może być używany z wielu wątków: każdy wątek ma własną sesję, a każda operacja to osobna, krótka
+    transakcja. Bazy w plikach i bazy serwerowe korzystają z puli połączeń, baza ``:memory:`` ma jedno połączenie,
+    więc dostęp do niej jest szeregowany.
+    """
+
     Base = declarative_base()
+    UPSERT_CHUNK_SIZE = 500
 
-    def __init__(self, engine_uri='sqlite:///:memory:'):
-        engine = create_engine(engine_uri, connect_args={'check_same_thread': False}, poolclass=StaticPool)
+    def __init__(self, engine_uri='sqlite:///:memory:', ttl=timedelta(days=31), compression=None, engine_kwargs=None,
+                 pragmas=None):
+        """
+        :param str engine_uri: Adres bazy danych
+        :param timedelta ttl: Domyślny czas, po którym wpis wygasa, None wyłącza wygasanie
+        :param librus_tricks.codec.PayloadCompressor compression: Kompresja odpowiedzi, są one wtedy zapisywane
+            w kolumnie ``payload`` zamiast ``response``
+        :param dict engine_kwargs: Dodatkowe argumenty ``create_engine``, np. ``pool_size`` i ``max_overflow``
+        :param dict pragmas: Pragmy SQLite ustawiane dla każdego nowego połączenia, np. ``{'synchronous': 'NORMAL'}``
+        """
+        url = make_url(engine_uri)
+        options = {'json_serializer': codec_lib.dumps, 'json_deserializer': codec_lib.loads}
+        in_memory = url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+        if url.get_backend_name() == 'sqlite':
+            options['connect_args'] = {'check_same_thread': False}
+        if in_memory:
+            options['poolclass'] = StaticPool
+        else:
+            options['pool_pre_ping'] = True
+        options.update(engine_kwargs or dict())
 
-        db_session = sessionmaker(bind=engine)
-        db_session.configure(bind=engine)
-        self.session = db_session()
-        self.Base.metadata.create_all(engine)
+        self.engine = create_engine(url, **options)
+        if pragmas:
+            event.listen(self.engine, 'connect', lambda connection, _: self.__apply_pragmas(connection, pragmas))
+        self.session = scoped_session(sessionmaker(bind=self.engine, expire_on_commit=False))
+        self.__lock = threading.RLock() if in_memory else None
+        self.ttl = ttl
+        self.compression = compression
+        self.migrate_schema()
         self.syn_session = None
 
+    @classmethod
+    def on_disk(cls, path, ttl=timedelta(days=31), compression=None, mmap_size=256 * 1024 * 1024,
+                cache_size=64 * 1024 * 1024, synchronous='NORMAL', busy_timeout=timedelta(seconds=10)):
+        """
+        Trwały cache w pliku SQLite, przeżywający restart procesu i bezpieczny dla wielu procesów naraz.
+
+        Baza działa w trybie WAL (odczyty nie czekają na zapisy), plik jest mapowany do pamięci, a ``synchronous``
+        NORMAL w trybie WAL nie wykonuje fsync przy każdym zatwierdzeniu (po awarii systemu można stracić
+        ostatnie zapisy, ale baza pozostaje spójna).
+
+        >>> session = create_session('email', 'hasło', cache=cache.AlchemyCache.on_disk('librus.sqlite'))
+
+        :param str path: Ścieżka do pliku bazy
+        :param int mmap_size: Rozmiar pliku mapowanego do pamięci w bajtach
+        :param int cache_size: Rozmiar cache stron SQLite w bajtach (dla każdego połączenia)
+        :param str synchronous: ``OFF``, ``NORMAL`` lub ``FULL``
+        :param timedelta busy_timeout: Czas oczekiwania na zwolnienie blokady przez inny proces
+        :rtype: AlchemyCache
+        """
+        return cls(f'sqlite:///{path}', ttl=ttl, compression=compression, pragmas={
+            'journal_mode': 'WAL',
+            'synchronous': synchronous,
+            'mmap_size': mmap_size,
+            'cache_size': -(cache_size // 1024),
+            'busy_timeout': int(busy_timeout.total_seconds() * 1000),
+            'temp_store': 'MEMORY',
+        })
+
+    @staticmethod
+    def __apply_pragmas(connection, pragmas):
+        cursor = connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+        cursor.close()
+
     class APIQueryCache(Base):
-        __tablename__ = 'uri_cache'
+        __tablename__ = 'api_query_cache'
+        __table_args__ = (UniqueConstraint('uri', 'owner', name='uq_api_query_cache_uri_owner'),)
 
         pk = Column(Integer(), primary_key=True)
-        uri = Column(String(length=512))
-        owner = Column(String(length=16))
-        response = Column(JSON())
+        uri = Column(String(length=512), nullable=False)
+        owner = Column(String(length=16), nullable=False)
+        response = Column(JSON(none_as_null=True))
+        payload = Column(LargeBinary())
         last_load = Column(DateTime())
+        expires_at = Column(DateTime(), index=True)
 
     class ObjectLoadCache(Base):
-        __tablename__ = 'object_cache'
+        __tablename__ = 'object_load_cache'
 
-        uid = Column(Integer(), primary_key=True)
-        name = Column(String(length=64))
+        uid = Column(Integer(), primary_key=True, autoincrement=False)
+        name = Column(String(length=64), primary_key=True)
         resource = Column(JSON())
         last_load = Column(DateTime())
+        expires_at = Column(DateTime(), index=True)
 
-    def add_object(self, uid, cls, resource):
-        self.session.add(
-            self.ObjectLoadCache(uid=uid, name=cls.__name__, resource=resource, last_load=datetime.now())
-        )
-        self.session.commit()
+    LEGACY_TABLES = {'uri_cache': APIQueryCache, 'object_cache': ObjectLoadCache}
+
+    @contextmanager
+    def transaction(self):
+        """
+        Krótka transakcja w sesji bieżącego wątku, zatwierdzana na końcu bloku i wycofywana po wyjątku.
+        Po jej zakończeniu połączenie wraca do puli, a sesja zostaje w wątku do następnej operacji.
 
-    def get_object(self, uid, cls):
+        >>> with cache.transaction() as db_session:
+        ...     db_session.execute(...)
         """
+        if self.__lock is not None:
+            self.__lock.acquire()
+        db_session = self.session()
+        try:
+            yield db_session
+            db_session.commit()
+        except BaseException:
+            db_session.rollback()
+            raise
+        finally:
+            if self.__lock is not None:
+                self.__lock.release()
 
-        :rtype: AlchemyCache.ObjectLoadCache
+    def migrate_schema(self):
+        """
+        Tworzy brakujące tabele, kolumny i indeksy oraz przenosi dane z tabel w starym formacie (``uri_cache``,
+        ``object_cache``), zostawiając najnowszy wpis dla każdego klucza. Stare tabele są usuwane.
         """
-        response = self.session.query(self.ObjectLoadCache).filter_by(uid=uid, name=cls.__name__).first()
-        if response is None:
+        self.Base.metadata.create_all(self.engine)
+        inspector = inspect(self.engine)
+        existing = inspector.get_table_names()
+
+        for model in (self.APIQueryCache, self.ObjectLoadCache):
+            table = model.__table__
+            columns = {column['name'] for column in inspector.get_columns(table.name)}
+            with self.transaction() as db_session:
+                for column in table.columns:
+                    if column.name not in columns:
+                        logging.info('Adding column %s to cache table %s', column.name, table.name)
+                        column_type = column.type.compile(dialect=self.engine.dialect)
+                        db_session.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                        if column.name == 'expires_at':
+                            db_session.execute(table.update().values(expires_at=self.__expires_at(datetime.now(),
+                                                                                                  None)))
+            indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in indexes:
+                    index.create(self.engine)
+
+        for legacy_name, model in self.LEGACY_TABLES.items():
+            if legacy_name not in existing:
+                continue
+            logging.info('Migrating cache table %s to %s', legacy_name, model.__tablename__)
+            legacy = Table(legacy_name, MetaData(), autoload_with=self.engine)
+            columns = [column.name for column in model.__table__.columns
+                       if column.name in legacy.c and column is not model.__table__.autoincrement_column]
+            with self.transaction() as db_session:
+                rows = db_session.execute(
+                    select(*[legacy.c[name] for name in columns]).order_by(legacy.c.last_load)
+                ).mappings()
+                # Wiersze są posortowane po dacie, więc upsert zostawia najnowszy
+                self.__upsert(db_session, model, (
+                    dict(row, expires_at=self.__expires_at(row['last_load'], None)) for row in rows
+                ))
+            legacy.drop(self.engine)
+
+    def __expires_at(self, last_load, ttl):
+        ttl = self.ttl if ttl is None else ttl
+        if ttl is None or last_load is None:
             return None
-        return cls.assembly(response.resource, self.syn_session)
+        return last_load + ttl
+
+    @staticmethod
+    def __not_expired(model):
+        return or_(model.expires_at.is_(None), model.expires_at > datetime.now())
 
-    def add_query(self, uri, response, user_id):
-        self.session.add(
-            self.APIQueryCache(uri=uri, response=response, last_load=datetime.now(), owner=user_id)
+    def __conflict_keys(self, model):
+        if model is self.APIQueryCache:
+            return ['uri', 'owner']
+        return ['uid', 'name']
+
+    def __upsert_statement(self, model, rows):
+        dialect = self.engine.dialect.name
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        elif dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialect in ('mysql', 'mariadb'):
+            from sqlalchemy.dialects.mysql import insert
+
+            statement = insert(model.__table__).values(rows)
+            return statement.on_duplicate_key_update(
+                {name: statement.inserted[name] for name in rows[0] if name not in self.__conflict_keys(model)}
+            )
+        else:
+            return None
+
+        statement = insert(model.__table__).values(rows)
+        return statement.on_conflict_do_update(
+            index_elements=self.__conflict_keys(model),
+            set_={name: statement.excluded[name] for name in rows[0] if name not in self.__conflict_keys(model)}
         )
-        self.session.commit()
+
+    def __upsert(self, db_session, model, rows):
+        """
+        Wstawia lub nadpisuje wiersze w bieżącej transakcji. Dla baz bez natywnego upsert usuwa istniejące
+        wiersze przed wstawieniem.
+        """
+        keys = self.__conflict_keys(model)
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if chunk.__len__() >= self.UPSERT_CHUNK_SIZE:
+                self.__upsert_chunk(db_session, model, keys, chunk)
+                chunk = []
+        if chunk:
+            self.__upsert_chunk(db_session, model, keys, chunk)
+
+    def __upsert_chunk(self, db_session, model, keys, chunk):
+        # Jedno zapytanie nie może dwa razy zmienić tego samego wiersza
+        chunk = list({tuple(row[key] for key in keys): row for row in chunk}.values())
+        statement = self.__upsert_statement(model, chunk)
+        if statement is not None:
+            db_session.execute(statement)
+            return
+
+        table = model.__table__
+        for row in chunk:
+            db_session.execute(
+                table.delete().where(*[table.c[key] == row[key] for key in keys])
+            )
+        db_session.execute(table.insert(), chunk)
+
+    def add_object(self, uid, cls, resource, last_load=None, ttl=None):
+        self._forget_instances([(uid, cls)])
+        last_load = last_load or datetime.now()
+        with self.transaction() as db_session:
+            self.__upsert(db_session, self.ObjectLoadCache, [{
+                'uid': uid, 'name': cls.__name__, 'resource': resource, 'last_load': last_load,
+                'expires_at': self.__expires_at(last_load, ttl)
+            }])
+
+    def add_objects(self, objects, ttl=None):
+        objects = list(objects)
+        self._forget_instances(objects)
+        with self.transaction() as db_session:
+            self.__upsert(db_session, self.ObjectLoadCache, self.__object_rows(objects, ttl))
+
+    def __object_rows(self, objects, ttl):
+        now = datetime.now()
+        for uid, cls, resource, *last_load in objects:
+            last_load = (last_load[0] if last_load else None) or now
+            yield {'uid': uid, 'name': cls.__name__, 'resource': resource, 'last_load': last_load,
+                   'expires_at': self.__expires_at(last_load, ttl)}
+
+    def get_object(self, uid, cls, session=None):
+        session = session or self.syn_session
+        instance = self._kept_instance(uid, cls, session)
+        if instance is not None:
+            self.stats.add(cls.__name__, 'hits')
+            return instance
+        with self.transaction() as db_session:
+            resource = db_session.execute(
+                select(self.ObjectLoadCache.resource).where(
+                    self.ObjectLoadCache.uid == uid, self.ObjectLoadCache.name == cls.__name__,
+                    self.__not_expired(self.ObjectLoadCache)
+                )
+            ).scalar()
+        self.stats.add(cls.__name__, 'misses' if resource is None else 'hits')
+        if resource is None:
+            return None
+        return self._assembly(uid, cls, resource, session)
+
+    def get_objects(self, uids, cls, session=None):
+        session = session or self.syn_session
+        kept = {}
+        for uid in uids:
+            instance = self._kept_instance(uid, cls, session)
+            if instance is not None:
+                kept[str(uid)] = instance
+        self.stats.add(cls.__name__, 'hits', kept.__len__())
+        uids = [int(uid) for uid in uids if str(uid).isdigit() and str(uid) not in kept]
+        resources = []
+        with self.transaction() as db_session:
+            for chunk_start in range(0, uids.__len__(), self.UPSERT_CHUNK_SIZE):
+                resources.extend(db_session.execute(
+                    select(self.ObjectLoadCache.uid, self.ObjectLoadCache.resource).where(
+                        self.ObjectLoadCache.name == cls.__name__,
+                        self.ObjectLoadCache.uid.in_(uids[chunk_start:chunk_start + self.UPSERT_CHUNK_SIZE]),
+                        self.__not_expired(self.ObjectLoadCache)
+                    )
+                ).all())
+        self.stats.add(cls.__name__, 'hits', resources.__len__())
+        self.stats.add(cls.__name__, 'misses', uids.__len__() - resources.__len__())
+        kept.update((str(uid), self._assembly(uid, cls, resource, session)) for uid, resource in resources)
+        return kept
+
+    def add_query(self, uri, response, user_id, last_load=None, ttl=None):
+        self.add_queries([CachedQuery(uri, user_id, response, last_load)], ttl)
+
+    def add_queries(self, queries, ttl=None):
+        rows = list(self.__query_rows(queries, ttl))
+        with self.transaction() as db_session:
+            self.__upsert(db_session, self.APIQueryCache, rows)
+
+    def __query_rows(self, queries, ttl):
+        now = datetime.now()
+        for uri, owner, response, last_load in queries:
+            last_load = last_load or now
+            payload = None
+            if self.compression is not None:
+                response, payload = None, self.compression.pack(response)
+                self.stats.add(endpoint_name(uri), 'bytes_stored', payload.__len__())
+            yield {'uri': uri, 'owner': owner, 'response': response, 'payload': payload, 'last_load': last_load,
+                   'expires_at': self.__expires_at(last_load, ttl)}
 
     def get_query(self, uri, user_id):
         """
 
-        :rtype: AlchemyCache.APIQueryCache
+        :rtype: CachedQuery
         """
-        return self.session.query(self.APIQueryCache).filter_by(uri=uri, owner=user_id).first()
+        with self.transaction() as db_session:
+            row = db_session.execute(
+                select(self.APIQueryCache.response, self.APIQueryCache.payload, self.APIQueryCache.last_load).where(
+                    self.APIQueryCache.uri == uri, self.APIQueryCache.owner == user_id,
+                    self.__not_expired(self.APIQueryCache)
+                )
+            ).first()
+        self.stats.add(endpoint_name(uri), 'misses' if row is None else 'hits')
+        if row is None:
+            return None
+        if row.payload is not None:
+            return CachedQuery(uri, user_id, codec_lib.PayloadCompressor.unpack(row.payload), row.last_load)
+        return CachedQuery(uri, user_id, row.response, row.last_load)
 
     def del_query(self, uri, user_id):
-        self.session.query(self.APIQueryCache).filter_by(uri=uri, owner=user_id).delete()
-        self.session.commit()
+        with self.transaction() as db_session:
+            db_session.execute(self.APIQueryCache.__table__.delete().where(
+                self.APIQueryCache.uri == uri, self.APIQueryCache.owner == user_id
+            ))
 
     def del_object(self, uid):
-        self.session.query(self.ObjectLoadCache).filter_by(uid=uid).delete()
-        self.session.commit()
+        self._forget_instances()
+        with self.transaction() as db_session:
+            db_session.execute(self.ObjectLoadCache.__table__.delete().where(self.ObjectLoadCache.uid == uid))
 
     def clear_queries(self):
-        self.session.query(self.APIQueryCache).delete()
+        with self.transaction() as db_session:
+            db_session.execute(self.APIQueryCache.__table__.delete())
 
     def clear_objects(self):
-        self.session.query(self.ObjectLoadCache).delete()
+        self._forget_instances()
+        with self.transaction() as db_session:
+            db_session.execute(self.ObjectLoadCache.__table__.delete())
 
     def count_object(self):
-        return self.session.query(self.ObjectLoadCache).count()
+        with self.transaction() as db_session:
+            return db_session.execute(select(func.count()).select_from(self.ObjectLoadCache)).scalar()
+
+    def count_queries(self):
+        with self.transaction() as db_session:
+            return db_session.execute(select(func.count()).select_from(self.APIQueryCache)).scalar()
+
+    def sweep_expired(self, batch_size=1000):
+        """
+        Usuwa wygasłe wpisy partiami, każda partia to osobna, krótka transakcja.
+
+        :param int batch_size: Liczba wierszy usuwanych w jednej transakcji
+        :return: Liczba usuniętych wpisów
+        :rtype: int
+        """
+        removed = 0
+        for model in (self.APIQueryCache, self.ObjectLoadCache):
+            keys = [model.__table__.c[key] for key in model.__table__.primary_key.columns.keys()]
+            label = model.uri if model is self.APIQueryCache else model.name
+            while True:
+                with self.transaction() as db_session:
+                    batch = db_session.execute(
+                        select(label, *keys).where(model.expires_at <= datetime.now()).limit(batch_size)
+                    ).all()
+                    if not batch:
+                        break
+                    if keys.__len__() == 1:
+                        condition = keys[0].in_([row[1] for row in batch])
+                    else:
+                        condition = tuple_(*keys).in_([tuple(row[1:]) for row in batch])
+                    db_session.execute(model.__table__.delete().where(condition))
+                for row in batch:
+                    self.stats.add(endpoint_name(row[0]) if model is self.APIQueryCache else row[0], 'evictions')
+                removed += batch.__len__()
+        if removed:
+            logging.debug('Swept %s expired cache entries', removed)
+        return removed
+
+    def iter_queries(self):
+        """
+        Zwraca wpisy partiami po ``UPSERT_CHUNK_SIZE``, każda partia to osobna, krótka transakcja.
+
+        :rtype: collections.Iterable[CachedQuery]
+        """
+        model = self.APIQueryCache
+        last_pk = 0
+        while True:
+            with self.transaction() as db_session:
+                rows = db_session.execute(
+                    select(model.pk, model.uri, model.owner, model.response, model.payload, model.last_load)
+                    .where(model.pk > last_pk, self.__not_expired(model))
+                    .order_by(model.pk).limit(self.UPSERT_CHUNK_SIZE)
+                ).all()
+            if not rows:
+                return
+            for row in rows:
+                response = row.response if row.payload is None else codec_lib.PayloadCompressor.unpack(row.payload)
+                yield CachedQuery(row.uri, row.owner, response, row.last_load)
+            last_pk = rows[-1].pk
+
+    def iter_objects(self):
+        """
+        Zwraca obiekty partiami po ``UPSERT_CHUNK_SIZE``, każda partia to osobna, krótka transakcja.
+
+        :rtype: collections.Iterable[CachedObject]
+        """
+        model = self.ObjectLoadCache
+        with self.transaction() as db_session:
+            names = db_session.execute(select(model.name).distinct()).scalars().all()
+        for name in names:
+            last_uid = None
+            while True:
+                with self.transaction() as db_session:
+                    query = select(model.uid, model.resource, model.last_load).where(
+                        model.name == name, self.__not_expired(model)
+                    )
+                    if last_uid is not None:
+                        query = query.where(model.uid > last_uid)
+                    rows = db_session.execute(query.order_by(model.uid).limit(self.UPSERT_CHUNK_SIZE)).all()
+                if not rows:
+                    break
+                for row in rows:
+                    yield CachedObject(row.uid, name, row.resource, row.last_load)
+                last_uid = rows[-1].uid
+
+    def dispose(self):
+        """
+        Zamyka wszystkie połączenia z pulą.
+        """
+        self.session.remove()
+        self.engine.dispose()
 
     def about_backend(self):
-        return f'SQLAlchemy ORM {self.session.bind.dialect.name} {self.session.bind.dialect.driver}'
+        return f'SQLAlchemy ORM {self.engine.dialect.name} {self.engine.dialect.driver}'
 
     def __repr__(self):
-        return f'<{self.__class__.__name__} with {self.session.bind.dialect.name} backend using {self.session.bind.dialect.driver} driver ({self.session.bind.url})>'
+        return f'<{self.__class__.__name__} with {self.engine.dialect.name} backend using ' \
+               f'{self.engine.dialect.driver} driver ({self.engine.url})>'
@@ -1,21 +1,41 @@
+import copy
+from bisect import bisect_left, bisect_right
 from datetime import datetime, timedelta
 
-from librus_tricks.exceptions import SessionRequired, APIPathIsEmpty
+from librus_tricks.cache import StaleWhileRevalidate, max_lifetime_of
+from librus_tricks.exceptions import SessionRequired, APIPathIsEmpty, AsyncResolutionRequired, ResourceNotKept
+
+#: Czas ważności słowników szkoły (nauczyciele, przedmioty, kategorie), po dniu są odświeżane w tle
+DICTIONARY_LIFETIME = StaleWhileRevalidate(fresh=timedelta(days=1), max_age=timedelta(days=31))
 
 
 class _RemoteObjectsUIDManager:
     """
     Menadżer obiektów, które dopiero zostaną utworzone.
+
+    Nie ma własnych danych, id obiektów są zapisane w obiekcie nadrzędnym (``_relations``), więc menadżer jest
+    tworzony dopiero przy odwołaniu do ``objects``.
     """
 
-    def __init__(self, session, parent):
+    __slots__ = ('_parent',)
+
+    def __init__(self, parent):
         """
 
-        :param librus_tricks.core.SynergiaClient session: Obiekt sesji
+        :param _RelatedObjects parent: Obiekt, do którego należą powiązania
         """
-        self.__storage = dict()
-        self._session = session
-        self.__parent = parent
+        self._parent = parent
+
+    @property
+    def _session(self):
+        return self._parent._session
+
+    def __find(self, attr):
+        relations = self._parent._relations
+        for index in range(0, relations.__len__(), 3):
+            if relations[index] == attr:
+                return index
+        raise KeyError(attr)
 
     def set_object(self, attr, uid, cls):
         """
@@ -25,8 +45,13 @@ class _RemoteObjectsUIDManager:
         :param int uid: Id obiektu
         :param cls: Klasa obiektu
         """
-        self.__storage[attr] = uid, cls
-        # self.__parent.__setattr__(attr, cls.create(uid=uid, session=self.__session))
+        relations = self._parent._relations
+        try:
+            index = self.__find(attr)
+        except KeyError:
+            self._parent._relations = relations + (attr, uid, cls)
+        else:
+            self._parent._relations = relations[:index] + (attr, uid, cls) + relations[index + 3:]
         return self
 
     def set_value(self, attr, val):
@@ -36,9 +61,24 @@ class _RemoteObjectsUIDManager:
         :param str attr: Nazwa obiektu
         :param val: Obiekt
         """
-        self.__storage[attr] = val
+        if self._parent._resolved is None:
+            self._parent._resolved = dict()
+        self._parent._resolved[attr] = val
         return self
 
+    def pending(self):
+        """
+        Zwraca zapisane dane obiektów, które nie zostały jeszcze ustawione.
+
+        :return: dict w postaci ``{nazwa property: (id, klasa)}``
+        :rtype: dict
+        """
+        relations, resolved = self._parent._relations, self._parent._resolved or {}
+        return {
+            relations[index]: (relations[index + 1], relations[index + 2])
+            for index in range(0, relations.__len__(), 3) if relations[index] not in resolved
+        }
+
     def assembly(self, attr):
         """
         Pobiera wcześniej zapisany obiekt.
@@ -46,8 +86,12 @@ class _RemoteObjectsUIDManager:
         :param str attr: Nazwa property
         :return: Żądany obiekt
         """
-        uid, cls = self.__storage[attr]
-        return cls.create(uid=uid, session=self._session)
+        resolved = self._parent._resolved
+        if resolved is not None and attr in resolved:
+            return resolved[attr]
+        index = self.__find(attr)
+        uid, cls = self._parent._relations[index + 1:index + 3]
+        return cls.create(uid=uid, session=self._parent._session)
 
     def return_id(self, attr):
         """
@@ -57,29 +101,81 @@ class _RemoteObjectsUIDManager:
         :rtype: int
         :return: Id obiektu
         """
-        return self.__storage[attr][0]
+        return self._parent._relations[self.__find(attr) + 1]
+
+
+class _RelatedObjects:
+    """
+    Obiekt, który odwołuje się do innych obiektów dziennika przez ich id.
+    """
+
+    __slots__ = ('_session', '_relations', '_resolved')
+
+    def __init__(self, session):
+        self._session = session
+        self._relations = ()  # Płaska krotka (nazwa, id, klasa, nazwa, id, klasa, ...)
+        self._resolved = None
+
+    @property
+    def objects(self):
+        """
+        :rtype: _RemoteObjectsUIDManager
+        """
+        return _RemoteObjectsUIDManager(self)
+
+
+class GradeMetadata:
+    """Rodzaj oceny (cząstkowa, semestralna, końcowa lub ich propozycje)"""
+
+    __slots__ = ('is_constituent', 'is_semester_grade', 'is_semester_grade_proposition', 'is_final_grade',
+                 'is_final_grade_proposition')
 
+    def __init__(self, is_c, is_s, is_sp, is_f, is_fp):
+        self.is_constituent = is_c
+        self.is_semester_grade = is_s
+        self.is_semester_grade_proposition = is_sp
+        self.is_final_grade = is_f
+        self.is_final_grade_proposition = is_fp
 
-class SynergiaGenericClass:
+
+class SynergiaGenericClass(_RelatedObjects):
     """
     Klasa macierzysta dla obiektów dziennika Synergia.
+
+    Obiekty mają ``__slots__`` i nie przechowują danych z API, z których zostały złożone. Dane są zachowywane
+    (``export_resource``) tylko dla klas z ``keep_resource = True``.
     """
 
+    __slots__ = ('uid', '_json_resource', '__weakref__')
+
+    #: Czy obiekt zachowuje dane z API, z których został złożony
+    keep_resource = False
+
     def __init__(self, uid, resource, session):
         """
 
         :param str uid: Id żądanego obiektu
         :param librus_tricks.core.SynergiaClient session: Obiekt sesji
-        :param resource: ścieżka do źródła danych
-        :type resource: iterable of str
-        :param str extraction_key: str zawierający klucz do wyjęcia danych
         :param dict resource: dict zawierający gotowe dane (np. załadowane z cache)
         """
-
-        self._session = session
+        super().__init__(session)
         self.uid = uid
-        self.objects = _RemoteObjectsUIDManager(self._session, self)
-        self._json_resource = resource
+        self._json_resource = resource if self.keep_resource else None
+
+    def bind(self, session):
+        """
+        Zwraca obiekt powiązany z podaną sesją. Dla innej sesji tworzona jest płytka kopia, bez ponownego
+        przetwarzania danych w ``__init__``, a powiązane obiekty są pobierane od nowa przez nową sesję.
+
+        :param librus_tricks.core.SynergiaClient session: Obiekt sesji
+        :rtype: SynergiaGenericClass
+        """
+        if session is self._session:
+            return self
+        bound = copy.copy(self)
+        bound._session = session
+        bound._resolved = None
+        return bound
 
     # Of course i can comment it out, but for code completion props will be better
     # def __getattr__(self, name):
@@ -106,6 +202,7 @@ class SynergiaGenericClass:
         :param tuple of str path: Niezłożona ścieżka API
         :param librus_tricks.core.SynergiaClient session: Obiekt sesji
         :param str extraction_key: Klucz do wyciągnięcia danych
+        :param timedelta expire: Maksymalny czas ważności cache dla tego obiektu
         :return: Pobrany obiekt
         """
         import logging
@@ -113,14 +210,26 @@ class SynergiaGenericClass:
         if uid is None or session is None:
             raise SessionRequired()
 
-        maybe_response = session.cache.get_object(uid, cls)
+        maybe_instance = session.identity_map.get(cls, uid, expire)
+        if maybe_instance is not None:
+            session.stats.add(cls.__name__, 'hits')
+            return maybe_instance
+
+        maybe_response = session.cache.get_object(uid, cls, session=session)
         if not maybe_response is None:
             logging.debug('Returning %s %s from object cache', maybe_response, uid)
+            session.stats.add(cls.__name__, 'hits')
+            session.identity_map.put(cls, uid, maybe_response)
             return maybe_response
 
+        session.stats.add(cls.__name__, 'misses')
+
         if path == ('',):
             raise APIPathIsEmpty(f'Path for {cls.__name__} class is empty!')
 
+        if session.is_async:
+            raise AsyncResolutionRequired(f'{cls.__name__} {uid} is not loaded, use await session.resolve() first')
+
         response = session.get_cached_response(*path, uid, max_lifetime=expire)
         logging.debug('Returning %s %s object from response cache', cls.__name__, uid)
 
@@ -129,8 +238,24 @@ class SynergiaGenericClass:
 
         resource = response[extraction_key]
         self = cls(resource['Id'], resource, session)
+        session.identity_map.put(cls, uid, self)
+        session.cache.add_object(uid, cls, resource, ttl=max_lifetime_of(expire))
         return self
 
+    @classmethod
+    def create_defaults(cls):
+        """
+        Zwraca domyślne argumenty metody ``create`` (np. ścieżkę API i czas ważności cache).
+
+        :rtype: dict
+        """
+        import inspect
+
+        return {
+            name: parameter.default for name, parameter in inspect.signature(cls.create).parameters.items()
+            if parameter.default is not inspect.Parameter.empty
+        }
+
     @staticmethod
     def auto_extract(payload):
         """
@@ -146,6 +271,13 @@ class SynergiaGenericClass:
         return
 
     def export_resource(self):
+        """
+        :raises librus_tricks.exceptions.ResourceNotKept: Klasa nie zachowuje danych z API
+        :rtype: dict
+        """
+        if self._json_resource is None:
+            raise ResourceNotKept(f'{self.__class__.__name__} does not keep its resource, '
+                                  f'set {self.__class__.__name__}.keep_resource = True')
         return self._json_resource.copy()
 
     def __repr__(self):
@@ -169,13 +301,15 @@ class SynergiaGenericClass:
 
 
 class SynergiaTeacher(SynergiaGenericClass):
+    __slots__ = ('name', 'last_name')
+
     def __init__(self, uid, resource, session):
         super().__init__(uid, resource, session)
-        self.name = self._json_resource['FirstName']
-        self.last_name = self._json_resource['LastName']
+        self.name = resource['FirstName']
+        self.last_name = resource['LastName']
 
     @classmethod
-    def create(cls, uid=None, path=('Users',), session=None, extraction_key='User', expire=timedelta(days=31)):
+    def create(cls, uid=None, path=('Users',), session=None, extraction_key='User', expire=DICTIONARY_LIFETIME):
         return super().create(uid, path, session, extraction_key, expire)
 
     def __repr__(self):
@@ -186,12 +320,14 @@ class SynergiaTeacher(SynergiaGenericClass):
 
 
 class SynergiaStudent(SynergiaTeacher):
-    pass
+    __slots__ = ()
 
 
 class SynergiaGlobalClass(SynergiaGenericClass):
     """Klasa reprezentująca klasę (np. 1C)"""
 
+    __slots__ = ('alias', 'begin_date', 'end_date')
+
     def __init__(self, uid, resource, session):
         """
         Tworzy obiekt reprezentujący klasę (jako zbiór uczniów)
@@ -202,11 +338,11 @@ class SynergiaGlobalClass(SynergiaGenericClass):
         """
         super().__init__(uid, resource, session)
 
-        self.alias = f'{self._json_resource["Number"]}{self._json_resource["Symbol"]}'
-        self.begin_date = datetime.strptime(self._json_resource['BeginSchoolYear'], '%Y-%m-%d').date()
-        self.end_date = datetime.strptime(self._json_resource['EndSchoolYear'], '%Y-%m-%d').date()
+        self.alias = f'{resource["Number"]}{resource["Symbol"]}'
+        self.begin_date = datetime.strptime(resource['BeginSchoolYear'], '%Y-%m-%d').date()
+        self.end_date = datetime.strptime(resource['EndSchoolYear'], '%Y-%m-%d').date()
         self.objects.set_object(
-            'tutor', self._json_resource['ClassTutor']['Id'], SynergiaTeacher
+            'tutor', resource['ClassTutor']['Id'], SynergiaTeacher
         )
 
     @property
@@ -218,6 +354,8 @@ class SynergiaGlobalClass(SynergiaGenericClass):
 
 
 class SynergiaVirtualClass(SynergiaGenericClass):
+    __slots__ = ('name', 'number', 'symbol')
+
     def __init__(self, uid, resource, session):
         """
         Tworzy obiekt reprezentujący grupę uczniów
@@ -228,13 +366,13 @@ class SynergiaVirtualClass(SynergiaGenericClass):
         """
         super().__init__(uid, resource, session)
 
-        self.name = self._json_resource['Name']
-        self.number = self._json_resource['Number']
-        self.symbol = self._json_resource['Symbol']
+        self.name = resource['Name']
+        self.number = resource['Number']
+        self.symbol = resource['Symbol']
         self.objects.set_object(
-            'teacher', self._json_resource['Teacher']['Id'], SynergiaTeacher
+            'teacher', resource['Teacher']['Id'], SynergiaTeacher
         ).set_object(
-            'subject', self._json_resource['Subject']['Id'], SynergiaSubject
+            'subject', resource['Subject']['Id'], SynergiaSubject
         )
 
     def __repr__(self):
@@ -250,13 +388,15 @@ class SynergiaVirtualClass(SynergiaGenericClass):
 
 
 class SynergiaSubject(SynergiaGenericClass):
+    __slots__ = ('name', 'short_name')
+
     def __init__(self, uid, resource, session):
         super().__init__(uid, resource, session)
-        self.name = self._json_resource['Name']
-        self.short_name = self._json_resource['Short']
+        self.name = resource['Name']
+        self.short_name = resource['Short']
 
     @classmethod
-    def create(cls, uid=None, path=('Subjects',), session=None, extraction_key='Subject', expire=timedelta(days=31)):
+    def create(cls, uid=None, path=('Subjects',), session=None, extraction_key='Subject', expire=DICTIONARY_LIFETIME):
         return super().create(uid, path, session, extraction_key, expire)
 
     def __repr__(self):
@@ -267,6 +407,8 @@ class SynergiaSubject(SynergiaGenericClass):
 
 
 class SynergiaLesson(SynergiaGenericClass):
+    __slots__ = ()
+
     def __init__(self, uid, resource, session):
         """
         Klasa reprezentująca jednostkową lekcję
@@ -276,9 +418,9 @@ class SynergiaLesson(SynergiaGenericClass):
         super().__init__(uid, resource, session)
 
         self.objects.set_object(
-            'teacher', self._json_resource['Teacher']['Id'], SynergiaTeacher
+            'teacher', resource['Teacher']['Id'], SynergiaTeacher
         ).set_object(
-            'subject', self._json_resource['Subject']['Id'], SynergiaSubject
+            'subject', resource['Subject']['Id'], SynergiaSubject
         )
 
     @classmethod
@@ -295,6 +437,8 @@ class SynergiaLesson(SynergiaGenericClass):
 
 
 class SynergiaGradeCategory(SynergiaGenericClass):
+    __slots__ = ('count_to_the_average', 'name', 'obligation_to_perform', 'standard', 'weight')
+
     def __init__(self, uid, resource, session):
         super().__init__(uid, resource, session)
 
@@ -303,20 +447,20 @@ class SynergiaGradeCategory(SynergiaGenericClass):
                 return payload[extraction_key]
             return false_return
 
-        self.count_to_the_average = self._json_resource['CountToTheAverage']
-        self.name = self._json_resource['Name']
-        self.obligation_to_perform = self._json_resource['ObligationToPerform']
-        self.standard = self._json_resource['Standard']
-        self.weight = __try_to_extract(self._json_resource, 'Weight', false_return=0)
+        self.count_to_the_average = resource['CountToTheAverage']
+        self.name = resource['Name']
+        self.obligation_to_perform = resource['ObligationToPerform']
+        self.standard = resource['Standard']
+        self.weight = __try_to_extract(resource, 'Weight', false_return=0)
 
-        if 'Teacher' in self._json_resource.keys():
+        if 'Teacher' in resource.keys():
             self.objects.set_object(
-                'teacher', self._json_resource['Id'], SynergiaTeacher
+                'teacher', resource['Id'], SynergiaTeacher
             )
 
     @classmethod
     def create(cls, uid=None, path=('Grades', 'Categories'), session=None, extraction_key='Category',
-               expire=timedelta(days=31)):
+               expire=DICTIONARY_LIFETIME):
         return super().create(uid, path, session, extraction_key, expire)
 
     @property
@@ -331,14 +475,16 @@ class SynergiaGradeCategory(SynergiaGenericClass):
 
 
 class SynergiaGradeComment(SynergiaGenericClass):
+    __slots__ = ('text',)
+
     def __init__(self, uid, resource, session):
         super().__init__(uid, resource, session)
 
-        self.text = self._json_resource['Text']
+        self.text = resource['Text']
         self.objects.set_object(
-            'teacher', self._json_resource['AddedBy']['Id'], SynergiaTeacher
+            'teacher', resource['AddedBy']['Id'], SynergiaTeacher
         ).set_object(
-            'bind', self._json_resource['Grade']['Id'], SynergiaGrade
+            'bind', resource['Grade']['Id'], SynergiaGrade
         )
 
     def __str__(self):
@@ -362,20 +508,22 @@ class SynergiaGradeComment(SynergiaGenericClass):
 
 
 class SynergiaBaseTextGrade(SynergiaGenericClass):
+    __slots__ = ('add_date', 'date', 'grade', 'semester', 'visible')
+
     def __init__(self, uid, resource, session):
         super().__init__(uid, resource, session)
 
-        self.add_date = datetime.strptime(self._json_resource['AddDate'], '%Y-%m-%d %H:%M:%S')
-        self.date = datetime.strptime(self._json_resource['Date'], '%Y-%m-%d').date()
-        self.grade = self._json_resource['Grade']
-        self.semester = self._json_resource['Semester']
-        self.visible = self._json_resource['ShowInGradesView']
+        self.add_date = datetime.strptime(resource['AddDate'], '%Y-%m-%d %H:%M:%S')
+        self.date = datetime.strptime(resource['Date'], '%Y-%m-%d').date()
+        self.grade = resource['Grade']
+        self.semester = resource['Semester']
+        self.visible = resource['ShowInGradesView']
         self.objects.set_object(
-            'teacher', self._json_resource['AddedBy']['Id'], SynergiaTeacher
+            'teacher', resource['AddedBy']['Id'], SynergiaTeacher
         ).set_object(
-            'subject', self._json_resource['Subject']['Id'], SynergiaSubject
+            'subject', resource['Subject']['Id'], SynergiaSubject
         ).set_object(
-            'student', self._json_resource['Student']['Id'], SynergiaStudent
+            'student', resource['Student']['Id'], SynergiaStudent
         )
 
     @classmethod
@@ -397,36 +545,32 @@ class SynergiaBaseTextGrade(SynergiaGenericClass):
 
 
 class SynergiaGrade(SynergiaGenericClass):
+    __slots__ = ('add_date', 'date', 'grade', 'is_constituent', 'semester', 'metadata', '_comment_ids')
+
     def __init__(self, uid, resource, session):
         super().__init__(uid, resource, session)
 
-        class GradeMetadata:
-            def __init__(self, is_c, is_s, is_sp, is_f, is_fp):
-                self.is_constituent = is_c
-                self.is_semester_grade = is_s
-                self.is_semester_grade_proposition = is_sp
-                self.is_final_grade = is_f
-                self.is_final_grade_proposition = is_fp
-
-        self.add_date = datetime.strptime(self._json_resource['AddDate'], '%Y-%m-%d %H:%M:%S')
-        self.date = datetime.strptime(self._json_resource['Date'], '%Y-%m-%d').date()
-        self.grade = self._json_resource['Grade']
-        self.is_constituent = self._json_resource['IsConstituent']
-        self.semester = self._json_resource['Semester']
+        self.add_date = datetime.strptime(resource['AddDate'], '%Y-%m-%d %H:%M:%S')
+        self.date = datetime.strptime(resource['Date'], '%Y-%m-%d').date()
+        self.grade = resource['Grade']
+        self.is_constituent = resource['IsConstituent']
+        self.semester = resource['Semester']
         self.metadata = GradeMetadata(
-            self._json_resource['IsConstituent'],
-            self._json_resource['IsSemester'],
-            self._json_resource['IsSemesterProposition'],
-            self._json_resource['IsFinal'],
-            self._json_resource['IsFinalProposition']
+            resource['IsConstituent'],
+            resource['IsSemester'],
+            resource['IsSemesterProposition'],
+            resource['IsFinal'],
+            resource['IsFinalProposition']
         )
+        comments = resource.get('Comments')
+        self._comment_ids = None if comments is None else tuple(comment.get('Id') for comment in comments)
 
         self.objects.set_object(
-            'teacher', self._json_resource['AddedBy']['Id'], SynergiaTeacher
+            'teacher', resource['AddedBy']['Id'], SynergiaTeacher
         ).set_object(
-            'subject', self._json_resource['Subject']['Id'], SynergiaSubject
+            'subject', resource['Subject']['Id'], SynergiaSubject
         ).set_object(
-            'category', self._json_resource['Category']['Id'], SynergiaGradeCategory
+            'category', resource['Category']['Id'], SynergiaGradeCategory
         )
 
     @property
@@ -461,11 +605,11 @@ class SynergiaGrade(SynergiaGenericClass):
 
         :rtype: list of SynergiaGradeComment
         """
-        if self._json_resource.get('Comments') is not None:
+        if self._comment_ids is not None:
             return [
                 SynergiaGradeComment.create(
-                    uid=com.get('Id'), session=self._session
-                ) for com in self._json_resource.get('Comments')
+                    uid=uid, session=self._session
+                ) for uid in self._comment_ids
             ]
         return tuple()
 
@@ -516,16 +660,18 @@ class SynergiaGrade(SynergiaGenericClass):
 
 
 class SynergiaAttendanceType(SynergiaGenericClass):
+    __slots__ = ('color', 'is_presence_kind', 'name', 'short_name')
+
     def __init__(self, uid, resource, session):
         super().__init__(uid, resource, session)
-        self.color = self._json_resource['ColorRGB']
-        self.is_presence_kind = self._json_resource['IsPresenceKind']
-        self.name = self._json_resource['Name']
-        self.short_name = self._json_resource['Short']
+        self.color = resource['ColorRGB']
+        self.is_presence_kind = resource['IsPresenceKind']
+        self.name = resource['Name']
+        self.short_name = resource['Short']
 
     @classmethod
     def create(cls, uid=None, path=('Attendances', 'Types'), session=None, extraction_key='Type',
-               expire=timedelta(days=31)):
+               expire=DICTIONARY_LIFETIME):
         return super().create(uid, path, session, extraction_key, expire)
 
     def __repr__(self):
@@ -536,17 +682,19 @@ class SynergiaAttendanceType(SynergiaGenericClass):
 
 
 class SynergiaAttendance(SynergiaGenericClass):
+    __slots__ = ('add_date', 'date', 'lesson_no')
+
     def __init__(self, uid, resource, session):
         super().__init__(uid, resource, session)
-        self.add_date = datetime.strptime(self._json_resource['AddDate'], '%Y-%m-%d %H:%M:%S')
-        self.date = datetime.strptime(self._json_resource['Date'], '%Y-%m-%d').date()
-        self.lesson_no = int(self._json_resource['LessonNo'])
+        self.add_date = datetime.strptime(resource['AddDate'], '%Y-%m-%d %H:%M:%S')
+        self.date = datetime.strptime(resource['Date'], '%Y-%m-%d').date()
+        self.lesson_no = int(resource['LessonNo'])
         self.objects.set_object(
-            'teacher', self._json_resource['AddedBy']['Id'], SynergiaTeacher
+            'teacher', resource['AddedBy']['Id'], SynergiaTeacher
         ).set_object(
-            'student', self._json_resource['Student']['Id'], SynergiaStudent
+            'student', resource['Student']['Id'], SynergiaStudent
         ).set_object(
-            'type', self._json_resource['Type']['Id'], SynergiaAttendanceType
+            'type', resource['Type']['Id'], SynergiaAttendanceType
         ).set_object(
             'lesson', resource['Lesson']['Id'], SynergiaLesson
         )
@@ -592,15 +740,17 @@ class SynergiaAttendance(SynergiaGenericClass):
 
 
 class SynergiaExamCategory(SynergiaGenericClass):
+    __slots__ = ('name',)
+
     def __init__(self, uid, resource, session):
         super().__init__(uid, resource, session)
 
-        self.name = self._json_resource['Name']
-        self.objects.set_object('color', self._json_resource['Color']['Id'], SynergiaColor)
+        self.name = resource['Name']
+        self.objects.set_object('color', resource['Color']['Id'], SynergiaColor)
 
     @classmethod
     def create(cls, uid=None, path=('HomeWorks', 'Categories'), session=None, extraction_key='Category',
-               expire=timedelta(days=31)):
+               expire=DICTIONARY_LIFETIME):
         return super().create(uid, path, session, extraction_key, expire)
 
     @property
@@ -616,30 +766,32 @@ class SynergiaExamCategory(SynergiaGenericClass):
 
 
 class SynergiaExam(SynergiaGenericClass):
+    __slots__ = ('add_date', 'content', 'date', 'lesson', 'time_start', 'time_end', '__subject_present')
+
     def __init__(self, uid, resource, session):
 
         super().__init__(uid, resource, session)
 
-        self.add_date = datetime.strptime(self._json_resource['AddDate'], '%Y-%m-%d %H:%M:%S')
-        self.content = self._json_resource['Content']
-        self.date = datetime.strptime(self._json_resource['Date'], '%Y-%m-%d').date()
-        self.lesson = self._json_resource['LessonNo']
-        if self._json_resource['TimeFrom'] is None:
+        self.add_date = datetime.strptime(resource['AddDate'], '%Y-%m-%d %H:%M:%S')
+        self.content = resource['Content']
+        self.date = datetime.strptime(resource['Date'], '%Y-%m-%d').date()
+        self.lesson = resource['LessonNo']
+        if resource['TimeFrom'] is None:
             self.time_start = None
         else:
-            self.time_start = datetime.strptime(self._json_resource['TimeFrom'], '%H:%M:%S').time()
-        if self._json_resource['TimeTo'] is None:
+            self.time_start = datetime.strptime(resource['TimeFrom'], '%H:%M:%S').time()
+        if resource['TimeTo'] is None:
             self.time_end = None
         else:
-            self.time_end = datetime.strptime(self._json_resource['TimeTo'], '%H:%M:%S').time()
+            self.time_end = datetime.strptime(resource['TimeTo'], '%H:%M:%S').time()
 
         self.objects.set_object(
-            'teacher', self._json_resource['CreatedBy']['Id'], SynergiaTeacher
+            'teacher', resource['CreatedBy']['Id'], SynergiaTeacher
         ).set_object(
-            'category', self._json_resource['Category']['Id'], SynergiaExamCategory
+            'category', resource['Category']['Id'], SynergiaExamCategory
         )
-        if 'Subject' in self._json_resource:
-            self.objects.set_object('subject', self._json_resource['Subject']['Id'], SynergiaSubject)
+        if 'Subject' in resource:
+            self.objects.set_object('subject', resource['Subject']['Id'], SynergiaSubject)
             self.__subject_present = True
         else:
             self.__subject_present = False
@@ -680,13 +832,15 @@ class SynergiaExam(SynergiaGenericClass):
 
 
 class SynergiaColor(SynergiaGenericClass):
+    __slots__ = ('name', 'hex_rgb')
+
     def __init__(self, uid, resource, session):
         super().__init__(uid, resource, session)
-        self.name = self._json_resource['Name']
-        self.hex_rgb = self._json_resource['RGB']
+        self.name = resource['Name']
+        self.hex_rgb = resource['RGB']
 
     @classmethod
-    def create(cls, uid=None, path=('Colors',), session=None, extraction_key='Color', expire=timedelta(days=31)):
+    def create(cls, uid=None, path=('Colors',), session=None, extraction_key='Color', expire=DICTIONARY_LIFETIME):
         return super().create(uid, path, session, extraction_key, expire)
 
     def __repr__(self):
@@ -697,13 +851,15 @@ class SynergiaColor(SynergiaGenericClass):
 
 
 class SynergiaClassroom(SynergiaGenericClass):
+    __slots__ = ('name', 'symbol')
+
     def __init__(self, uid, resource, session):
         super().__init__(uid, resource, session)
-        self.name = self._json_resource['Name']
-        self.symbol = self._json_resource['Symbol']
+        self.name = resource['Name']
+        self.symbol = resource['Symbol']
 
     @classmethod
-    def create(cls, uid=None, path=('Classrooms',), session=None, extraction_key=None, expire=timedelta(days=31)):
+    def create(cls, uid=None, path=('Classrooms',), session=None, extraction_key=None, expire=DICTIONARY_LIFETIME):
         return super().create(uid, path, session, extraction_key, expire)
 
     def __repr__(self):
@@ -714,24 +870,28 @@ class SynergiaClassroom(SynergiaGenericClass):
 
 
 class SynergiaTeacherFreeDaysTypes(SynergiaGenericClass):
+    __slots__ = ('name',)
+
     def __init__(self, uid, resource, session):
         super().__init__(uid, resource, session)
-        self.name = self._json_resource[0]['Name']
+        self.name = resource[0]['Name']
 
 
 class SynergiaTeacherFreeDays(SynergiaGenericClass):
+    __slots__ = ('starts', 'ends', 'time_begin', 'time_ends')
+
     def __init__(self, uid, resource, session):
         super().__init__(uid, resource, session)
 
-        self.starts = datetime.strptime(self._json_resource['DateFrom'], '%Y-%m-%d').date()
-        self.ends = datetime.strptime(self._json_resource['DateTo'], '%Y-%m-%d').date()
+        self.starts = datetime.strptime(resource['DateFrom'], '%Y-%m-%d').date()
+        self.ends = datetime.strptime(resource['DateTo'], '%Y-%m-%d').date()
         self.objects.set_object(
-            'teacher', self._json_resource['Teacher']['Id'], SynergiaTeacher
+            'teacher', resource['Teacher']['Id'], SynergiaTeacher
         )
 
-        if self._json_resource.get('TimeTo') is not None:
-            self.time_begin = datetime.strptime(self._json_resource['TimeFrom'], '%H:%M:%S').time()
-            self.time_ends = datetime.strptime(self._json_resource['TimeTo'], '%H:%M:%S').time()
+        if resource.get('TimeTo') is not None:
+            self.time_begin = datetime.strptime(resource['TimeFrom'], '%H:%M:%S').time()
+            self.time_ends = datetime.strptime(resource['TimeTo'], '%H:%M:%S').time()
         else:
             self.time_begin = None
             self.time_ends = None
@@ -753,11 +913,13 @@ class SynergiaTeacherFreeDays(SynergiaGenericClass):
 
 
 class SynergiaSchoolFreeDays(SynergiaGenericClass):
+    __slots__ = ('starts', 'ends', 'name')
+
     def __init__(self, uid, resource, session):
         super().__init__(uid, resource, session)
-        self.starts = datetime.strptime(self._json_resource['DateFrom'], '%Y-%m-%d').date()
-        self.ends = datetime.strptime(self._json_resource['DateTo'], '%Y-%m-%d').date()
-        self.name = self._json_resource['Name']
+        self.starts = datetime.strptime(resource['DateFrom'], '%Y-%m-%d').date()
+        self.ends = datetime.strptime(resource['DateTo'], '%Y-%m-%d').date()
+        self.name = resource['Name']
 
     @classmethod
     def create(cls, uid=None, path=('Calendars', 'SchoolFreeDays'), session=None, extraction_key='SchoolFreeDays',
@@ -769,6 +931,8 @@ class SynergiaSchoolFreeDays(SynergiaGenericClass):
 
 
 class SynergiaTimetableEntry(SynergiaGenericClass):
+    __slots__ = ('available',)
+
     def __init__(self, uid, resource, session):
         super().__init__(uid, resource, session)
         self.available = datetime.strptime(resource['DateFrom'], '%Y-%m-%d').date(), \
@@ -780,8 +944,11 @@ class SynergiaTimetableEntry(SynergiaGenericClass):
         return super().create(uid, path, session, extraction_key, expire)
 
 
-class SynergiaTimetableEvent:
+class SynergiaTimetableEvent(_RelatedObjects):
+    __slots__ = ('lesson_no', 'start', 'end', 'is_cancelled', 'is_sub', 'preloaded')
+
     def __init__(self, resource, session):
+        super().__init__(session)
         self.lesson_no = int(resource['LessonNo'])  #: int: numer lekcji
         self.start = datetime.strptime(resource['HourFrom'], '%H:%M').time()  #: time: początek lekcji
         self.end = datetime.strptime(resource['HourTo'], '%H:%M').time()  #: time: koniec lekcji
@@ -791,7 +958,6 @@ class SynergiaTimetableEvent:
             'subject_title': resource['Subject']['Name'],
             'teacher': f'{resource["Teacher"]["FirstName"]} {resource["Teacher"]["LastName"]}'
         }
-        self.objects = _RemoteObjectsUIDManager(session, self)
         self.objects.set_object(
             'subject', resource['Subject']['Id'], SynergiaSubject
         ).set_object(
@@ -858,6 +1024,8 @@ class SynergiaTimetableEvent:
 
 
 class SynergiaTimetableDay:
+    __slots__ = ('lessons', 'day_start', 'day_end')
+
     def __init__(self, lessons):
         self.lessons = tuple(lessons)  #: tuple[SynergiaTimetableEvent]: krotka z lekcjami
         if self.lessons.__len__() != 0:
@@ -876,11 +1044,69 @@ class SynergiaTimetable(SynergiaGenericClass):
     Obiekt zawierający cały tydzień w planie lekcji
     """
 
+    __slots__ = ('days', '__starts', '__ends', '__lessons')
+
+    # Plan jest składany od nowa dla innej sesji, więc potrzebuje danych z API
+    keep_resource = True
+
     def __init__(self, uid, resource, session):
         super().__init__(uid, resource, session)
         self.days = self.convert_parsed_timetable(
             self.parse_timetable(resource)
         )  #: list[SynergiaTimetableDay]: lista z dniami tygodnia
+        self.__build_index()
+
+    def bind(self, session):
+        # Lekcje mają własne odwołania do sesji, więc plan jest składany od nowa
+        if session is self._session:
+            return self
+        return self.__class__(self.uid, self._json_resource, session)
+
+    def __build_index(self):
+        """
+        Układa lekcje z całego tygodnia według godziny rozpoczęcia, żeby wyszukiwać je przez bisekcję.
+        """
+        lessons = []
+        for day, timetable_day in self.days.items():
+            for event in timetable_day.lessons:
+                if isinstance(event, SynergiaTimetableEvent):
+                    lessons.append((datetime.combine(day, event.start), datetime.combine(day, event.end), event))
+        lessons.sort(key=lambda lesson: lesson[0])
+        self.__starts = [start for start, _, _ in lessons]
+        self.__ends = [end for _, end, _ in lessons]
+        self.__lessons = [event for _, _, event in lessons]
+
+    def current_lesson(self, at=None):
+        """
+        :param datetime at: Moment, domyślnie teraz
+        :return: Lekcja trwająca w podanym momencie lub None
+        :rtype: SynergiaTimetableEvent
+        """
+        at = at or datetime.now()
+        index = bisect_right(self.__starts, at) - 1
+        if index >= 0 and at < self.__ends[index]:
+            return self.__lessons[index]
+        return None
+
+    def next_lesson(self, at=None):
+        """
+        :param datetime at: Moment, domyślnie teraz
+        :return: Pierwsza lekcja rozpoczynająca się po podanym momencie (w tym tygodniu) lub None
+        :rtype: SynergiaTimetableEvent
+        """
+        index = bisect_right(self.__starts, at or datetime.now())
+        if index < self.__lessons.__len__():
+            return self.__lessons[index]
+        return None
+
+    def lessons_between(self, since, until):
+        """
+        :param datetime since: Początek przedziału
+        :param datetime until: Koniec przedziału
+        :return: Lekcje rozpoczynające się w przedziale ``[since, until)``
+        :rtype: tuple[SynergiaTimetableEvent]
+        """
+        return tuple(self.__lessons[bisect_left(self.__starts, since):bisect_left(self.__starts, until)])
 
     @property
     def today_timetable(self):
@@ -945,6 +1171,8 @@ class SynergiaTimetable(SynergiaGenericClass):
 
 
 class SynergiaNativeMessageAuthor(SynergiaGenericClass):
+    __slots__ = ('name',)
+
     def __init__(self, uid, resource, session):
         super().__init__(uid, resource, session)
         self.name = resource.get('Name')
@@ -967,12 +1195,14 @@ class SynergiaNativeMessageAuthor(SynergiaGenericClass):
 
 
 class SynergiaNativeMessage(SynergiaGenericClass):
+    __slots__ = ('body', 'topic', 'send_date')
+
     def __init__(self, uid, resource, session):
         super().__init__(uid, resource, session)
-        self.body = self._json_resource['Body']  #: str: wiadomość
-        self.topic = self._json_resource['Subject']  #: str: temat
-        self.send_date = datetime.fromtimestamp(self._json_resource['SendDate'])  #: datetime: data wysłania
-        self.objects.set_object('sender', self._json_resource['Sender']['Id'], SynergiaNativeMessageAuthor)
+        self.body = resource['Body']  #: str: wiadomość
+        self.topic = resource['Subject']  #: str: temat
+        self.send_date = datetime.fromtimestamp(resource['SendDate'])  #: datetime: data wysłania
+        self.objects.set_object('sender', resource['Sender']['Id'], SynergiaNativeMessageAuthor)
 
     @property
     def sender(self) -> SynergiaNativeMessageAuthor:
@@ -988,18 +1218,20 @@ class SynergiaNews(SynergiaGenericClass):
     Obiekt reprezentujący ogłoszenie szkolne
     """
 
+    __slots__ = ('content', 'created', 'unique_id', 'topic', 'was_read', 'starts', 'ends')
+
     def __init__(self, uid, resource, session):
         super().__init__(uid, resource, session)
-        self.content = self._json_resource['Content']  #: str: wiadomość ogłoszenia
-        self.created = datetime.strptime(self._json_resource['CreationDate'],
+        self.content = resource['Content']  #: str: wiadomość ogłoszenia
+        self.created = datetime.strptime(resource['CreationDate'],
                                          '%Y-%m-%d %H:%M:%S')  #: datetime: data utworzenia
-        self.unique_id = self._json_resource['Id']  #: int: id ogłoszenia
-        self.topic = self._json_resource['Subject']  #: str: temat
-        self.was_read = self._json_resource['WasRead']  #: bool: status odczytania?
-        self.starts = datetime.strptime(self._json_resource['StartDate'], '%Y-%m-%d')  #: date: ??
-        self.ends = datetime.strptime(self._json_resource['EndDate'], '%Y-%m-%d')  #: date: ??
+        self.unique_id = resource['Id']  #: int: id ogłoszenia
+        self.topic = resource['Subject']  #: str: temat
+        self.was_read = resource['WasRead']  #: bool: status odczytania?
+        self.starts = datetime.strptime(resource['StartDate'], '%Y-%m-%d')  #: date: ??
+        self.ends = datetime.strptime(resource['EndDate'], '%Y-%m-%d')  #: date: ??
         self.objects.set_object(
-            'teacher', self._json_resource['AddedBy']['Id'], SynergiaTeacher
+            'teacher', resource['AddedBy']['Id'], SynergiaTeacher
         )
 
     @property
@@ -1020,6 +1252,8 @@ class SynergiaSchool(SynergiaGenericClass):
     Obiekt zawierający informacje o szkole
     """
 
+    __slots__ = ('name', 'location')
+
     def __init__(self, uid, resource, session):
         super().__init__(uid, resource, session)
         self.name = resource['Name']  #: str: nazwa szkoły
@@ -1034,6 +1268,8 @@ class SynergiaSchool(SynergiaGenericClass):
 
 
 class SynergiaSubstitution(SynergiaGenericClass):
+    __slots__ = ()
+
     def __init__(self, uid, resource, session):
         super().__init__(uid, resource, session)
 
@@ -1044,6 +1280,8 @@ class SynergiaSubstitution(SynergiaGenericClass):
 
 
 class SynergiaRealization(SynergiaGenericClass):
+    __slots__ = ('topic', 'date', 'is_trip', 'teaching_program', 'lesson_no')
+
     def __init__(self, uid, resource, session):
         super().__init__(uid, resource, session)
         self.topic = resource['Topic']
@@ -1052,7 +1290,7 @@ class SynergiaRealization(SynergiaGenericClass):
         self.teaching_program = resource.get('TeachingProgramTopic')
         self.lesson_no = resource['LessonNo']
         self.objects.set_object(
-            'teacher', self._json_resource['AddedBy']['Id'], SynergiaTeacher
+            'teacher', resource['AddedBy']['Id'], SynergiaTeacher
         ).set_object(
             'lesson', resource['Lesson']['Id'], SynergiaLesson
         )
@@ -0,0 +1,194 @@
+import json
+import threading
+import zlib
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class JSONCodec:
+    """
+    Koder json oparty na bibliotece standardowej.
+    """
+
+    name = 'json'
+
+    def loads(self, data):
+        """
+        :param data: json jako str lub bytes
+        :return: Zdekodowany obiekt
+        """
+        return json.loads(data)
+
+    def dumps(self, obj):
+        """
+        :return: json jako str
+        :rtype: str
+        """
+        return json.dumps(obj, ensure_ascii=False)
+
+    def dumpb(self, obj):
+        """
+        :return: json jako bytes (UTF-8)
+        :rtype: bytes
+        """
+        return self.dumps(obj).encode('utf-8')
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} {self.name}>'
+
+
+class OrjsonCodec(JSONCodec):
+    """
+    Koder json oparty na bibliotece orjson.
+    """
+
+    name = 'orjson'
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+    def dumps(self, obj):
+        return orjson.dumps(obj).decode('utf-8')
+
+    def dumpb(self, obj):
+        return orjson.dumps(obj)
+
+
+if orjson is None:
+    _default_codec = JSONCodec()
+else:
+    _default_codec = OrjsonCodec()
+
+
+def get_default_codec():
+    """
+    Zwraca domyślny koder, orjson jeżeli jest zainstalowany, w przeciwnym razie json z biblioteki standardowej.
+
+    :rtype: JSONCodec
+    """
+    return _default_codec
+
+
+def set_default_codec(codec):
+    """
+    Ustawia domyślny koder dla całej biblioteki (sesji, cache i zapisu danych logowania).
+
+    :param JSONCodec codec: Obiekt posiadający metody ``loads``, ``dumps`` i ``dumpb``
+    """
+    global _default_codec
+    _default_codec = codec
+
+
+def loads(data):
+    return _default_codec.loads(data)
+
+
+def dumps(obj):
+    return _default_codec.dumps(obj)
+
+
+def dumpb(obj):
+    return _default_codec.dumpb(obj)
+
+
+class PayloadCompressor:
+    """
+    Kompresuje json zapisywany w cache.
+
+    Wynik to bajt znacznika (``j`` bez kompresji, ``z`` zlib, ``s`` zstd) i dane, więc odczyt nie zależy od
+    ustawień, z jakimi wpis został zapisany. Dane mniejsze niż ``threshold`` oraz takie, których kompresja nic nie
+    daje, są zapisywane bez kompresji.
+    """
+
+    ALGORITHMS = {'zlib': 6, 'zstd': 3}
+
+    def __init__(self, algorithm='zlib', level=None, threshold=1024):
+        """
+        :param str algorithm: ``zlib`` lub ``zstd`` (wymaga ``zstandard``)
+        :param int level: Poziom kompresji, domyślnie 6 dla zlib i 3 dla zstd
+        :param int threshold: Minimalny rozmiar json w bajtach, od którego dane są kompresowane
+        """
+        if algorithm not in self.ALGORITHMS:
+            raise ValueError(f'Unknown compression algorithm {algorithm}, use one of {tuple(self.ALGORITHMS)}')
+        if algorithm == 'zstd' and zstandard is None:
+            raise ImportError('zstd compression requires the zstandard package')
+        self.algorithm = algorithm
+        self.level = self.ALGORITHMS[algorithm] if level is None else level
+        self.threshold = threshold
+        self.__lock = threading.Lock()
+        self.__stats = self.__empty_stats()
+
+    @staticmethod
+    def __empty_stats():
+        return {'payloads': 0, 'compressed': 0, 'raw_bytes': 0, 'stored_bytes': 0}
+
+    def __compress(self, raw):
+        if self.algorithm == 'zstd':
+            return b's' + zstandard.ZstdCompressor(level=self.level).compress(raw)
+        return b'z' + zlib.compress(raw, self.level)
+
+    def pack(self, payload):
+        """
+        :param payload: Obiekt do zapisania jako json
+        :return: Spakowane dane
+        :rtype: bytes
+        """
+        raw = dumpb(payload)
+        packed = None
+        if raw.__len__() >= self.threshold:
+            packed = self.__compress(raw)
+            if packed.__len__() > raw.__len__():
+                packed = None
+        with self.__lock:
+            self.__stats['payloads'] += 1
+            self.__stats['raw_bytes'] += raw.__len__()
+            if packed is None:
+                self.__stats['stored_bytes'] += raw.__len__() + 1
+            else:
+                self.__stats['compressed'] += 1
+                self.__stats['stored_bytes'] += packed.__len__()
+        return b'j' + raw if packed is None else packed
+
+    @staticmethod
+    def unpack(data):
+        """
+        :param bytes data: Dane zwrócone przez :meth:`pack`
+        :return: Zdekodowany obiekt
+        """
+        data = bytes(data)
+        marker, body = data[:1], data[1:]
+        if marker == b'z':
+            body = zlib.decompress(body)
+        elif marker == b's':
+            if zstandard is None:
+                raise ImportError('zstd compressed payload requires the zstandard package')
+            body = zstandard.ZstdDecompressor().decompress(body)
+        elif marker != b'j':
+            raise ValueError(f'Unknown payload marker {marker!r}')
+        return loads(body)
+
+    def stats(self):
+        """
+        :return: Liczba spakowanych obiektów, liczba skompresowanych, rozmiar json, rozmiar po spakowaniu
+            i stosunek tych rozmiarów (``ratio``)
+        :rtype: dict
+        """
+        with self.__lock:
+            stats = self.__stats.copy()
+        stats['ratio'] = stats['stored_bytes'] / stats['raw_bytes'] if stats['raw_bytes'] else 1.0
+        return stats
+
+    def reset_stats(self):
+        with self.__lock:
+            self.__stats = self.__empty_stats()
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} {self.algorithm} level {self.level} from {self.threshold} bytes>'
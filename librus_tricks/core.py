@@ -1,19 +1,38 @@
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
+from urllib.parse import urlencode, urlparse
 
 import requests
 
 from librus_tricks import cache as cache_lib
+from librus_tricks import codec as codec_lib
 from librus_tricks import exceptions, tools
+from librus_tricks import transport as transport_lib
 from librus_tricks.classes import *
 from librus_tricks.messages import MessageReader
 
 
+HTTP_ERRORS = {
+    503: exceptions.SynergiaMaintenanceError,
+    500: exceptions.SynergiaServerError,
+    403: exceptions.SynergiaForbidden,
+    401: exceptions.SynergiaAccessDenied,
+    400: exceptions.SynergiaAPIInvalidRequest,
+}
+
+
 class SynergiaClient:
     """Sesja z API Synergii"""
 
+    is_async = False
+    in_flight = cache_lib.RequestCoalescer()  #: Wspólny dla wszystkich sesji, klucz zawiera id użytkownika i cache
+    revalidation_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='librus-revalidate')
+
     def __init__(self, user, api_url='https://api.librus.pl/2.0', user_agent='LibrusMobileApp',
-                 cache=cache_lib.AlchemyCache()):
+                 cache=cache_lib.AlchemyCache(), identity_map_size=4096, codec=None, transport=None, policy=None,
+                 stats=None, negative_cache_ttl=timedelta(minutes=5)):
         """
         Tworzy sesję z API Synergii.
 
@@ -21,13 +40,30 @@ class SynergiaClient:
         :param str api_url: Bazowy url api, zmieniaj jeżeli chcesz używać proxy typu beeceptor
         :param str user_agent: User-agent klienta http, domyślnie się podszywa pod aplikację
         :param librus_tricks.cache.CacheBase cache: Obiekt, który zarządza cache
+        :param int identity_map_size: Maksymalna liczba złożonych obiektów trzymanych w pamięci sesji,
+            0 wyłącza mapę tożsamości
+        :param librus_tricks.codec.JSONCodec codec: Koder json odpowiedzi, domyślnie
+            :func:`librus_tricks.codec.get_default_codec`
+        :param librus_tricks.transport.SynergiaTransport transport: Pula połączeń http, domyślnie wspólna dla
+            wszystkich sesji w procesie
+        :param librus_tricks.policy.RequestPolicy policy: Polityka ponowień, limitów i circuit breakera zapytań,
+            może być współdzielona przez wiele sesji, domyślnie brak
+        :param librus_tricks.cache.CacheStats stats: Statystyki cache i zapytań http, mogą być współdzielone przez
+            wiele sesji, domyślnie osobne dla sesji
+        :param timedelta negative_cache_ttl: Jak długo pamiętać odpowiedzi 404 i 403 (np. moduły wyłączone przez
+            szkołę), w tym czasie wyjątek jest rzucany bez zapytania http, None wyłącza
         """
         self.user = user
-        self.session = requests.session()
+        self.transport = transport_lib.get_default_transport() if transport is None else transport
+        self.session = self.transport.new_api_session()
 
         self.session.headers.update({'User-Agent': user_agent})
         self.__auth_headers = {'Authorization': f'Bearer {user.token}'}
         self.__api_url = api_url
+        self.__api_host = urlparse(api_url).netloc
+        self.policy = policy
+        self.stats = cache_lib.CacheStats() if stats is None else stats
+        self.negative_cache_ttl = negative_cache_ttl
 
         if cache_lib.CacheBase in cache.__class__.__bases__:
             self.cache = cache
@@ -35,6 +71,8 @@ class SynergiaClient:
         else:
             raise exceptions.InvalidCacheManager(f'{cache} can not be a cache object!')
 
+        self.identity_map = cache_lib.ObjectIdentityMap(identity_map_size)
+        self.codec = codec_lib.get_default_codec() if codec is None else codec
         self.__message_reader = None
 
     @property
@@ -73,40 +111,75 @@ class SynergiaClient:
         """
         Sprawdza czy serwer zgłasza błąd poprzez podanie kodu http, w przypadku błędu, rzuca wyjątkiem.
 
+        Odpowiedź jest dekodowana tylko raz, przez koder sesji (patrz :mod:`librus_tricks.codec`).
+
         :param requests.Response response:
         :raises librus_tricks.exceptions.SynergiaNotFound: 404
         :raises librus_tricks.exceptions.SynergiaForbidden: 403
         :raises librus_tricks.exceptions.SynergiaAccessDenied: 401
         :raises librus_tricks.exceptions.SynergiaInvalidRequest: 401
-        :rtype: requests.Response
-        :return: sprawdzona odpowiedź http
+        :raises librus_tricks.exceptions.SynergiaMaintenanceError: 503
+        :raises librus_tricks.exceptions.SynergiaServerError: Pozostałe 5xx
+        :rtype: dict
+        :return: sprawdzona i zdekodowana odpowiedź http
         """
         if callback_kwargs is None:
             callback_kwargs = dict()
 
+        if response.status_code >= 400:
+            payload = self.error_payload(self.codec, response.content)
+        else:
+            payload = self.codec.loads(response.content)
+
         logging.debug('Dispatching response status')
-        if response.json().get('Code') == 'TokenIsExpired':
+        if payload.get('Code') == 'TokenIsExpired':
             logging.info('Server returned error code "TokenIsExpired", trying to obtain new token')
-            self.user.revalidate_user()
+            self.user.revalidate_user(transport=self.transport)
             self.__update_auth_header()
             logging.debug('Repeating failed response')
             return callback(*callback_args, **callback_kwargs)
 
         logging.debug('Dispatching http status code')
         if response.status_code >= 400:
-            try:
-                raise {
-                    503: exceptions.SynergiaMaintenanceError(response.url, response.json()),
-                    500: exceptions.SynergiaServerError(response.url, response.json()),
-                    404: exceptions.SynergiaAPIEndpointNotFound(response.url),
-                    403: exceptions.SynergiaForbidden(response.url, response.json()),
-                    401: exceptions.SynergiaAccessDenied(response.url, response.json()),
-                    400: exceptions.SynergiaAPIInvalidRequest(response.url, response.json()),
-                }[response.status_code]
-            except KeyError:
-                raise exceptions.OtherHTTPResponse('Not excepted HTTP error code!', response.status_code)
-
-        return response.json()
+            raise self.http_error(response.status_code, response.url, payload)
+
+        return payload
+
+    @staticmethod
+    def error_payload(codec, content):
+        """
+        Dekoduje treść odpowiedzi z kodem błędu. Bramki i serwery proxy zwracają przy błędach strony html, wtedy
+        zwracany jest pusty dict.
+
+        :param librus_tricks.codec.JSONCodec codec: Koder sesji
+        :param bytes content: Treść odpowiedzi
+        :rtype: dict
+        """
+        try:
+            payload = codec.loads(content)
+        except ValueError:
+            return dict()
+        return payload if isinstance(payload, dict) else dict()
+
+    @staticmethod
+    def http_error(status_code, url, payload):
+        """
+        Tworzy wyjątek odpowiadający kodowi http.
+
+        :param int status_code: Kod http
+        :param str url: Adres zapytania
+        :param dict payload: Zdekodowana odpowiedź serwera
+        :rtype: librus_tricks.exceptions.LibrusTricksException
+        """
+        if status_code == 404:
+            return exceptions.SynergiaAPIEndpointNotFound(str(url))
+        try:
+            error = HTTP_ERRORS[status_code]
+        except KeyError:
+            if status_code >= 500:
+                return exceptions.SynergiaServerError(str(url), payload)
+            return exceptions.OtherHTTPResponse('Not excepted HTTP error code!', status_code)
+        return error(str(url), payload)
 
     def get(self, *path, request_params=None):
         """
@@ -119,17 +192,7 @@ class SynergiaClient:
         :return: json przekonwertowany na dict'a
         :rtype: dict
         """
-        if request_params is None:
-            request_params = dict()
-        path_str = self.assembly_path(*path, prefix=self.__api_url)
-        response = self.session.get(
-            path_str, headers=self.__auth_headers, params=request_params
-        )
-
-        response = self.dispatch_http_code(response, callback=self.get, callback_args=path,
-                                           callback_kwargs=request_params)
-
-        return response
+        return self.__request(self.session.get, self.get, path, request_params)
 
     def post(self, *path, request_params=None):
         """
@@ -142,52 +205,129 @@ class SynergiaClient:
         :return: json przekonwertowany na dict'a
         :rtype: dict
         """
+        return self.__request(self.session.post, self.post, path, request_params)
+
+    def __request(self, send, callback, path, request_params):
         if request_params is None:
             request_params = dict()
         path_str = self.assembly_path(*path, prefix=self.__api_url)
-        response = self.session.post(
-            path_str, headers=self.__auth_headers, params=request_params
-        )
+        endpoint = cache_lib.endpoint_name(path)
 
-        response = self.dispatch_http_code(response, callback=self.post, callback_args=path,
-                                           callback_kwargs=request_params)
+        def send_and_dispatch():
+            started = time.perf_counter()
+            response = send(path_str, headers=self.__auth_headers, params=request_params)
+            self.stats.observe_fetch(endpoint, time.perf_counter() - started, response.content.__len__())
+            return self.dispatch_http_code(response, callback=callback, callback_args=path,
+                                           callback_kwargs={'request_params': request_params})
 
-        return response
+        if self.policy is None:
+            return send_and_dispatch()
+        return self.policy.call(send_and_dispatch, host=self.__api_host, account=self.user.uid)
 
     # Cache
 
-    def get_cached_response(self, *path, http_params=None, max_lifetime=timedelta(hours=1)):
+    def get_cached_response(self, *path, http_params=None, max_lifetime=timedelta(hours=1), on_refresh=None):
         """
         Wykonuje zapytanie http GET z poprzednim sprawdzeniem cache.
 
+        Równoczesne zapytania o ten sam zasób (również z innych sesji tego samego użytkownika korzystających z tego
+        samego cache) są łączone w jedno zapytanie http, patrz :class:`librus_tricks.cache.RequestCoalescer`.
+
         :param path: Niezłożona ścieżka do węzła API
         :param http_params: dict zawierający kwargs dla zapytania http
         :type http_params: dict
-        :param timedelta max_lifetime: Maksymalny czas ważności cache dla tego zapytania http
+        :param max_lifetime: Maksymalny czas ważności cache dla tego zapytania http, podanie
+            :class:`librus_tricks.cache.StaleWhileRevalidate` pozwala na zwracanie starej odpowiedzi i odświeżanie
+            jej w tle
+        :type max_lifetime: timedelta or librus_tricks.cache.StaleWhileRevalidate
+        :param on_refresh: Funkcja wywoływana z odpowiedzią pobraną z API (również przy odświeżaniu w tle)
         :return: dict zawierający odpowiedź zapytania
         :rtype: dict
         """
-        uri = self.assembly_path(*path, prefix=self.__api_url)
+        uri = self.cache_uri(self.assembly_path(*path, prefix=self.__api_url), http_params)
         response_cached = self.cache.get_query(uri, self.user.uid)
-
-        if response_cached is None:
+        fresh = cache_lib.fresh_lifetime(max_lifetime)
+        ttl = cache_lib.max_lifetime_of(max_lifetime)
+        # Sesje z innym cache nie czekają na cudze zapytanie, bo wynik trafiłby tylko do cache lidera
+        flight_key = uri, tuple(sorted((http_params or dict()).items())), self.user.uid, id(self.cache)
+        endpoint = cache_lib.endpoint_name(path)
+
+        negative = None if response_cached is None else cache_lib.negative_status(response_cached.response)
+        if negative is not None:
+            if self.negative_cache_ttl and self.response_age(response_cached) <= self.negative_cache_ttl:
+                self.stats.add(endpoint, 'negative_hits')
+                raise self.http_error(negative[0], uri, negative[1])
+            response_cached = None
+
+        if response_cached is not None:
+            age = self.response_age(response_cached)
+            if age <= fresh:
+                self.stats.add(endpoint, 'hits')
+                return response_cached.response
+            if age <= ttl:
+                logging.debug('Response is stale, refreshing it in background')
+                self.stats.add(endpoint, 'stale')
+                self.in_flight.do_in_background(
+                    flight_key, lambda: self.__refresh_response(uri, path, http_params, fresh, ttl, on_refresh),
+                    self.revalidation_pool
+                )
+                return response_cached.response
+            logging.debug('Response is too old! Trying to get latest response from api')
+        else:
             logging.debug('Response is not present in cache!')
+        self.stats.add(endpoint, 'misses')
+
+        return self.in_flight.do(
+            flight_key, lambda: self.__refresh_response(uri, path, http_params, fresh, ttl, on_refresh)
+        )
+
+    def __refresh_response(self, uri, path, http_params, fresh, ttl, on_refresh=None):
+        response_cached = self.cache.get_query(uri, self.user.uid)
+        if response_cached is not None and self.response_age(response_cached) <= fresh \
+                and cache_lib.negative_status(response_cached.response) is None:
+            logging.debug('Response has been refreshed in the meantime')
+            return response_cached.response
+
+        try:
             http_response = self.get(*path, request_params=http_params)
-            self.cache.add_query(uri, http_response, self.user.uid)
-            return http_response
+        except tuple(cache_lib.NEGATIVE_ERRORS.values()) as error:
+            if self.negative_cache_ttl:
+                logging.debug('Remembering %r for %s', error, self.negative_cache_ttl)
+                self.cache.add_query(uri, cache_lib.negative_response(error), self.user.uid,
+                                     ttl=self.negative_cache_ttl)
+                self.stats.add(cache_lib.endpoint_name(path), 'negative_stored')
+            raise
+        self.cache.add_query(uri, http_response, self.user.uid, ttl=ttl)
+        self.stats.add(cache_lib.endpoint_name(path), 'refreshes')
+        if on_refresh is not None:
+            on_refresh(http_response)
+        return http_response
+
+    @staticmethod
+    def cache_uri(uri, http_params=None):
+        """
+        Zwraca klucz cache dla zapytania, parametry są dołączane w stałej kolejności.
+
+        :param str uri: Adres węzła API
+        :param dict http_params: Parametry zapytania http
+        :rtype: str
+        """
+        if not http_params:
+            return uri
+        return f'{uri}?{urlencode(sorted(http_params.items()))}'
 
+    @staticmethod
+    def response_age(cached):
+        """
+        Zwraca wiek wpisu z cache.
+
+        :param cached: Obiekt zwrócony przez cache (posiadający ``last_load``)
+        :rtype: timedelta
+        """
         try:
-            age = datetime.now() - response_cached.last_load
+            return datetime.now() - cached.last_load
         except TypeError:
-            age = datetime.now() - response_cached.last_load.replace(tzinfo=None)
-
-        if age > max_lifetime:
-            logging.debug('Response is too old! Trying to get latest response from api')
-            http_response = self.get(*path, request_params=http_params)
-            self.cache.del_query(uri, self.user.uid)
-            self.cache.add_query(uri, http_response, self.user.uid)
-            return http_response
-        return response_cached.response
+            return datetime.now() - cached.last_load.replace(tzinfo=None)
 
     def get_cached_object(self, uid, cls, max_lifetime=timedelta(hours=1)):
         """
@@ -198,13 +338,11 @@ class SynergiaClient:
         :param timedelta max_lifetime: Maksymalny czas ważności cache dla tego obiektu
         :return: Żądany obiekt
         """
-        requested_object = self.cache.get_object(uid, cls)
+        requested_object = self.cache.get_object(uid, cls, session=self)
 
         if requested_object is None:
             logging.debug('Obejct is not present in cache!')
-            requested_object = cls.create(uid=uid, session=self)
-            self.cache.add_object(uid, cls, requested_object.export_resource())
-            return requested_object
+            return cls.create(uid=uid, session=self)
 
         try:
             age = datetime.now() - requested_object.last_load
@@ -213,15 +351,15 @@ class SynergiaClient:
 
         if age > max_lifetime:
             logging.debug('Object is too old! Trying to get latest object from api')
-            requested_object = cls.create(uid=uid, session=self)
             self.cache.del_object(uid)
-            self.cache.add_object(uid, cls, requested_object.export_resource())
+            requested_object = cls.create(uid=uid, session=self)
 
         return requested_object
 
     # API query part
 
-    def return_objects(self, *path, cls, extraction_key=None, lifetime=timedelta(seconds=10), bypass_cache=False):
+    def return_objects(self, *path, cls, extraction_key=None, lifetime=timedelta(seconds=10), bypass_cache=False,
+                       prefetch=tuple()):
         """
         Zwraca listę obiektów lub obiekt, wygenerowaną z danych danej ścieżki API.
 
@@ -231,13 +369,19 @@ class SynergiaClient:
             automatyczną próbę zczytania danych
         :param timedelta lifetime: Maksymalny czas ważności cache dla tego zapytania http
         :param bool bypass_cache: Ustawienie tego parametru na True powoduje ignorowanie mechanizmu cache
+        :param prefetch: Nazwy property, które mają zostać pobrane hurtowo (``True`` pobiera wszystkie),
+            patrz :meth:`prefetch`
+        :type prefetch: tuple[str] or bool
         :return: Lista żądanych obiektów
         :rtype: list[SynergiaGenericClass]
         """
         if bypass_cache:
             raw = self.get(*path)
         else:
-            raw = self.get_cached_response(*path, max_lifetime=lifetime)
+            raw = self.get_cached_response(
+                *path, max_lifetime=lifetime,
+                on_refresh=lambda response: self.cache_objects(cls, response, extraction_key)
+            )
 
         if extraction_key is None:
             extraction_key = SynergiaGenericClass.auto_extract(raw)
@@ -248,22 +392,176 @@ class SynergiaClient:
             stack = []
             for stored_payload in raw:
                 stack.append(cls.assembly(stored_payload, self))
-            return tuple(stack)
-        if isinstance(raw, dict):
-            return cls.assembly(raw, self)
+            objects = tuple(stack)
+        elif isinstance(raw, dict):
+            objects = cls.assembly(raw, self)
+        else:
+            return None
+
+        if prefetch:
+            self.prefetch(objects, *(tuple() if prefetch is True else prefetch))
+        return objects
+
+    def cache_objects(self, cls, response, extraction_key=None):
+        """
+        Zapisuje elementy listy z odpowiedzi API do cache obiektów jednym zapisem, więc późniejsze pobranie
+        pojedynczego obiektu (np. ``SynergiaGrade.create(uid=...)``) nie wymaga zapytania http.
+
+        Wywoływane automatycznie przez :meth:`return_objects` dla odpowiedzi pobranych z API. Wpisy są ważne tak
+        długo jak ``expire`` klasy.
 
-        return None
+        :param cls: Klasa obiektów
+        :param dict response: Odpowiedź API
+        :param str extraction_key: Klucz listy, domyślnie wykrywany automatycznie
+        :return: Liczba zapisanych obiektów
+        :rtype: int
+        """
+        if extraction_key is None:
+            extraction_key = SynergiaGenericClass.auto_extract(response)
+        resources = response.get(extraction_key)
+        if not isinstance(resources, list):
+            return 0
+        objects = [(resource['Id'], cls, resource) for resource in resources if 'Id' in resource]
+        if objects:
+            ttl = cache_lib.max_lifetime_of(cls.create_defaults().get('expire'))
+            self.cache.add_objects(objects, ttl=ttl)
+        return objects.__len__()
 
-    def grades(self, *grades):
+    def known_objects(self, cls, uids):
+        """
+        Zwraca obiekty dostępne bez zapytań http, z mapy tożsamości sesji lub z cache obiektów.
+
+        :param cls: Klasa żądanych obiektów
+        :param uids: Id obiektów
+        :return: dict w postaci ``{str(id): obiekt}``
+        :rtype: dict
+        """
+        lifetime = cls.create_defaults().get('expire', timedelta(seconds=1))
+        found = {}
+        for uid in uids:
+            known = self.identity_map.get(cls, uid, lifetime)
+            if known is not None:
+                found[str(uid)] = known
+        missing = {uid for uid in uids if str(uid) not in found}
+        if missing:
+            for uid, cached_object in self.cache.get_objects(missing, cls, session=self).items():
+                self.identity_map.put(cls, uid, cached_object)
+                found[uid] = cached_object
+        self.stats.add(cls.__name__, 'hits', found.__len__())
+        self.stats.add(cls.__name__, 'misses', set(map(str, uids)).__len__() - found.__len__())
+        return found
+
+    def __by_ids(self, path, ids, cls, extraction_key=None, prefetch=tuple()):
+        if ids.__len__() == 0:
+            return self.return_objects(*path, cls=cls, extraction_key=extraction_key, prefetch=prefetch)
+
+        found = self.known_objects(cls, ids)
+        missing = [uid for uid in ids if str(uid) not in found]
+        if missing:
+            ids_computed = self.assembly_path(*missing, sep=',', suffix=',')[1:]
+            fetched = self.return_objects(*path, ids_computed, cls=cls, extraction_key=extraction_key)
+            if isinstance(fetched, SynergiaGenericClass):
+                fetched = (fetched,)
+            for fetched_object in fetched or tuple():
+                found[str(fetched_object.uid)] = fetched_object
+                self.identity_map.put(cls, fetched_object.uid, fetched_object)
+
+        objects = tuple(found[str(uid)] for uid in ids if str(uid) in found)
+        if prefetch:
+            self.prefetch(objects, *(tuple() if prefetch is True else prefetch))
+        return objects
+
+    def prefetch(self, objects, *relations, chunk_size=50):
+        """
+        Hurtowo pobiera obiekty powiązane (np. ``teacher``, ``subject``) dla wszystkich podanych obiektów.
+
+        Dla każdej klasy wykonywane jest jedno zapytanie ze złożonymi id (np. ``Users/1,2,3,``), a pobrane
+        obiekty są przypinane do obiektów nadrzędnych, więc późniejsze odwołania do property nie wykonują już
+        zapytań http.
+
+        :param objects: Obiekt lub krotka obiektów
+        :param str relations: Nazwy property do pobrania, brak nazw oznacza wszystkie powiązania
+        :param int chunk_size: Maksymalna liczba id w jednym zapytaniu
+        :return: Przekazane obiekty
+        """
+        if isinstance(objects, SynergiaGenericClass):
+            parents = (objects,)
+        else:
+            parents = objects
+
+        wanted = {}
+        bindings = []
+        lifetimes = {}
+        for parent in parents:
+            for attr, (uid, cls) in parent.objects.pending().items():
+                if relations and attr not in relations:
+                    continue
+                if cls not in lifetimes:
+                    lifetimes[cls] = cls.create_defaults().get('expire', timedelta(seconds=1))
+                known = self.identity_map.get(cls, uid, lifetimes[cls])
+                if known is not None:
+                    self.stats.add(cls.__name__, 'hits')
+                    parent.objects.set_value(attr, known)
+                    continue
+                wanted.setdefault(cls, set()).add(uid)
+                bindings.append((parent, attr, cls, uid))
+
+        fetched = {}
+        for cls, uids in wanted.items():
+            fetched[cls] = self.cache.get_objects(uids, cls, session=self)
+            for uid, cached_object in fetched[cls].items():
+                self.identity_map.put(cls, uid, cached_object)
+            missing = {uid for uid in uids if str(uid) not in fetched[cls]}
+            self.stats.add(cls.__name__, 'hits', uids.__len__() - missing.__len__())
+            self.stats.add(cls.__name__, 'misses', missing.__len__())
+            if missing:
+                fetched[cls].update(self.__fetch_many(cls, missing, chunk_size))
+            logging.debug('Prefetched %s of %s %s objects', fetched[cls].__len__(), uids.__len__(), cls.__name__)
+
+        for parent, attr, cls, uid in bindings:
+            related = fetched[cls].get(str(uid))
+            if related is not None:
+                parent.objects.set_value(attr, related)
+
+        return objects
+
+    def __fetch_many(self, cls, uids, chunk_size):
+        """
+        Pobiera obiekty danej klasy zapytaniami zawierającymi wiele id.
+
+        :param cls: Klasa żądanych obiektów
+        :param set uids: Id obiektów
+        :param int chunk_size: Maksymalna liczba id w jednym zapytaniu
+        :return: dict w postaci ``{str(id): obiekt}``
+        :rtype: dict
+        """
+        defaults = cls.create_defaults()
+        path = defaults.get('path', ('',))
+        if path == ('',):
+            logging.debug('%s has no API path, skipping prefetch', cls.__name__)
+            return {}
+
+        uids = sorted(uids, key=str)
+        fetched = {}
+        for chunk_start in range(0, uids.__len__(), chunk_size):
+            ids_computed = self.assembly_path(*uids[chunk_start:chunk_start + chunk_size], sep=',', suffix=',')[1:]
+            objects = self.return_objects(*path, ids_computed, cls=cls,
+                                          lifetime=defaults.get('expire', timedelta(seconds=10)))
+            if isinstance(objects, SynergiaGenericClass):
+                objects = (objects,)
+            for fetched_object in objects or tuple():
+                fetched[str(fetched_object.uid)] = fetched_object
+                self.identity_map.put(cls, fetched_object.uid, fetched_object)
+        return fetched
+
+    def grades(self, *grades, prefetch=tuple()):
         """
         :param int grades: Id ocen
+        :param prefetch: Powiązania do pobrania hurtowo, patrz :meth:`prefetch`
         :rtype: tuple[librus_tricks.classes.SynergiaGrade]
         :return: krotka z wszystkimi/wybranymi ocenami
         """
-        if grades.__len__() == 0:
-            return self.return_objects('Grades', cls=SynergiaGrade, extraction_key='Grades')
-        ids_computed = self.assembly_path(*grades, sep=',', suffix=',')[1:]
-        return self.return_objects('Grades', ids_computed, cls=SynergiaGrade, extraction_key='Grades')
+        return self.__by_ids(('Grades',), grades, SynergiaGrade, 'Grades', prefetch)
 
     @property
     def grades_categorized(self):
@@ -282,16 +580,14 @@ class SynergiaClient:
 
         return grades_categorized
 
-    def attendances(self, *attendances):
+    def attendances(self, *attendances, prefetch=tuple()):
         """
         :param int attendances: Id obecności
+        :param prefetch: Powiązania do pobrania hurtowo, patrz :meth:`prefetch`
         :rtype: tuple[librus_tricks.classes.SynergiaAttendance]
         :return: krotka z wszystkimi/wybranymi obecnościami
         """
-        if attendances.__len__() == 0:
-            return self.return_objects('Attendances', cls=SynergiaAttendance, extraction_key='Attendances')
-        ids_computed = self.assembly_path(*attendances, sep=',', suffix=',')[1:]
-        return self.return_objects('Attendances', ids_computed, cls=SynergiaAttendance, extraction_key='Attendances')
+        return self.__by_ids(('Attendances',), attendances, SynergiaAttendance, 'Attendances', prefetch)
 
     @property
     def illegal_absences(self):
@@ -315,38 +611,44 @@ class SynergiaClient:
         """
         return tuple(filter(lambda k: not k.type.is_presence_kind, self.attendances()))
 
-    def exams(self, *exams):
+    def exams(self, *exams, prefetch=tuple()):
         """
         :param int exams: Id egzaminów
+        :param prefetch: Powiązania do pobrania hurtowo, patrz :meth:`prefetch`
         :rtype: tuple[librus_tricks.classes.SynergiaExam]
         :return: krotka z wszystkimi egzaminami
         """
-        if exams.__len__() == 0:
-            return self.return_objects('HomeWorks', cls=SynergiaExam, extraction_key='HomeWorks')
-        ids_computed = self.assembly_path(*exams, sep=',', suffix=',')[1:]
-        return self.return_objects('HomeWorks', ids_computed, cls=SynergiaExam, extraction_key='HomeWorks')
+        return self.__by_ids(('HomeWorks',), exams, SynergiaExam, 'HomeWorks', prefetch)
 
     def colors(self, *colors):
         """
         :param int colors: Id kolorów
         :rtype: tuple[librus_tricks.classes.SynergiaColors]
         """
-        if colors.__len__() == 0:
-            return self.return_objects('Colors', cls=SynergiaColor, extraction_key='Colors')
-        ids_computed = self.assembly_path(*colors, sep=',', suffix=',')[1:]
-        return self.return_objects('Colors', ids_computed, cls=SynergiaColor, extraction_key='Colors')
+        return self.__by_ids(('Colors',), colors, SynergiaColor, 'Colors')
 
-    def timetable(self, for_date=datetime.now()):
+    def timetable(self, for_date=None, expire=timedelta(minutes=5)):
         """
         Plan lekcji na cały tydzień.
 
-        :param datetime.datetime for_date: Data dnia, który ma być w planie lekcji
+        Tygodnie są trzymane w cache pod datą poniedziałku (``weekStart``), a złożony plan w mapie tożsamości
+        sesji, więc częste odpytywanie nie pobiera ani nie składa planu ponownie.
+
+        :param datetime.datetime for_date: Data dnia, który ma być w planie lekcji, domyślnie dziś
+        :param expire: Maksymalny czas ważności cache dla planu
+        :type expire: timedelta or librus_tricks.cache.StaleWhileRevalidate
         :rtype: librus_tricks.classes.SynergiaTimetable
         :return: obiekt tygodniowego planu lekcji
         """
         monday = tools.get_actual_monday(for_date).isoformat()
-        matrix = self.get('Timetables', request_params={'weekStart': monday})
-        return SynergiaTimetable.assembly(matrix['Timetable'], self)
+        timetable = self.identity_map.get(SynergiaTimetable, monday, expire)
+        if timetable is not None:
+            return timetable
+
+        matrix = self.get_cached_response('Timetables', http_params={'weekStart': monday}, max_lifetime=expire)
+        timetable = SynergiaTimetable.assembly(matrix['Timetable'], self)
+        self.identity_map.put(SynergiaTimetable, monday, timetable)
+        return timetable
 
     def timetable_day(self, for_date: datetime):
         return self.timetable(for_date).days[for_date.date()]
@@ -384,10 +686,7 @@ class SynergiaClient:
         :param int messages: Id wiadomości
         :rtype: tuple[librus_tricks.classes.SynergiaNativeMessage]
         """
-        if messages.__len__() == 0:
-            return self.return_objects('Messages', cls=SynergiaNativeMessage, extraction_key='Messages')
-        ids_computed = self.assembly_path(*messages, sep=',', suffix=',')[1:]
-        return self.return_objects('Messages', ids_computed, cls=SynergiaNativeMessage, extraction_key='Messages')
+        return self.__by_ids(('Messages',), messages, SynergiaNativeMessage, 'Messages')
 
     def news_feed(self):
         """
@@ -402,10 +701,7 @@ class SynergiaClient:
         :param int subject: Id przedmiotów
         :rtype: tuple[librus_tricks.classes.SynergiaSubject]
         """
-        if subject.__len__() == 0:
-            return self.return_objects('Subjects', cls=SynergiaSubject, extraction_key='Subjects')
-        ids_computed = self.assembly_path(*subject, sep=',', suffix=',')[1:]
-        return self.return_objects('Subjects', ids_computed, cls=SynergiaSubject, extraction_key='Subjects')
+        return self.__by_ids(('Subjects',), subject, SynergiaSubject, 'Subjects')
 
     @property
     def school(self):
@@ -441,11 +737,7 @@ class SynergiaClient:
         :param int days_ids: Id zwolnień
         :rtype: tuple[librus_tricks.classes.SynergiaTeacherFreeDays]
         """
-        if days_ids.__len__() == 0:
-            days = self.return_objects('Calendars', 'TeacherFreeDays', cls=SynergiaTeacherFreeDays)
-        else:
-            ids_computed = self.assembly_path(*days_ids, sep=',', suffix=',')[1:]
-            days = self.return_objects('Calendars', 'TeacherFreeDays', ids_computed, cls=SynergiaTeacherFreeDays)
+        days = self.__by_ids(('Calendars', 'TeacherFreeDays'), days_ids, SynergiaTeacherFreeDays)
 
         days = tuple(sorted(days, key=lambda x: x.starts))
         if only_future:
@@ -453,11 +745,7 @@ class SynergiaClient:
         return days
 
     def school_free_days(self, *days_ids, only_future=True):
-        if days_ids.__len__() == 0:
-            days = self.return_objects('Calendars', 'SchoolFreeDays', cls=SynergiaSchoolFreeDays)
-        else:
-            ids_computed = self.assembly_path(*days_ids, sep=',', suffix=',')[1:]
-            days = self.return_objects('Calendars', 'SchoolFreeDays', ids_computed, cls=SynergiaSchoolFreeDays)
+        days = self.__by_ids(('Calendars', 'SchoolFreeDays'), days_ids, SynergiaSchoolFreeDays)
 
         days = tuple(sorted(days, key=lambda x: x.starts))
         if only_future:
@@ -465,19 +753,26 @@ class SynergiaClient:
         return days
 
     def realizations(self, *realizations_ids):
-        if realizations_ids.__len__() == 0:
-            return self.return_objects('Realizations', cls=SynergiaRealization, extraction_key='Realizations')
-        ids_computed = self.assembly_path(*realizations_ids, sep=',', suffix=',')[1:]
-        return self.return_objects('Realizations', ids_computed, cls=SynergiaRealization, extraction_key='Realizations')
+        return self.__by_ids(('Realizations',), realizations_ids, SynergiaRealization, 'Realizations')
 
     def substitutions(self):
         pass
 
-    def preload_cache(self):
-        self.cache.clear_objects()
+    def preload_cache(self, endpoints=None, max_workers=4, progress=None, clear=False):
+        """
+        Równolegle pobiera wybrane węzły API i zapisuje ich obiekty do cache obiektów, jednym zapisem zbiorczym
+        dla każdej klasy.
 
-        for thing in (*self.attendances(), *self.grades(), *self.subjects(), *self.school_free_days(only_future=False),
-                      *self.teacher_free_days(only_future=False)):
-            self.cache.add_object(thing.uid, thing.__class__, thing.export_resource())
+        :param endpoints: Nazwy węzłów z :data:`librus_tricks.preload.ENDPOINTS` (np. ``'grades'``, ``'teachers'``,
+            ``'lessons'``), domyślnie :data:`librus_tricks.preload.DEFAULT_ENDPOINTS`
+        :param int max_workers: Maksymalna liczba równoległych zapytań
+        :param progress: Funkcja wywoływana po pobraniu każdego węzła,
+            patrz :class:`librus_tricks.preload.CachePreloader`
+        :param bool clear: Usuwa wcześniej zapisane obiekty
+        :rtype: librus_tricks.preload.PreloadReport
+        """
+        from librus_tricks import preload
 
-        logging.info('Loaded %s objects into cache', self.cache.count_object())
+        if endpoints is None:
+            endpoints = preload.DEFAULT_ENDPOINTS
+        return preload.CachePreloader(self, endpoints, max_workers, progress).run(clear=clear)
@@ -66,6 +66,10 @@ class OtherHTTPResponse(LibrusTricksWrapperException):
     pass
 
 
+class AsyncResolutionRequired(LibrusTricksWrapperException):
+    pass
+
+
 class SecurityWarning(Warning):
     pass
 
@@ -80,3 +84,11 @@ class GoodPracticeWarning(Warning):
 
 class SynergiaMaintenanceError(SynergiaServerError):
     pass
+
+
+class SynergiaCircuitOpen(SynergiaMaintenanceError):
+    pass
+
+
+class ResourceNotKept(LibrusTricksException):
+    pass
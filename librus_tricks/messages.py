@@ -1,7 +1,6 @@
 from datetime import datetime
 import logging
 
-import requests
 from bs4 import BeautifulSoup
 
 
@@ -49,7 +48,7 @@ class MessageReader:
         :param librus_tricks.core.SynergiaClient session:
         """
         self._syn_session = session
-        self._web_session = requests.session()
+        self._web_session = session.transport.new_session()
         logging.debug('Obtain AutoLoginToken from server')
         token = session.post('AutoLoginToken')['Token']
         self._web_session.get(f'https://synergia.librus.pl/loguj/token/{token}/przenies/wiadomosci')
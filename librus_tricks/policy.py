@@ -0,0 +1,268 @@
+import logging
+import random
+import threading
+import time
+from datetime import timedelta
+
+from librus_tricks import exceptions
+
+
+class PolicyMetrics:
+    """
+    Liczniki ponowień, oczekiwania i odrzuceń zapytań.
+    """
+
+    FIELDS = ('requests', 'failures', 'retries', 'retry_wait', 'rate_limited', 'rate_limit_wait', 'circuit_opened',
+              'circuit_rejected')
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__counters = dict.fromkeys(self.FIELDS, 0)
+
+    def add(self, field, value=1):
+        with self.__lock:
+            self.__counters[field] += value
+
+    def snapshot(self):
+        """
+        :return: Kopia liczników, czasy oczekiwania są podane w sekundach
+        :rtype: dict
+        """
+        with self.__lock:
+            return self.__counters.copy()
+
+    def reset(self):
+        with self.__lock:
+            self.__counters = dict.fromkeys(self.FIELDS, 0)
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} {self.snapshot()}>'
+
+
+class TokenBucket:
+    """
+    Ogranicznik liczby zapytań typu token bucket.
+    """
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic):
+        """
+        :param float rate: Liczba zapytań na sekundę
+        :param float capacity: Maksymalna liczba zapytań wykonanych od razu, domyślnie ``rate``
+        """
+        self.rate = rate
+        self.capacity = rate if capacity is None else capacity
+        self.__clock = clock
+        self.__tokens = self.capacity
+        self.__updated = clock()
+        self.__lock = threading.Lock()
+
+    def reserve(self):
+        """
+        Rezerwuje jeden token.
+
+        :return: Czas w sekundach, który trzeba odczekać przed wykonaniem zapytania
+        :rtype: float
+        """
+        with self.__lock:
+            now = self.__clock()
+            self.__tokens = min(self.capacity, self.__tokens + (now - self.__updated) * self.rate)
+            self.__updated = now
+            self.__tokens -= 1
+            if self.__tokens >= 0:
+                return 0.0
+            return -self.__tokens / self.rate
+
+
+class RateLimiter:
+    """
+    Ogranicza liczbę zapytań do jednego hosta oraz z jednego konta.
+    """
+
+    def __init__(self, per_host=None, per_account=None, burst=None):
+        """
+        :param float per_host: Maksymalna liczba zapytań na sekundę do jednego hosta
+        :param float per_account: Maksymalna liczba zapytań na sekundę z jednego konta
+        :param float burst: Liczba zapytań, które mogą zostać wykonane od razu
+        """
+        self.per_host = per_host
+        self.per_account = per_account
+        self.burst = burst
+        self.__buckets = dict()
+        self.__lock = threading.Lock()
+
+    def __bucket(self, key, rate):
+        with self.__lock:
+            if key not in self.__buckets:
+                self.__buckets[key] = TokenBucket(rate, self.burst)
+            return self.__buckets[key]
+
+    def reserve(self, host, account):
+        """
+        :return: Czas w sekundach, który trzeba odczekać przed wykonaniem zapytania
+        :rtype: float
+        """
+        wait = 0.0
+        if self.per_host is not None:
+            wait = max(wait, self.__bucket(('host', host), self.per_host).reserve())
+        if self.per_account is not None:
+            wait = max(wait, self.__bucket(('account', host, account), self.per_account).reserve())
+        return wait
+
+
+class CircuitBreaker:
+    """
+    Wstrzymuje zapytania do hosta, który zgłasza przerwę techniczną lub ciągle zwraca błędy 5xx.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=timedelta(minutes=5), open_on_maintenance=True,
+                 clock=time.monotonic):
+        """
+        :param int failure_threshold: Liczba kolejnych błędów, po których obwód zostaje otwarty
+        :param timedelta reset_timeout: Czas, po którym przepuszczane jest zapytanie próbne
+        :param bool open_on_maintenance: Otwiera obwód od razu po błędzie 503 (przerwa techniczna)
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout.total_seconds()
+        self.open_on_maintenance = open_on_maintenance
+        self.__clock = clock
+        self.__failures = dict()
+        self.__opened = dict()
+        self.__lock = threading.Lock()
+
+    def is_open(self, host):
+        """
+        Sprawdza czy zapytania do hosta są wstrzymane. Po ``reset_timeout`` przepuszcza zapytanie próbne.
+
+        :rtype: bool
+        """
+        with self.__lock:
+            opened = self.__opened.get(host)
+            if opened is None:
+                return False
+            if self.__clock() - opened >= self.reset_timeout:
+                logging.info('Circuit for %s is half-open, letting a probe request through', host)
+                self.__opened[host] = self.__clock()
+                return False
+            return True
+
+    def record_success(self, host):
+        with self.__lock:
+            self.__failures.pop(host, None)
+            self.__opened.pop(host, None)
+
+    def record_failure(self, host, error):
+        """
+        :return: True jeżeli obwód został właśnie otwarty
+        :rtype: bool
+        """
+        with self.__lock:
+            self.__failures[host] = self.__failures.get(host, 0) + 1
+            should_open = self.__failures[host] >= self.failure_threshold or (
+                self.open_on_maintenance and isinstance(error, exceptions.SynergiaMaintenanceError)
+            )
+            if should_open and host not in self.__opened:
+                logging.warning('Opening circuit for %s after %r', host, error)
+                self.__opened[host] = self.__clock()
+                return True
+            return False
+
+
+class RetryPolicy:
+    """
+    Ponawianie zapytań z wykładniczo rosnącym opóźnieniem i losowym rozrzutem (full jitter).
+    """
+
+    def __init__(self, max_retries=3, backoff_base=0.5, backoff_max=30.0, jitter=True,
+                 retry_on=(exceptions.SynergiaServerError, exceptions.SynergiaMaintenanceError)):
+        """
+        :param int max_retries: Maksymalna liczba ponowień
+        :param float backoff_base: Opóźnienie pierwszego ponowienia w sekundach
+        :param float backoff_max: Maksymalne opóźnienie w sekundach
+        :param bool jitter: Losuje opóźnienie z przedziału ``[0, opóźnienie]``
+        :param tuple retry_on: Wyjątki, po których zapytanie jest ponawiane. Przerwa techniczna (503) jest
+            ponawiana tylko wtedy, gdy circuit breaker nie otwiera się od razu (``open_on_maintenance=False``)
+        """
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.jitter = jitter
+        self.retry_on = retry_on
+
+    def delay(self, attempt):
+        """
+        :param int attempt: Numer ponowienia, liczony od 0
+        :return: Opóźnienie w sekundach
+        :rtype: float
+        """
+        delay = min(self.backoff_max, self.backoff_base * 2 ** attempt)
+        if self.jitter:
+            return random.uniform(0, delay)
+        return delay
+
+
+class RequestPolicy:
+    """
+    Łączy ponawianie zapytań, ograniczanie ich liczby, circuit breaker i metryki.
+
+    Jeden obiekt może być współdzielony przez wiele sesji, limity są wtedy wspólne dla hosta
+    i osobne dla każdego konta.
+    """
+
+    def __init__(self, retry=None, rate_limiter=None, circuit_breaker=None, metrics=None, sleep=time.sleep):
+        """
+        :param RetryPolicy retry: Polityka ponowień, domyślnie :class:`RetryPolicy`
+        :param RateLimiter rate_limiter: Ogranicznik liczby zapytań, domyślnie brak
+        :param CircuitBreaker circuit_breaker: Circuit breaker, domyślnie :class:`CircuitBreaker`
+        :param PolicyMetrics metrics: Liczniki
+        """
+        self.retry = RetryPolicy() if retry is None else retry
+        self.rate_limiter = rate_limiter
+        self.circuit_breaker = CircuitBreaker() if circuit_breaker is None else circuit_breaker
+        self.metrics = PolicyMetrics() if metrics is None else metrics
+        self.__sleep = sleep
+
+    def call(self, send, host, account):
+        """
+        Wykonuje zapytanie zgodnie z polityką.
+
+        :param send: Funkcja bez argumentów wykonująca zapytanie i sprawdzająca odpowiedź
+        :param str host: Host API
+        :param str account: Id konta
+        :raises librus_tricks.exceptions.SynergiaCircuitOpen: Zapytania do hosta są wstrzymane
+        :return: Wynik ``send``
+        """
+        attempt = 0
+        while True:
+            if self.circuit_breaker.is_open(host):
+                self.metrics.add('circuit_rejected')
+                raise exceptions.SynergiaCircuitOpen(host)
+
+            if self.rate_limiter is not None:
+                wait = self.rate_limiter.reserve(host, account)
+                if wait > 0:
+                    self.metrics.add('rate_limited')
+                    self.metrics.add('rate_limit_wait', wait)
+                    self.__sleep(wait)
+
+            self.metrics.add('requests')
+            try:
+                result = send()
+            except self.retry.retry_on as error:
+                self.metrics.add('failures')
+                if self.circuit_breaker.record_failure(host, error):
+                    self.metrics.add('circuit_opened')
+                    raise
+                if attempt >= self.retry.max_retries:
+                    raise
+                delay = self.retry.delay(attempt)
+                logging.info('Retrying request to %s in %.2fs after %r', host, delay, error)
+                self.metrics.add('retries')
+                self.metrics.add('retry_wait', delay)
+                self.__sleep(delay)
+                attempt += 1
+            else:
+                self.circuit_breaker.record_success(host)
+                return result
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} with {self.retry.max_retries} retries>'
@@ -0,0 +1,132 @@
+import logging
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from librus_tricks import cache as cache_lib
+from librus_tricks.auth import authorizer
+from librus_tricks.core import SynergiaClient
+from librus_tricks.transport import get_default_transport
+
+PoolResult = namedtuple('PoolResult', ('session', 'result', 'error'))
+PoolResult.__doc__ = 'Wynik operacji dla jednego konta, ``error`` zawiera wyjątek lub None'
+
+
+class SessionPool:
+    """
+    Zbiór sesji, na których można równolegle wykonywać te same operacje.
+
+    Wszystkie sesje korzystają z tej samej puli połączeń i tego samego cache, a błąd jednego konta nie przerywa
+    pracy na pozostałych.
+    """
+
+    def __init__(self, sessions=tuple(), max_workers=8):
+        """
+        :param sessions: Sesje
+        :type sessions: iterable of librus_tricks.core.SynergiaClient
+        :param int max_workers: Maksymalna liczba równolegle obsługiwanych kont
+        """
+        self.sessions = list(sessions)
+        self.max_workers = max_workers
+
+    @classmethod
+    def from_users(cls, users, max_workers=8, transport=None, cache=None, **kwargs):
+        """
+        Tworzy sesje dla podanych użytkowników ze wspólną pulą połączeń i cache.
+
+        :param users: Użytkownicy
+        :type users: iterable of librus_tricks.auth.SynergiaUser
+        :param int max_workers: Maksymalna liczba równolegle obsługiwanych kont
+        :param librus_tricks.transport.SynergiaTransport transport: Pula połączeń http
+        :param librus_tricks.cache.CacheBase cache: Obiekt, który zarządza cache
+        :rtype: SessionPool
+        """
+        if transport is None:
+            transport = get_default_transport()
+        if cache is None:
+            cache = cache_lib.AlchemyCache()
+        return cls([SynergiaClient(user, transport=transport, cache=cache, **kwargs) for user in users], max_workers)
+
+    @classmethod
+    def from_credentials(cls, credentials, max_workers=8, transport=None, cache=None, **kwargs):
+        """
+        Loguje się na wiele kont Portalu Librus (również równolegle) i tworzy sesje dla wszystkich podpiętych kont
+        Synergii.
+
+        :param credentials: Pary (email, hasło)
+        :type credentials: iterable of tuple[str, str]
+        :rtype: SessionPool
+        """
+        if transport is None:
+            transport = get_default_transport()
+
+        users = []
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(authorizer, email, password, transport=transport): email
+                for email, password in credentials
+            }
+            for future in as_completed(futures):
+                try:
+                    users.extend(future.result())
+                except Exception as error:
+                    logging.warning('Could not log in as %s: %r', futures[future], error)
+        return cls.from_users(users, max_workers, transport, cache, **kwargs)
+
+    def add(self, session):
+        self.sessions.append(session)
+        return self
+
+    def map(self, operation):
+        """
+        Wykonuje operację na wszystkich sesjach i zwraca wyniki w kolejności ich ukończenia.
+
+        >>> for item in pool.map(lambda s: s.grades()):
+        ...     print(item.session, item.error or item.result.__len__())
+
+        :param operation: Funkcja przyjmująca sesję
+        :rtype: collections.Iterable[PoolResult]
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='librus-pool') as executor:
+            futures = {executor.submit(operation, session): session for session in self.sessions}
+            for future in as_completed(futures):
+                session = futures[future]
+                try:
+                    yield PoolResult(session, future.result(), None)
+                except Exception as error:
+                    logging.info('Operation failed for %s: %r', session, error)
+                    yield PoolResult(session, None, error)
+
+    def map_all(self, operation):
+        """
+        To samo co :meth:`map`, ale czeka na wszystkie konta.
+
+        :return: dict w postaci ``{sesja: PoolResult}``
+        :rtype: dict
+        """
+        return {item.session: item for item in self.map(operation)}
+
+    def preload_cache(self, endpoints=None, clear=False):
+        """
+        Równolegle wypełnia cache wszystkich sesji.
+
+        Wspólny cache jest czyszczony raz, przed ładowaniem, więc obiekty jednego konta nie są usuwane przez
+        kolejne.
+
+        :param endpoints: Nazwy węzłów, patrz :meth:`librus_tricks.core.SynergiaClient.preload_cache`
+        :param bool clear: Usuwa wcześniej zapisane obiekty
+        :return: dict w postaci ``{sesja: PoolResult}``
+        :rtype: dict
+        """
+        if clear:
+            for cache in {id(session.cache): session.cache for session in self.sessions}.values():
+                cache.clear_objects()
+        return self.map_all(lambda session: session.preload_cache(endpoints, clear=False))
+
+    def __len__(self):
+        return self.sessions.__len__()
+
+    def __iter__(self):
+        return iter(self.sessions)
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} with {self.__len__()} sessions and {self.max_workers} workers>'
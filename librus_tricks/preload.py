@@ -0,0 +1,111 @@
+import logging
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from librus_tricks import cache as cache_lib
+from librus_tricks.classes import *
+
+PreloadEndpoint = namedtuple('PreloadEndpoint', ('path', 'cls'))
+PreloadReport = namedtuple('PreloadReport', ('objects', 'timings', 'errors', 'elapsed'))
+PreloadReport.__doc__ = 'Liczba obiektów i czas pobierania (w sekundach) dla każdego węzła oraz błędy'
+
+#: Węzły API, które można załadować do cache
+ENDPOINTS = {
+    'attendances': PreloadEndpoint(('Attendances',), SynergiaAttendance),
+    'grades': PreloadEndpoint(('Grades',), SynergiaGrade),
+    'subjects': PreloadEndpoint(('Subjects',), SynergiaSubject),
+    'school_free_days': PreloadEndpoint(('Calendars', 'SchoolFreeDays'), SynergiaSchoolFreeDays),
+    'teacher_free_days': PreloadEndpoint(('Calendars', 'TeacherFreeDays'), SynergiaTeacherFreeDays),
+    'exams': PreloadEndpoint(('HomeWorks',), SynergiaExam),
+    'teachers': PreloadEndpoint(('Users',), SynergiaTeacher),
+    'grade_categories': PreloadEndpoint(('Grades', 'Categories'), SynergiaGradeCategory),
+    'exam_categories': PreloadEndpoint(('HomeWorks', 'Categories'), SynergiaExamCategory),
+    'lessons': PreloadEndpoint(('Lessons',), SynergiaLesson),
+    'attendance_types': PreloadEndpoint(('Attendances', 'Types'), SynergiaAttendanceType),
+    'colors': PreloadEndpoint(('Colors',), SynergiaColor),
+}
+
+DEFAULT_ENDPOINTS = ('attendances', 'grades', 'subjects', 'school_free_days', 'teacher_free_days', 'teachers',
+                     'grade_categories', 'lessons', 'attendance_types')
+
+
+class CachePreloader:
+    """
+    Równolegle pobiera wybrane węzły API i zapisuje obiekty do cache, jednym zapisem zbiorczym dla każdej klasy
+    (z czasem ważności tej klasy).
+    """
+
+    def __init__(self, session, endpoints=DEFAULT_ENDPOINTS, max_workers=4, progress=None):
+        """
+        :param librus_tricks.core.SynergiaClient session: Obiekt sesji
+        :param endpoints: Nazwy węzłów z :data:`ENDPOINTS` lub własne obiekty :class:`PreloadEndpoint`
+        :param int max_workers: Maksymalna liczba równoległych zapytań
+        :param progress: Funkcja wywoływana po pobraniu każdego węzła z argumentami
+            ``(nazwa, liczba obiektów, czas w sekundach, wyjątek lub None)``
+        """
+        self.session = session
+        self.endpoints = {
+            endpoint if isinstance(endpoint, str) else '/'.join(endpoint.path):
+                ENDPOINTS[endpoint] if isinstance(endpoint, str) else endpoint
+            for endpoint in endpoints
+        }
+        self.max_workers = max_workers
+        self.progress = progress
+
+    def fetch(self, endpoint):
+        """
+        :param PreloadEndpoint endpoint: Węzeł API
+        :return: Krotki ``(uid, cls, resource)`` gotowe do zapisu w cache
+        :rtype: list[tuple]
+        """
+        response = self.session.get(*endpoint.path)
+        resources = response[SynergiaGenericClass.auto_extract(response)]
+        if isinstance(resources, dict):
+            resources = [resources]
+        return [(resource['Id'], endpoint.cls, resource) for resource in resources]
+
+    def run(self, clear=False):
+        """
+        Ładuje obiekty do cache. Wpisy są ważne tak długo jak ``expire`` ich klasy.
+
+        :param bool clear: Usuwa wcześniej zapisane obiekty
+        :rtype: PreloadReport
+        """
+        started = time.perf_counter()
+        objects = {}
+        counts = {}
+        timings = {}
+        errors = {}
+
+        def timed_fetch(endpoint):
+            fetch_started = time.perf_counter()
+            return self.fetch(endpoint), time.perf_counter() - fetch_started
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='librus-preload') as executor:
+            futures = {executor.submit(timed_fetch, endpoint): name for name, endpoint in self.endpoints.items()}
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    fetched, timings[name] = future.result()
+                except Exception as error:
+                    logging.warning('Preloading %s failed: %r', name, error)
+                    errors[name] = error
+                    fetched, timings[name] = [], None
+                if fetched:
+                    objects.setdefault(self.endpoints[name].cls, []).extend(fetched)
+                counts[name] = fetched.__len__()
+                logging.debug('Preloaded %s %s objects', counts[name], name)
+                if self.progress is not None:
+                    self.progress(name, counts[name], timings[name], errors.get(name))
+
+        write_started = time.perf_counter()
+        if clear:
+            self.session.cache.clear_objects()
+        for cls, fetched in objects.items():
+            self.session.cache.add_objects(fetched, ttl=cache_lib.max_lifetime_of(cls.create_defaults().get('expire')))
+        timings['cache_write'] = time.perf_counter() - write_started
+
+        report = PreloadReport(counts, timings, errors, time.perf_counter() - started)
+        logging.info('Loaded %s objects into cache in %.2fs', sum(counts.values()), report.elapsed)
+        return report
@@ -0,0 +1,173 @@
+"""
+Zrzuty cache do pliku, pozwalające szybko wypełnić pusty cache przy starcie procesu.
+
+Plik zaczyna się od nagłówka ``LTCACHE`` i numeru wersji formatu, a dalej jest strumień zlib z rekordami
+``[rodzaj: 1 bajt][długość: 4 bajty][json]``. Rekordy są zapisywane i czytane po kolei, więc zrzut nie musi
+mieścić się w pamięci, a format nie zależy od backendu, z którego został zapisany.
+
+>>> AlchemyCache.on_disk('cache.sqlite').export_snapshot('cache.snapshot')
+>>> session = create_session('email', 'hasło', cache=MemoryCache())
+>>> session.cache.import_snapshot('cache.snapshot')
+"""
+import logging
+import struct
+import zlib
+from collections import namedtuple
+from datetime import datetime
+
+from librus_tricks import classes
+from librus_tricks import codec as codec_lib
+from librus_tricks.cache import CachedQuery
+
+MAGIC = b'LTCACHE'
+VERSION = 1
+HEADER = struct.Struct('>H')
+RECORD = struct.Struct('>BI')
+QUERY, OBJECT, END = 1, 2, 0
+READ_SIZE = 64 * 1024
+
+SnapshotReport = namedtuple('SnapshotReport', ('queries', 'objects'))
+SnapshotReport.__doc__ = 'Liczba zapisanych lub wczytanych odpowiedzi i obiektów'
+
+
+class _ClassName:
+    """
+    Zastępuje klasę obiektu, której nie ma w :mod:`librus_tricks.classes`, backendy potrzebują tylko jej nazwy.
+    """
+
+    def __init__(self, name):
+        self.__name__ = name
+
+
+def _object_class(name):
+    return getattr(classes, name, None) or _ClassName(name)
+
+
+def _timestamp(last_load):
+    if last_load is None:
+        return None
+    return last_load.timestamp()
+
+
+def _open(file, mode):
+    if isinstance(file, str):
+        return open(file, mode), True
+    return file, False
+
+
+def dump(cache, target, compression_level=6):
+    """
+    Zapisuje wszystkie ważne odpowiedzi i obiekty z cache.
+
+    :param librus_tricks.cache.CacheBase cache: Cache z metodami ``iter_queries`` i ``iter_objects``
+    :param target: Ścieżka lub plik otwarty w trybie binarnym
+    :param int compression_level: Poziom kompresji zlib
+    :rtype: SnapshotReport
+    """
+    file, owned = _open(target, 'wb')
+    compressor = zlib.compressobj(compression_level)
+    counts = {QUERY: 0, OBJECT: 0}
+
+    def write(kind, value):
+        body = codec_lib.dumpb(value)
+        file.write(compressor.compress(RECORD.pack(kind, body.__len__()) + body))
+
+    try:
+        file.write(MAGIC + HEADER.pack(VERSION))
+        for query in cache.iter_queries():
+            write(QUERY, [query.uri, query.owner, _timestamp(query.last_load), query.response])
+            counts[QUERY] += 1
+        for cached_object in cache.iter_objects():
+            write(OBJECT, [cached_object.uid, cached_object.name, _timestamp(cached_object.last_load),
+                           cached_object.resource])
+            counts[OBJECT] += 1
+        write(END, [counts[QUERY], counts[OBJECT]])
+        file.write(compressor.flush())
+    finally:
+        if owned:
+            file.close()
+
+    logging.info('Dumped %s queries and %s objects', counts[QUERY], counts[OBJECT])
+    return SnapshotReport(counts[QUERY], counts[OBJECT])
+
+
+def iter_records(source):
+    """
+    Czyta rekordy zrzutu po kolei.
+
+    :param source: Ścieżka lub plik otwarty w trybie binarnym
+    :raises ValueError: Plik nie jest zrzutem, jest w nieobsługiwanej wersji lub jest niekompletny
+    :return: Pary ``(rodzaj, wartość)``
+    """
+    file, owned = _open(source, 'rb')
+    try:
+        header = file.read(MAGIC.__len__() + HEADER.size)
+        if header[:MAGIC.__len__()] != MAGIC:
+            raise ValueError('Not a librus-tricks cache snapshot')
+        version, = HEADER.unpack(header[MAGIC.__len__():])
+        if version > VERSION:
+            raise ValueError(f'Snapshot version {version} is newer than supported version {VERSION}')
+
+        decompressor = zlib.decompressobj()
+        buffer = bytearray()
+        finished = False
+        while not finished:
+            chunk = file.read(READ_SIZE)
+            buffer += decompressor.decompress(chunk) if chunk else decompressor.flush()
+            while buffer.__len__() >= RECORD.size:
+                kind, length = RECORD.unpack_from(buffer)
+                if buffer.__len__() < RECORD.size + length:
+                    break
+                value = codec_lib.loads(bytes(buffer[RECORD.size:RECORD.size + length]))
+                del buffer[:RECORD.size + length]
+                if kind == END:
+                    finished = True
+                    break
+                yield kind, value
+            if not chunk and not finished:
+                raise ValueError('Snapshot is truncated')
+    finally:
+        if owned:
+            file.close()
+
+
+def load(cache, source, ttl=None, batch_size=1000):
+    """
+    Wczytuje zrzut do cache partiami przez ``add_queries`` i ``add_objects``, zachowując czas pobrania
+    (``last_load``) każdego wpisu.
+
+    :param librus_tricks.cache.CacheBase cache: Docelowy cache, może być innego rodzaju niż źródłowy
+    :param source: Ścieżka lub plik otwarty w trybie binarnym
+    :param timedelta ttl: Czas przechowywania wpisów, domyślnie ustawiony dla całego cache
+    :param int batch_size: Liczba wpisów zapisywanych naraz
+    :rtype: SnapshotReport
+    """
+    queries, objects = [], []
+    counts = {QUERY: 0, OBJECT: 0}
+
+    def flush():
+        if queries:
+            cache.add_queries(queries, ttl)
+            queries.clear()
+        if objects:
+            cache.add_objects(objects, ttl)
+            objects.clear()
+
+    for kind, value in iter_records(source):
+        timestamp = value[2]
+        last_load = None if timestamp is None else datetime.fromtimestamp(timestamp)
+        if kind == QUERY:
+            queries.append(CachedQuery(value[0], value[1], value[3], last_load))
+        elif kind == OBJECT:
+            uid = int(value[0]) if isinstance(value[0], str) and value[0].isdigit() else value[0]
+            objects.append((uid, _object_class(value[1]), value[3], last_load))
+        else:
+            logging.debug('Skipping unknown snapshot record %s', kind)
+            continue
+        counts[kind] += 1
+        if queries.__len__() + objects.__len__() >= batch_size:
+            flush()
+    flush()
+
+    logging.info('Loaded %s queries and %s objects', counts[QUERY], counts[OBJECT])
+    return SnapshotReport(counts[QUERY], counts[OBJECT])
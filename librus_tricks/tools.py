@@ -2,7 +2,9 @@ from datetime import datetime, timedelta
 import re
 
 
-def get_next_monday(now=datetime.now()):
+def get_next_monday(now=None):
+    if now is None:
+        now = datetime.now()
     for _ in range(8):
         if now.weekday() == 0:
             return now.date()
@@ -10,7 +12,9 @@ def get_next_monday(now=datetime.now()):
     return
 
 
-def get_actual_monday(now=datetime.now()):
+def get_actual_monday(now=None):
+    if now is None:
+        now = datetime.now()
     for _ in range(8):
         if now.weekday() == 0:
             return now.date()
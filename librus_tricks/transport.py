@@ -0,0 +1,145 @@
+import logging
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class _SharedAdapter(HTTPAdapter):
+    """
+    Adapter montowany we wszystkich sesjach, ``requests.Session.close()`` nie zamyka wspólnej puli połączeń.
+    """
+
+    def close(self):
+        pass
+
+    def close_pool(self):
+        super().close()
+
+
+def _shared_httpx_transport(transport):
+    import httpx
+
+    class SharedHTTPTransport(httpx.BaseTransport):
+        """
+        Przekazuje zapytania do wspólnego transportu httpx, ``httpx.Client.close()`` go nie zamyka.
+        """
+
+        def handle_request(self, request):
+            return transport.handle_request(request)
+
+    return SharedHTTPTransport()
+
+
+class SynergiaTransport:
+    """
+    Pula połączeń http, którą może współdzielić wiele sesji.
+
+    Każda sesja dostaje własny obiekt ``requests.Session`` (własne ciasteczka i nagłówki), ale wszystkie korzystają
+    z tych samych, już nawiązanych połączeń do serwerów Librusa. Zamknięcie jednej sesji nie zamyka puli,
+    robi to dopiero :meth:`close`.
+    """
+
+    def __init__(self, pool_connections=10, max_connections_per_host=32, block=False, keep_alive=True, http2=False,
+                 keepalive_expiry=30.0, timeout=30.0):
+        """
+        :param int pool_connections: Liczba hostów, dla których trzymane są osobne pule połączeń
+        :param int max_connections_per_host: Maksymalna liczba połączeń do jednego hosta
+        :param bool block: Czekaj na wolne połączenie zamiast otwierać nadmiarowe
+        :param bool keep_alive: Utrzymuj połączenia pomiędzy zapytaniami
+        :param bool http2: Używaj HTTP/2 (multipleksowanie zapytań) dla API, wymaga ``httpx[http2]``
+        :param float keepalive_expiry: Czas utrzymywania bezczynnego połączenia HTTP/2 w sekundach
+        :param float timeout: Limit czasu zapytań HTTP/2 w sekundach
+        """
+        self.keep_alive = keep_alive
+        self.http2 = http2
+        self.timeout = timeout
+        self.closed = False
+        self.adapter = _SharedAdapter(pool_connections=pool_connections, pool_maxsize=max_connections_per_host,
+                                      pool_block=block)
+
+        if http2:
+            import httpx
+
+            self.__httpx_transport = httpx.HTTPTransport(http2=True, limits=httpx.Limits(
+                max_connections=pool_connections * max_connections_per_host,
+                max_keepalive_connections=max_connections_per_host if keep_alive else 0,
+                keepalive_expiry=keepalive_expiry
+            ))
+        else:
+            self.__httpx_transport = None
+
+    def new_session(self):
+        """
+        Tworzy nowy obiekt ``requests.Session`` korzystający ze wspólnej puli połączeń.
+
+        :rtype: requests.Session
+        """
+        session = requests.session()
+        session.mount('https://', self.adapter)
+        session.mount('http://', self.adapter)
+        if not self.keep_alive:
+            session.headers.update({'Connection': 'close'})
+        return session
+
+    def new_api_session(self):
+        """
+        Tworzy klienta http dla zapytań do API, przy włączonym HTTP/2 jest to ``httpx.Client``.
+
+        :rtype: requests.Session or httpx.Client
+        """
+        if self.__httpx_transport is None:
+            return self.new_session()
+
+        import httpx
+
+        return httpx.Client(transport=_shared_httpx_transport(self.__httpx_transport), timeout=self.timeout)
+
+    def close(self):
+        """
+        Zamyka wszystkie połączenia wszystkich sesji korzystających z tej puli. Wspólnej puli procesu
+        (:func:`get_default_transport`) nie da się tak zamknąć, służy do tego :func:`close_default_transport`.
+        """
+        if self is _default_transport:
+            logging.warning('Ignoring close() of the process-wide transport, use close_default_transport()')
+            return
+        self._close()
+
+    def _close(self):
+        self.closed = True
+        self.adapter.close_pool()
+        if self.__httpx_transport is not None:
+            self.__httpx_transport.close()
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} {"HTTP/2" if self.http2 else "HTTP/1.1"} ' \
+               f'with {self.adapter._pool_maxsize} connections per host>'
+
+
+_default_transport = None
+_default_transport_lock = threading.Lock()
+
+
+def get_default_transport():
+    """
+    Zwraca pulę połączeń współdzieloną domyślnie przez wszystkie sesje w procesie.
+
+    :rtype: SynergiaTransport
+    """
+    global _default_transport
+    with _default_transport_lock:
+        if _default_transport is None:
+            logging.debug('Creating default http transport')
+            _default_transport = SynergiaTransport()
+        return _default_transport
+
+
+def close_default_transport():
+    """
+    Zamyka wspólną pulę połączeń procesu, kolejne sesje dostaną nową pulę.
+    """
+    global _default_transport
+    with _default_transport_lock:
+        if _default_transport is not None:
+            transport, _default_transport = _default_transport, None
+            transport._close()
@@ -22,7 +22,11 @@ setuptools.setup(
         'requests', 'beautifulsoup4', 'SQLAlchemy'
     ],
     extras_require={
-        'tools': ['Flask', 'PrettyTable']
+        'tools': ['Flask', 'PrettyTable'],
+        'async': ['httpx'],
+        'http2': ['httpx[http2]'],
+        'redis': ['redis'],
+        'zstd': ['zstandard']
     },
     classifiers=[
         "Programming Language :: Python :: 3.6",
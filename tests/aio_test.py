@@ -0,0 +1,187 @@
+import asyncio
+import json
+import logging
+import sys
+import threading
+from datetime import timedelta
+
+sys.path.extend(['./'])
+
+import httpx
+import pytest
+
+from librus_tricks import exceptions
+from librus_tricks.aio import AsyncSynergiaClient
+from librus_tricks.cache import MemoryCache, StaleWhileRevalidate
+
+from conftest import make_user
+
+logging.basicConfig(level=logging.DEBUG,
+                    format='%(asctime)s - %(levelname)s - %(module)s:%(lineno)d - %(funcName)s - %(message)s',
+                    filename='pytest.log')
+
+GRADES = {'Grades': [
+    {'Id': uid, 'Grade': '5', 'AddDate': '2019-09-10 12:00:00', 'Date': '2019-09-10', 'Semester': 1,
+     'IsConstituent': True, 'IsSemester': False, 'IsSemesterProposition': False, 'IsFinal': False,
+     'IsFinalProposition': False, 'AddedBy': {'Id': uid % 2 + 1}, 'Subject': {'Id': 7}, 'Category': {'Id': 9}}
+    for uid in range(1, 5)
+]}
+ROUTES = {
+    'Grades': GRADES,
+    'Users': {'Users': [{'Id': uid, 'FirstName': 'Jan', 'LastName': f'Nauczyciel {uid}'} for uid in (1, 2)]},
+    'Subjects': {'Subjects': [{'Id': 7, 'Name': 'Matematyka', 'Short': 'mat'}]},
+    'Grades/Categories': {'Categories': [
+        {'Id': 9, 'Name': 'Sprawdzian', 'CountToTheAverage': True, 'ObligationToPerform': False, 'Standard': True,
+         'Weight': 3}
+    ]},
+    'LuckyNumbers': {'LuckyNumber': {'LuckyNumber': 7}},
+}
+
+
+class MockAPI:
+    def __init__(self):
+        self.requests = []
+        self.statuses = []
+
+    def __call__(self, request):
+        self.requests.append(request)
+        path = request.url.path[len('/2.0/'):]
+        if self.statuses:
+            status, payload = self.statuses.pop(0)
+            return httpx.Response(status, content=json.dumps(payload).encode())
+        matching = [key for key in ROUTES if path == key or path.startswith(key + '/')]
+        if not matching:
+            return httpx.Response(404, content=b'{"Status": "Error", "Code": "NotFound"}')
+        return httpx.Response(200, content=json.dumps(ROUTES[max(matching, key=len)]).encode())
+
+    def paths(self, prefix):
+        return [request.url.path for request in self.requests if request.url.path.startswith('/2.0/' + prefix)]
+
+
+@pytest.fixture
+def api():
+    return MockAPI()
+
+
+def run(api, scenario, user=None, **kwargs):
+    async def main():
+        client = httpx.AsyncClient(transport=httpx.MockTransport(api))
+        async with AsyncSynergiaClient(user or make_user(), api_url='https://api.test/2.0', http_client=client,
+                                       cache=kwargs.pop('cache', MemoryCache()), **kwargs) as session:
+            result = await scenario(session)
+        await client.aclose()
+        return result
+
+    return asyncio.run(main())
+
+
+def test_get_and_response_cache(api):
+    async def scenario(session):
+        assert await session.lucky_number() == 7
+        for _ in range(3):
+            await session.get_cached_response('LuckyNumbers')
+        return session.stats.snapshot()['LuckyNumbers']
+
+    stats = run(api, scenario)
+    assert api.paths('LuckyNumbers').__len__() == 2
+    assert (stats['misses'], stats['hits']) == (1, 2)
+
+
+def test_prefetch_relations(api):
+    async def scenario(session):
+        grades = await session.grades()
+        return [(grade.teacher.last_name, grade.subject.name, grade.category.weight) for grade in grades]
+
+    assert run(api, scenario) == [(f'Nauczyciel {uid % 2 + 1}', 'Matematyka', 3) for uid in range(1, 5)]
+    assert api.paths('Users') == ['/2.0/Users/1,2,']
+    assert api.paths('Subjects').__len__() == 1
+    assert api.paths('Grades/Categories').__len__() == 1
+
+
+def test_stale_while_revalidate(api):
+    policy = StaleWhileRevalidate(fresh=timedelta(0), max_age=timedelta(hours=1))
+
+    async def scenario(session):
+        await session.get_cached_response('LuckyNumbers', max_lifetime=policy)
+        ROUTES['LuckyNumbers'] = {'LuckyNumber': {'LuckyNumber': 8}}
+        try:
+            stale = await session.get_cached_response('LuckyNumbers', max_lifetime=policy)
+            await asyncio.sleep(0.05)
+            fresh = await session.get_cached_response('LuckyNumbers', max_lifetime=timedelta(hours=1))
+        finally:
+            ROUTES['LuckyNumbers'] = {'LuckyNumber': {'LuckyNumber': 7}}
+        return stale, fresh, session.stats.snapshot()['LuckyNumbers']
+
+    stale, fresh, stats = run(api, scenario)
+    assert stale['LuckyNumber']['LuckyNumber'] == 7
+    assert fresh['LuckyNumber']['LuckyNumber'] == 8
+    assert (stats['stale'], stats['refreshes']) == (1, 2)
+    assert api.paths('LuckyNumbers').__len__() == 2
+
+
+def test_failed_background_refresh_is_logged(api, caplog):
+    policy = StaleWhileRevalidate(fresh=timedelta(0), max_age=timedelta(hours=1))
+
+    async def scenario(session):
+        await session.get_cached_response('LuckyNumbers', max_lifetime=policy)
+        api.statuses.append((500, {'Status': 'Error'}))
+        stale = await session.get_cached_response('LuckyNumbers', max_lifetime=policy)
+        await asyncio.sleep(0.05)
+        again = await session.get_cached_response('LuckyNumbers', max_lifetime=policy)
+        await asyncio.sleep(0.05)
+        return stale, again
+
+    with caplog.at_level(logging.WARNING):
+        stale, again = run(api, scenario)
+    assert stale == again == ROUTES['LuckyNumbers']
+    assert 'Refreshing response failed' in caplog.text
+    assert 'never retrieved' not in caplog.text
+    assert api.paths('LuckyNumbers').__len__() == 3
+
+
+def test_negative_cache(api):
+    async def scenario(session):
+        for _ in range(3):
+            with pytest.raises(exceptions.SynergiaAPIEndpointNotFound):
+                await session.messages()
+        return session.stats.snapshot()['Messages']
+
+    stats = run(api, scenario)
+    assert api.paths('Messages').__len__() == 1
+    assert (stats['negative_stored'], stats['negative_hits']) == (1, 2)
+
+
+def test_token_expired_retry(api, monkeypatch):
+    api.statuses.append((401, {'Status': 'Error', 'Code': 'TokenIsExpired'}))
+    user = make_user()
+    monkeypatch.setattr(user, 'revalidate_user', lambda *args, **kwargs: setattr(user, 'token', 'renewed'))
+
+    async def scenario(session):
+        return await session.lucky_number()
+
+    assert run(api, scenario, user=user) == 7
+    assert [request.headers['Authorization'] for request in api.requests] == ['Bearer token-1', 'Bearer renewed']
+
+
+def test_cache_runs_outside_event_loop(api):
+    cache = MemoryCache()
+    threads = []
+    get_query = cache.get_query
+
+    def recording_get_query(*args, **kwargs):
+        threads.append(threading.get_ident())
+        return get_query(*args, **kwargs)
+
+    cache.get_query = recording_get_query
+
+    async def scenario(session):
+        await session.get_cached_response('LuckyNumbers')
+        return threading.get_ident()
+
+    loop_thread = run(api, scenario, cache=cache)
+    assert threads and loop_thread not in threads
+
+
+def test_default_cache_is_not_shared():
+    sessions = [AsyncSynergiaClient(make_user(), http_client=httpx.AsyncClient()) for _ in range(2)]
+    assert sessions[0].cache is not sessions[1].cache
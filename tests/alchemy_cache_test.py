@@ -0,0 +1,86 @@
+import logging
+import multiprocessing
+import sys
+import threading
+import time
+from datetime import timedelta
+
+sys.path.extend(['./'])
+
+import pytest
+from sqlalchemy import text
+
+from librus_tricks.cache import AlchemyCache, CacheSweeper
+from librus_tricks.classes import SynergiaSubject
+
+logging.basicConfig(level=logging.DEBUG,
+                    format='%(asctime)s - %(levelname)s - %(module)s:%(lineno)d - %(funcName)s - %(message)s',
+                    filename='pytest.log')
+
+
+def test_ttl_and_sweep():
+    cache = AlchemyCache(ttl=timedelta(hours=1))
+    cache.add_query('Grades', {}, '1', ttl=timedelta(milliseconds=20))
+    cache.add_query('Subjects', {}, '1')
+    cache.add_objects([(uid, SynergiaSubject, {'Id': uid}) for uid in range(1200)], ttl=timedelta(milliseconds=20))
+    time.sleep(0.05)
+    assert cache.get_query('Grades', '1') is None
+    assert cache.get_objects(range(10), SynergiaSubject) == {}
+    assert cache.sweep_expired(batch_size=500) == 1201
+    assert cache.count_queries() == 1
+    assert cache.count_object() == 0
+
+
+def test_sweeper_thread():
+    cache = AlchemyCache()
+    cache.add_query('Grades', {}, '1', ttl=timedelta(milliseconds=10))
+    sweeper = CacheSweeper(cache, interval=timedelta(milliseconds=20)).start()
+    time.sleep(0.2)
+    sweeper.stop()
+    assert cache.count_queries() == 0
+
+
+@pytest.mark.parametrize('in_file', [False, True])
+def test_threads(tmp_path, in_file):
+    cache = AlchemyCache(f'sqlite:///{tmp_path / "cache.sqlite"}' if in_file else 'sqlite:///:memory:')
+    errors = []
+
+    def work(thread_no):
+        try:
+            for number in range(100):
+                cache.add_query(f'Grades/{number}', {'thread': thread_no, 'number': number}, str(thread_no))
+                assert cache.get_query(f'Grades/{number}', str(thread_no)).response['number'] == number
+                cache.add_objects([(number, SynergiaSubject, {'Id': number})])
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=work, args=(thread_no,)) for thread_no in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert cache.count_queries() == 800
+    assert cache.count_object() == 100
+
+
+def write_from_process(path, process_no):
+    cache = AlchemyCache.on_disk(path)
+    for number in range(100):
+        cache.add_query(f'Grades/{number}', {'process': process_no}, str(process_no))
+
+
+def test_on_disk_processes(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    AlchemyCache.on_disk(path).dispose()
+    processes = [multiprocessing.Process(target=write_from_process, args=(path, process_no)) for process_no in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    assert [process.exitcode for process in processes] == [0, 0, 0, 0]
+
+    cache = AlchemyCache.on_disk(path)
+    assert cache.count_queries() == 400
+    with cache.transaction() as db_session:
+        assert db_session.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
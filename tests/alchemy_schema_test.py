@@ -0,0 +1,63 @@
+import logging
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+
+sys.path.extend(['./'])
+
+from sqlalchemy import inspect
+
+from librus_tricks.cache import AlchemyCache
+from librus_tricks.classes import SynergiaSubject
+
+logging.basicConfig(level=logging.DEBUG,
+                    format='%(asctime)s - %(levelname)s - %(module)s:%(lineno)d - %(funcName)s - %(message)s',
+                    filename='pytest.log')
+
+
+def test_upsert():
+    cache = AlchemyCache()
+    cache.add_query('Grades', {'Grades': []}, '1')
+    cache.add_query('Grades', {'Grades': [1]}, '1')
+    cache.add_query('Grades', {'Grades': [2]}, '2')
+    assert cache.count_queries() == 2
+    assert cache.get_query('Grades', '1').response == {'Grades': [1]}
+
+
+def test_object_upsert():
+    cache = AlchemyCache()
+    cache.add_object(1, SynergiaSubject, {'Id': 1, 'Name': 'Fizyka', 'Short': 'F'})
+    cache.add_objects([(1, SynergiaSubject, {'Id': 1, 'Name': 'Chemia', 'Short': 'C'}),
+                       (2, SynergiaSubject, {'Id': 2, 'Name': 'Biologia', 'Short': 'B'})])
+    assert cache.count_object() == 2
+    assert cache.get_object(1, SynergiaSubject).name == 'Chemia'
+
+
+def test_indexes():
+    cache = AlchemyCache()
+    inspector = inspect(cache.engine)
+    unique = [constraint['column_names'] for constraint in inspector.get_unique_constraints('api_query_cache')]
+    assert unique == [['uri', 'owner']]
+    assert inspector.get_pk_constraint('object_load_cache')['constrained_columns'] == ['uid', 'name']
+
+
+def test_legacy_migration(tmp_path):
+    path = tmp_path / 'legacy.sqlite'
+    connection = sqlite3.connect(str(path))
+    connection.execute('CREATE TABLE uri_cache (pk INTEGER PRIMARY KEY, uri VARCHAR(512), owner VARCHAR(16), '
+                       'response JSON, last_load DATETIME)')
+    connection.execute('CREATE TABLE object_cache (uid INTEGER PRIMARY KEY, name VARCHAR(64), resource JSON, '
+                       'last_load DATETIME)')
+    for version, loaded in ((1, datetime.now() - timedelta(hours=1)), (2, datetime.now())):
+        connection.execute('INSERT INTO uri_cache (uri, owner, response, last_load) VALUES (?, ?, ?, ?)',
+                           ('Grades', '1', f'{{"v": {version}}}', str(loaded)))
+    connection.execute('INSERT INTO object_cache (uid, name, resource, last_load) VALUES (?, ?, ?, ?)',
+                       (7, 'SynergiaSubject', '{"Id": 7, "Name": "Fizyka", "Short": "F"}', str(datetime.now())))
+    connection.commit()
+    connection.close()
+
+    cache = AlchemyCache(f'sqlite:///{path}')
+    assert cache.count_queries() == 1
+    assert cache.get_query('Grades', '1').response == {'v': 2}
+    assert cache.get_object(7, SynergiaSubject).name == 'Fizyka'
+    assert not {'uri_cache', 'object_cache'} & set(inspect(cache.engine).get_table_names())
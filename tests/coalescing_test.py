@@ -0,0 +1,104 @@
+import logging
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.extend(['./'])
+
+import pytest
+
+from librus_tricks import SynergiaClient, exceptions
+from librus_tricks.cache import MemoryCache
+
+logging.basicConfig(level=logging.DEBUG,
+                    format='%(asctime)s - %(levelname)s - %(module)s:%(lineno)d - %(funcName)s - %(message)s',
+                    filename='pytest.log')
+
+THREADS = 8
+
+
+def concurrently(operation):
+    barrier = threading.Barrier(THREADS)
+
+    def call(_):
+        barrier.wait()
+        try:
+            return operation()
+        except Exception as error:
+            return error
+
+    with ThreadPoolExecutor(THREADS) as executor:
+        return list(executor.map(call, range(THREADS)))
+
+
+@pytest.fixture
+def shared_cache():
+    cache = MemoryCache()
+    cache.writes = []
+    add_query = cache.add_query
+
+    def counting_add_query(uri, response, user_id, *args, **kwargs):
+        cache.writes.append(uri)
+        return add_query(uri, response, user_id, *args, **kwargs)
+
+    cache.add_query = counting_add_query
+    return cache
+
+
+def test_identical_requests_are_coalesced(stub_api, make_session, shared_cache):
+    stub_api.route('LuckyNumbers', {'LuckyNumber': {'LuckyNumber': 7}})
+    stub_api.delay = 0.3
+    sessions = [make_session(cache=shared_cache) for _ in range(THREADS)]
+    sessions_iter = iter(sessions)
+    lock = threading.Lock()
+
+    def fetch():
+        with lock:
+            session = next(sessions_iter)
+        return session.get_cached_response('LuckyNumbers')
+
+    results = concurrently(fetch)
+    assert results == [{'LuckyNumber': {'LuckyNumber': 7}}] * THREADS
+    assert stub_api.hits.__len__() == 1
+    assert shared_cache.writes.__len__() == 1
+    assert SynergiaClient.in_flight.__len__() == 0
+
+
+def test_leader_error_reaches_every_waiter(stub_api, make_session, shared_cache):
+    stub_api.route('LuckyNumbers', {'LuckyNumber': {'LuckyNumber': 7}})
+    stub_api.statuses.append(500)
+    stub_api.delay = 0.3
+    session = make_session(cache=shared_cache)
+
+    results = concurrently(lambda: session.get_cached_response('LuckyNumbers'))
+    assert all(isinstance(result, exceptions.SynergiaServerError) for result in results)
+    assert stub_api.hits.__len__() == 1
+    assert shared_cache.writes == []
+    assert SynergiaClient.in_flight.__len__() == 0
+
+
+def test_different_users_are_not_coalesced(stub_api, make_session, shared_cache):
+    stub_api.route('LuckyNumbers', {'LuckyNumber': {'LuckyNumber': 7}})
+    stub_api.delay = 0.1
+    sessions = [make_session(cache=shared_cache, user_id=str(uid)) for uid in range(2)]
+    with ThreadPoolExecutor(2) as executor:
+        list(executor.map(lambda session: session.get_cached_response('LuckyNumbers'), sessions))
+    assert stub_api.hits.__len__() == 2
+
+
+def test_sessions_with_different_caches_fill_their_own(stub_api, make_session):
+    stub_api.route('LuckyNumbers', {'LuckyNumber': {'LuckyNumber': 7}})
+    stub_api.delay = 0.3
+    sessions = [make_session(cache=MemoryCache()) for _ in range(2)]
+    refreshed = []
+    barrier = threading.Barrier(2)
+
+    def fetch(session):
+        barrier.wait()
+        return session.get_cached_response('LuckyNumbers', on_refresh=lambda _: refreshed.append(session))
+
+    with ThreadPoolExecutor(2) as executor:
+        assert list(executor.map(fetch, sessions)) == [{'LuckyNumber': {'LuckyNumber': 7}}] * 2
+    assert sorted(map(id, refreshed)) == sorted(map(id, sessions))
+    for session in sessions:
+        assert session.cache.get_query(f'{stub_api.url}/LuckyNumbers', '1') is not None
@@ -0,0 +1,102 @@
+import io
+import logging
+import sys
+
+sys.path.extend(['./'])
+
+import pytest
+import requests
+
+from librus_tricks import codec, exceptions
+from librus_tricks.auth import load_json
+
+from conftest import make_user
+
+logging.basicConfig(level=logging.DEBUG,
+                    format='%(asctime)s - %(levelname)s - %(module)s:%(lineno)d - %(funcName)s - %(message)s',
+                    filename='pytest.log')
+
+PAYLOAD = {'Grades': [{'Id': 1, 'Grade': '5+', 'Comment': 'Zażółć gęślą jaźń'}], 'Empty': None}
+
+
+class CountingCodec(codec.JSONCodec):
+    name = 'counting'
+
+    def __init__(self):
+        self.decoded = 0
+
+    def loads(self, data):
+        self.decoded += 1
+        return super().loads(data)
+
+
+@pytest.fixture
+def default_codec():
+    previous = codec.get_default_codec()
+    yield
+    codec.set_default_codec(previous)
+
+
+@pytest.mark.parametrize('codec_class', [
+    codec.JSONCodec,
+    pytest.param(codec.OrjsonCodec, marks=pytest.mark.skipif(codec.orjson is None, reason='orjson not installed')),
+])
+def test_round_trip(codec_class):
+    instance = codec_class()
+    assert instance.loads(instance.dumps(PAYLOAD)) == PAYLOAD
+    assert instance.loads(instance.dumpb(PAYLOAD)) == PAYLOAD
+    assert isinstance(instance.dumps(PAYLOAD), str)
+    assert isinstance(instance.dumpb(PAYLOAD), bytes)
+    assert 'Zażółć' in instance.dumps(PAYLOAD)
+
+
+def test_set_default_codec(default_codec):
+    counting = CountingCodec()
+    codec.set_default_codec(counting)
+    assert codec.get_default_codec() is counting
+    assert codec.loads(codec.dumps(PAYLOAD)) == PAYLOAD
+    assert counting.decoded == 1
+
+
+def test_response_is_decoded_once(stub_api, make_session, monkeypatch):
+    def forbidden_json(self, **kwargs):
+        raise AssertionError('Response.json must not be used')
+
+    monkeypatch.setattr(requests.Response, 'json', forbidden_json)
+    stub_api.route('Grades', PAYLOAD)
+    counting = CountingCodec()
+    session = make_session(codec=counting)
+
+    assert session.get('Grades') == PAYLOAD
+    assert counting.decoded == 1
+    assert session.get_cached_response('Grades') == PAYLOAD
+    assert session.get_cached_response('Grades') == PAYLOAD
+    assert counting.decoded == 2
+
+
+def test_error_response_is_decoded_once(stub_api, make_session):
+    stub_api.route('Grades', {'Status': 'Error', 'Code': 'Forbidden'}, 403)
+    counting = CountingCodec()
+    session = make_session(codec=counting)
+    with pytest.raises(exceptions.SynergiaForbidden) as error:
+        session.get('Grades')
+    assert error.value.args[1]['Code'] == 'Forbidden'
+    assert counting.decoded == 1
+
+
+@pytest.mark.parametrize('codec_class', [
+    codec.JSONCodec,
+    pytest.param(codec.OrjsonCodec, marks=pytest.mark.skipif(codec.orjson is None, reason='orjson not installed')),
+])
+def test_credentials_round_trip(default_codec, codec_class):
+    codec.set_default_codec(codec_class())
+    user = make_user('42')
+    user.name, user.last_name = 'Łucja', 'Żółkiewska'
+    cred_file = io.StringIO()
+    user.dump_credentials(cred_file)
+    cred_file.seek(0)
+
+    restored = load_json(cred_file)
+    assert (restored.token, restored.uid, restored.login, restored.root_token, restored.refresh_token) == \
+        (user.token, user.uid, user.login, user.root_token, user.refresh_token)
+    assert (restored.name, restored.last_name) == ('Łucja', 'Żółkiewska')
@@ -0,0 +1,46 @@
+import logging
+import sys
+
+sys.path.extend(['./'])
+
+import pytest
+
+from librus_tricks.cache import AlchemyCache, MemoryCache
+from librus_tricks.codec import PayloadCompressor
+
+logging.basicConfig(level=logging.DEBUG,
+                    format='%(asctime)s - %(levelname)s - %(module)s:%(lineno)d - %(funcName)s - %(message)s',
+                    filename='pytest.log')
+
+RESPONSE = {'Attendances': [{'Id': uid, 'Lesson': {'Id': uid % 40}, 'Type': {'Id': 1}, 'Date': '2019-09-02',
+                             'LessonNo': uid % 8} for uid in range(500)]}
+
+
+def test_threshold():
+    compressor = PayloadCompressor(threshold=1024)
+    assert compressor.pack({'LuckyNumber': 7})[:1] == b'j'
+    packed = compressor.pack(RESPONSE)
+    assert packed[:1] == b'z'
+    assert PayloadCompressor.unpack(packed) == RESPONSE
+    stats = compressor.stats()
+    assert stats['payloads'] == 2
+    assert stats['compressed'] == 1
+    assert stats['ratio'] < 0.5
+
+
+def test_zstd():
+    pytest.importorskip('zstandard')
+    compressor = PayloadCompressor('zstd')
+    assert PayloadCompressor.unpack(compressor.pack(RESPONSE)) == RESPONSE
+
+
+def test_unknown_algorithm():
+    with pytest.raises(ValueError):
+        PayloadCompressor('lzma')
+
+
+@pytest.mark.parametrize('cache_factory', [AlchemyCache, MemoryCache])
+def test_cache_roundtrip(cache_factory):
+    cache = cache_factory(compression=PayloadCompressor())
+    cache.add_query('Attendances', RESPONSE, '1')
+    assert cache.get_query('Attendances', '1').response == RESPONSE
@@ -0,0 +1,131 @@
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+sys.path.extend(['./'])
+
+import pytest
+
+from librus_tricks import SynergiaClient
+from librus_tricks.auth import SynergiaUser
+from librus_tricks.cache import MemoryCache
+
+API_PREFIX = '/2.0/'
+
+
+class StubAPI:
+    """
+    Serwer http udający API Synergii, pozwala testować sesje bez logowania.
+
+    Odpowiedzi są dobierane po najdłuższej pasującej ścieżce (``Grades`` pasuje też do ``Grades/1,2``), odpowiedź
+    może być dict'em, bytes (wysyłane bez zmian, np. strona html) lub funkcją przyjmującą ścieżkę bez prefiksu api
+    i zwracającą dict.
+    """
+
+    def __init__(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        self.server.daemon_threads = True
+        self.server.stub = self
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}/2.0'
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.routes = dict()
+            self.statuses = []  #: Kody http dla kolejnych zapytań, niezależnie od ścieżki
+            self.hits = []
+            self.delay = 0.0
+
+    def route(self, path, response, status=200):
+        """
+        :param str path: Ścieżka bez prefiksu api, np. ``Grades``
+        :param response: dict, bytes lub funkcja zwracająca dict
+        :param int status: Kod http
+        """
+        self.routes[path] = status, response
+        return self
+
+    def hits_for(self, path):
+        return [hit for hit in self.hits if urlsplit(hit).path[API_PREFIX.__len__():].split('/')[0] == path]
+
+    def respond(self, raw_path):
+        with self.lock:
+            self.hits.append(raw_path)
+            forced_status = self.statuses.pop(0) if self.statuses else None
+        if self.delay:
+            time.sleep(self.delay)
+
+        path = urlsplit(raw_path).path[API_PREFIX.__len__():]
+        matching = [key for key in self.routes if path == key or path.startswith(key + '/')]
+        if not matching:
+            return 404, {'Status': 'Error', 'Code': 'NotFound'}
+        status, response = self.routes[max(matching, key=len)]
+        if forced_status is not None and forced_status != 200:
+            return forced_status, {'Status': 'Error', 'Code': 'Stub'}
+        return status, response(path) if callable(response) else response
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        status, payload = self.server.stub.respond(self.path)
+        raw = isinstance(payload, bytes)
+        body = payload if raw else json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html' if raw else 'application/json')
+        self.send_header('Content-Length', str(body.__len__()))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def make_user(uid='1'):
+    return SynergiaUser(
+        {'accessToken': f'token-{uid}', 'studentName': 'Jan Kowalski', 'login': f'jk{uid}', 'id': uid},
+        'root', 'refresh', 3600
+    )
+
+
+@pytest.fixture(scope='session')
+def stub_server():
+    stub = StubAPI()
+    stub.start()
+    yield stub
+    stub.stop()
+
+
+@pytest.fixture
+def stub_api(stub_server):
+    stub_server.reset()
+    yield stub_server
+    stub_server.reset()
+
+
+@pytest.fixture
+def api_url(stub_api):
+    return stub_api.url
+
+
+@pytest.fixture
+def make_session(stub_api):
+    """
+    Tworzy sesje podłączone do serwera ``stub_api``, domyślnie z osobnym :class:`MemoryCache`.
+    """
+
+    def factory(cache=None, user_id='1', **kwargs):
+        return SynergiaClient(make_user(user_id), api_url=stub_api.url,
+                              cache=MemoryCache() if cache is None else cache, **kwargs)
+
+    return factory
@@ -0,0 +1,114 @@
+import logging
+import sys
+from datetime import datetime
+
+sys.path.extend(['./'])
+
+import pytest
+
+from librus_tricks.cache import CacheBase, CachedQuery
+from librus_tricks.classes import SynergiaColor
+
+logging.basicConfig(level=logging.DEBUG,
+                    format='%(asctime)s - %(levelname)s - %(module)s:%(lineno)d - %(funcName)s - %(message)s',
+                    filename='pytest.log')
+
+COLORS = {'Colors': [{'Id': uid, 'Name': f'Kolor {uid}', 'RGB': 'ff00ff'} for uid in (1, 2)]}
+
+
+class LegacyCache(CacheBase):
+    """
+    Backend napisany według dokumentacji starszej wersji, bez ``last_load``, ``ttl`` i ``session``.
+    """
+
+    syn_session = None
+
+    def __init__(self):
+        self.queries = {}
+        self.objects = {}
+
+    def add_query(self, uri, response, user_id):
+        self.queries[uri, user_id] = CachedQuery(uri, user_id, response, datetime.now())
+
+    def get_query(self, uri, user_id):
+        return self.queries.get((uri, user_id))
+
+    def del_query(self, uri, user_id):
+        self.queries.pop((uri, user_id), None)
+
+    def add_object(self, uid, cls, resource):
+        self.objects[str(uid), cls.__name__] = resource
+
+    def get_object(self, uid, cls):
+        resource = self.objects.get((str(uid), cls.__name__))
+        return None if resource is None else cls.assembly(resource, self.syn_session)
+
+    def del_object(self, uid):
+        for key in [key for key in self.objects if key[0] == str(uid)]:
+            del self.objects[key]
+
+
+@pytest.fixture
+def api(stub_api):
+    stub_api.route('Colors', COLORS)
+    stub_api.route('Colors/2', {'Color': COLORS['Colors'][1]})
+    return stub_api
+
+
+def test_legacy_queries(api, make_session):
+    cache = LegacyCache()
+    session = make_session(cache)
+    assert session.get_cached_response('Colors') == COLORS
+    assert session.get_cached_response('Colors') == COLORS
+    assert api.hits_for('Colors').__len__() == 1
+    assert cache.queries.__len__() == 1
+
+
+def test_legacy_objects(api, make_session):
+    cache = LegacyCache()
+    session = make_session(cache)
+    assert session.cache_objects(SynergiaColor, COLORS) == 2
+    assert SynergiaColor.create(uid=2, session=session).name == 'Kolor 2'
+    assert api.hits == []
+
+    cache.objects.clear()
+    assert SynergiaColor.create(uid=2, session=make_session(cache)).name == 'Kolor 2'
+    assert ('2', 'SynergiaColor') in cache.objects
+
+
+def test_legacy_objects_are_bound_to_session(api, make_session):
+    cache = LegacyCache()
+    session = make_session(cache)
+    session.cache_objects(SynergiaColor, COLORS)
+    assert cache.get_object(1, SynergiaColor)._session is None
+    assert cache.get_object(1, SynergiaColor, session=session)._session is session
+    found = cache.get_objects([1, 2, 3], SynergiaColor, session=session)
+    assert sorted(found) == ['1', '2']
+    assert all(color._session is session for color in found.values())
+
+
+def test_bulk_writes_skip_new_arguments():
+    cache = LegacyCache()
+    loaded = datetime(2020, 1, 1)
+    cache.add_queries([CachedQuery('Colors', '1', COLORS, loaded)])
+    cache.add_objects([(1, SynergiaColor, COLORS['Colors'][0], loaded)])
+    assert cache.get_query('Colors', '1').response == COLORS
+    assert cache.get_query('Colors', '1').last_load != loaded
+    assert cache.objects == {('1', 'SynergiaColor'): COLORS['Colors'][0]}
+
+
+def test_current_backends_are_not_wrapped():
+    class FullCache(LegacyCache):
+        def add_query(self, uri, response, user_id, last_load=None, ttl=None):
+            self.queries[uri, user_id] = ttl
+
+    class KeywordCache(LegacyCache):
+        def add_object(self, uid, cls, resource, **kwargs):
+            self.objects[str(uid), cls.__name__] = kwargs
+
+    assert hasattr(LegacyCache.add_query, '__wrapped__')
+    assert not hasattr(FullCache.add_query, '__wrapped__')
+    assert not hasattr(KeywordCache.add_object, '__wrapped__')
+    cache = KeywordCache()
+    cache.add_object(1, SynergiaColor, {}, ttl=5)
+    assert cache.objects == {('1', 'SynergiaColor'): {'ttl': 5}}
@@ -0,0 +1,76 @@
+import logging
+import sys
+import time
+from datetime import timedelta
+
+sys.path.extend(['./'])
+
+import pytest
+
+from librus_tricks.cache import DumbCache, ObjectIdentityMap
+from librus_tricks.classes import SynergiaColor
+
+logging.basicConfig(level=logging.DEBUG,
+                    format='%(asctime)s - %(levelname)s - %(module)s:%(lineno)d - %(funcName)s - %(message)s',
+                    filename='pytest.log')
+
+COLOR = {'Color': {'Id': 1, 'Name': 'Fioletowy', 'RGB': 'ff00ff'}}
+
+
+@pytest.fixture
+def api(stub_api):
+    return stub_api.route('Colors', COLOR)
+
+
+def test_create_returns_same_instance(api, make_session):
+    session = make_session(cache=DumbCache())
+    first = SynergiaColor.create(uid=1, session=session)
+    assert SynergiaColor.create(uid=1, session=session) is first
+    assert session.identity_map.__len__() == 1
+    assert api.hits.__len__() == 1
+
+
+def test_expired_instance_is_rebuilt(api, make_session):
+    session = make_session(cache=DumbCache())
+    first = SynergiaColor.create(uid=1, session=session, expire=timedelta(0))
+    time.sleep(0.01)
+    second = SynergiaColor.create(uid=1, session=session, expire=timedelta(0))
+    assert second is not first
+    assert api.hits.__len__() == 2
+
+
+def test_session_map_size(api, make_session):
+    session = make_session(cache=DumbCache(), identity_map_size=0)
+    assert SynergiaColor.create(uid=1, session=session) is not SynergiaColor.create(uid=1, session=session)
+    assert session.identity_map.__len__() == 0
+
+
+def test_least_recently_used_is_evicted():
+    identity_map = ObjectIdentityMap(2)
+    identity_map.put(SynergiaColor, 1, 'first')
+    identity_map.put(SynergiaColor, 2, 'second')
+    assert identity_map.get(SynergiaColor, 1, timedelta(hours=1)) == 'first'
+    identity_map.put(SynergiaColor, 3, 'third')
+    assert identity_map.__len__() == 2
+    assert identity_map.get(SynergiaColor, 2, timedelta(hours=1)) is None
+    assert identity_map.get(SynergiaColor, 1, timedelta(hours=1)) == 'first'
+    assert identity_map.get(SynergiaColor, 3, timedelta(hours=1)) == 'third'
+
+
+def test_expired_entry_is_dropped():
+    identity_map = ObjectIdentityMap()
+    identity_map.put(SynergiaColor, 1, 'first')
+    time.sleep(0.01)
+    assert identity_map.get(SynergiaColor, 1, timedelta(0)) is None
+    assert identity_map.__len__() == 0
+
+
+def test_int_and_str_keys_are_the_same():
+    identity_map = ObjectIdentityMap()
+    identity_map.put(SynergiaColor, 1, 'first')
+    assert identity_map.get(SynergiaColor, '1', timedelta(hours=1)) == 'first'
+    identity_map.put(SynergiaColor, '1', 'replaced')
+    assert identity_map.__len__() == 1
+    assert identity_map.get(SynergiaColor, 1, timedelta(hours=1)) == 'replaced'
+    identity_map.discard(SynergiaColor, '1')
+    assert identity_map.get(SynergiaColor, 1, timedelta(hours=1)) is None
@@ -0,0 +1,69 @@
+import logging
+import sys
+
+sys.path.extend(['./'])
+
+import pytest
+
+from librus_tricks.cache import AlchemyCache, MemoryCache
+from librus_tricks.classes import SynergiaGrade
+
+logging.basicConfig(level=logging.DEBUG,
+                    format='%(asctime)s - %(levelname)s - %(module)s:%(lineno)d - %(funcName)s - %(message)s',
+                    filename='pytest.log')
+
+
+def grade(uid, value='5'):
+    return {
+        'Id': uid, 'Grade': value, 'AddDate': '2019-09-10 12:00:00', 'Date': '2019-09-10', 'Semester': 1,
+        'IsConstituent': True, 'IsSemester': False, 'IsSemesterProposition': False, 'IsFinal': False,
+        'IsFinalProposition': False, 'AddedBy': {'Id': 1}, 'Subject': {'Id': 2}, 'Category': {'Id': 3},
+        'Student': {'Id': 4},
+    }
+
+
+class FakeSession:
+    pass
+
+
+@pytest.mark.parametrize('backend', [MemoryCache, AlchemyCache])
+def test_same_session_gets_same_instance(backend):
+    cache = backend().keep_instances()
+    session = FakeSession()
+    cache.add_object(1, SynergiaGrade, grade(1))
+    first = cache.get_object(1, SynergiaGrade, session=session)
+    assert first is cache.get_object(1, SynergiaGrade, session=session)
+    assert first._session is session
+
+
+@pytest.mark.parametrize('backend', [MemoryCache, AlchemyCache])
+def test_other_session_gets_bound_copy(backend):
+    cache = backend().keep_instances()
+    session, other = FakeSession(), FakeSession()
+    cache.add_object(1, SynergiaGrade, grade(1))
+    first = cache.get_object(1, SynergiaGrade, session=session)
+    second = cache.get_object(1, SynergiaGrade, session=other)
+    assert second is not first
+    assert second._session is other and first._session is session
+    assert second.objects is not first.objects
+    assert second.grade == first.grade
+
+
+@pytest.mark.parametrize('backend', [MemoryCache, AlchemyCache])
+def test_write_forgets_instance(backend):
+    cache = backend().keep_instances()
+    session = FakeSession()
+    cache.add_object(1, SynergiaGrade, grade(1))
+    assert cache.get_object(1, SynergiaGrade, session=session).grade == '5'
+    cache.add_object(1, SynergiaGrade, grade(1, '3'))
+    assert cache.get_object(1, SynergiaGrade, session=session).grade == '3'
+    cache.del_object(1)
+    assert cache.get_object(1, SynergiaGrade, session=session) is None
+
+
+def test_disabled_by_default():
+    cache = MemoryCache()
+    session = FakeSession()
+    cache.add_object(1, SynergiaGrade, grade(1))
+    assert cache.get_object(1, SynergiaGrade, session=session) is not cache.get_object(1, SynergiaGrade,
+                                                                                         session=session)
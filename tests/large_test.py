@@ -110,3 +110,11 @@ def test_realizations_gather():
     realizations = session.realizations()
     for rel in realizations:
         assert rel.uid == session.realizations(rel.uid)[0].uid
+
+
+def test_grades_prefetch():
+    ensure_session()
+    grades = session.grades(prefetch=('teacher', 'subject', 'category'))
+    for grade in grades:
+        assert {'teacher', 'subject', 'category'}.isdisjoint(grade.objects.pending())
+    return [(x.teacher, x.subject, x.category) for x in grades]
@@ -0,0 +1,76 @@
+import logging
+import sys
+import threading
+import time
+from datetime import timedelta
+
+sys.path.extend(['./'])
+
+from librus_tricks.cache import MemoryCache
+from librus_tricks.classes import SynergiaSubject
+
+logging.basicConfig(level=logging.DEBUG,
+                    format='%(asctime)s - %(levelname)s - %(module)s:%(lineno)d - %(funcName)s - %(message)s',
+                    filename='pytest.log')
+
+
+def test_queries():
+    cache = MemoryCache()
+    cache.add_query('Grades', {'Grades': []}, '1')
+    cache.add_query('Grades', {'Grades': [1]}, '1')
+    assert cache.get_query('Grades', '1').response == {'Grades': [1]}
+    assert cache.get_query('Grades', '2') is None
+    assert cache.count_queries() == 1
+    cache.del_query('Grades', '1')
+    assert cache.get_query('Grades', '1') is None
+
+
+def test_objects():
+    cache = MemoryCache()
+    cache.add_objects([(1, SynergiaSubject, {'Id': 1, 'Name': 'Matematyka', 'No': 1, 'Short': 'mat',
+                                             'IsExtracurricular': False, 'IsBlockLesson': False})])
+    assert cache.get_object(1, SynergiaSubject).name == 'Matematyka'
+    cache.del_object(1)
+    assert cache.count_object() == 0
+
+
+def test_lru_eviction():
+    cache = MemoryCache(max_entries=2)
+    cache.add_query('a', {}, '1')
+    cache.add_query('b', {}, '1')
+    cache.get_query('a', '1')
+    cache.add_query('c', {}, '1')
+    assert cache.get_query('b', '1') is None
+    assert cache.get_query('a', '1') is not None
+
+
+def test_size_eviction():
+    cache = MemoryCache(max_bytes=100)
+    cache.add_query('a', {'data': 'x' * 60}, '1')
+    cache.add_query('b', {'data': 'x' * 60}, '1')
+    assert cache.get_query('a', '1') is None
+    assert cache.size <= 100
+
+
+def test_ttl():
+    cache = MemoryCache(ttl=timedelta(milliseconds=20))
+    cache.add_query('a', {}, '1')
+    time.sleep(0.05)
+    assert cache.get_query('a', '1') is None
+    assert cache.__len__() == 0
+
+
+def test_threads():
+    cache = MemoryCache(max_entries=50)
+
+    def work(thread_no):
+        for number in range(500):
+            cache.add_query(f'{thread_no}/{number}', {'n': number}, '1')
+            cache.get_query(f'{thread_no}/{number - 1}', '1')
+
+    threads = [threading.Thread(target=work, args=(thread_no,)) for thread_no in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cache.__len__() == 50
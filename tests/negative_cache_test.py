@@ -0,0 +1,41 @@
+import logging
+import sys
+
+sys.path.extend(['./'])
+
+import pytest
+
+from librus_tricks import exceptions
+
+logging.basicConfig(level=logging.DEBUG,
+                    format='%(asctime)s - %(levelname)s - %(module)s:%(lineno)d - %(funcName)s - %(message)s',
+                    filename='pytest.log')
+
+ERROR = {'Status': 'Error', 'Code': 'Disabled'}
+
+
+@pytest.fixture
+def api(stub_api):
+    return stub_api.route('Messages', ERROR, 404).route('Realizations', ERROR, 403).route('Colors', {'Colors': []})
+
+
+def test_errors_are_replayed(api, make_session):
+    session = make_session()
+    for _ in range(3):
+        with pytest.raises(exceptions.SynergiaAPIEndpointNotFound):
+            session.messages()
+        with pytest.raises(exceptions.SynergiaForbidden) as error:
+            session.realizations()
+    assert error.value.args[1]['Code'] == 'Disabled'
+    assert api.hits.__len__() == 2
+    assert session.stats.snapshot()['Messages']['negative_hits'] == 2
+    assert session.stats.snapshot()['Realizations']['negative_stored'] == 1
+
+
+def test_opt_out(api, make_session):
+    session = make_session(negative_cache_ttl=None)
+    for _ in range(2):
+        with pytest.raises(exceptions.SynergiaAPIEndpointNotFound):
+            session.messages()
+    assert api.hits.__len__() == 2
+    assert session.colors() == tuple()
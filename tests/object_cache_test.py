@@ -0,0 +1,46 @@
+import logging
+import sys
+
+sys.path.extend(['./'])
+
+import pytest
+
+from librus_tricks.cache import AlchemyCache, MemoryCache
+from librus_tricks.classes import SynergiaColor
+
+logging.basicConfig(level=logging.DEBUG,
+                    format='%(asctime)s - %(levelname)s - %(module)s:%(lineno)d - %(funcName)s - %(message)s',
+                    filename='pytest.log')
+
+COLORS = {uid: {'Id': uid, 'Name': f'Kolor {uid}', 'RGB': 'ff00ff'} for uid in range(1, 6)}
+
+
+def colors(path):
+    ids = path.split('/')[1:]
+    if ids and ids[0]:
+        return {'Colors': [COLORS[int(uid)] for uid in ids[0].split(',') if uid and int(uid) in COLORS]}
+    return {'Colors': list(COLORS.values())}
+
+
+@pytest.fixture
+def api(stub_api):
+    return stub_api.route('Colors', colors)
+
+
+@pytest.mark.parametrize('cache', [MemoryCache, AlchemyCache])
+def test_collection_fills_object_cache(api, make_session, cache):
+    session = make_session(cache())
+    assert session.colors().__len__() == 5
+    assert session.cache.count_object() == 5
+
+    other = make_session(session.cache)
+    assert [color.uid for color in other.colors(4, 2)] == [4, 2]
+    assert SynergiaColor.create(uid=3, session=other).name == 'Kolor 3'
+    assert api.hits.__len__() == 1
+
+
+def test_only_missing_ids_are_fetched(api, make_session):
+    session = make_session(MemoryCache())
+    session.colors(1)
+    assert [color.uid for color in session.colors(1, 2)] == [1, 2]
+    assert api.hits[-1].endswith('/Colors/2,')
@@ -0,0 +1,96 @@
+import logging
+import sys
+from datetime import timedelta
+
+sys.path.extend(['./'])
+
+import pytest
+
+from librus_tricks import cache, exceptions
+from librus_tricks.policy import CircuitBreaker, RateLimiter, RequestPolicy, RetryPolicy
+
+logging.basicConfig(level=logging.DEBUG,
+                    format='%(asctime)s - %(levelname)s - %(module)s:%(lineno)d - %(funcName)s - %(message)s',
+                    filename='pytest.log')
+
+LUCKY_NUMBER = {'LuckyNumber': {'LuckyNumber': 7}}
+
+
+@pytest.fixture
+def make_policy_session(stub_api, make_session):
+    stub_api.route('LuckyNumbers', LUCKY_NUMBER)
+    return lambda policy: make_session(cache=cache.DumbCache(), policy=policy)
+
+
+def test_retry_server_errors(stub_api, make_policy_session):
+    waits = []
+    policy = RequestPolicy(retry=RetryPolicy(max_retries=3, backoff_base=0.01),
+                           circuit_breaker=CircuitBreaker(open_on_maintenance=False), sleep=waits.append)
+    stub_api.statuses.extend([500, 503])
+    assert make_policy_session(policy).lucky_number == 7
+    assert stub_api.hits.__len__() == 3
+    assert policy.metrics.snapshot()['retries'] == 2
+    assert waits.__len__() == 2
+
+
+def test_retry_gives_up(stub_api, make_policy_session):
+    policy = RequestPolicy(retry=RetryPolicy(max_retries=1, backoff_base=0.01),
+                           circuit_breaker=CircuitBreaker(failure_threshold=10), sleep=lambda _: None)
+    stub_api.statuses.extend([500, 500, 500])
+    with pytest.raises(exceptions.SynergiaServerError):
+        make_policy_session(policy).get('LuckyNumbers')
+    assert stub_api.hits.__len__() == 2
+
+
+def test_circuit_opens_on_maintenance(stub_api, make_policy_session):
+    policy = RequestPolicy(circuit_breaker=CircuitBreaker(reset_timeout=timedelta(hours=1)), sleep=lambda _: None)
+    session = make_policy_session(policy)
+    stub_api.statuses.append(503)
+    with pytest.raises(exceptions.SynergiaMaintenanceError):
+        session.get('LuckyNumbers')
+    with pytest.raises(exceptions.SynergiaCircuitOpen):
+        session.get('LuckyNumbers')
+    assert stub_api.hits.__len__() == 1
+    assert policy.metrics.snapshot()['circuit_rejected'] == 1
+
+
+def test_rate_limiter(stub_api, make_policy_session):
+    waits = []
+    policy = RequestPolicy(rate_limiter=RateLimiter(per_account=2, burst=2), sleep=waits.append)
+    session = make_policy_session(policy)
+    for _ in range(4):
+        session.get('LuckyNumbers')
+    assert waits.__len__() == 2
+    assert policy.metrics.snapshot()['rate_limited'] == 2
+
+
+def test_maintenance_is_not_retried_by_default(stub_api, make_policy_session):
+    assert issubclass(exceptions.SynergiaMaintenanceError, exceptions.SynergiaServerError)
+    policy = RequestPolicy(sleep=lambda _: None)
+    stub_api.statuses.extend([503, 503])
+    with pytest.raises(exceptions.SynergiaMaintenanceError):
+        make_policy_session(policy).get('LuckyNumbers')
+    assert stub_api.hits.__len__() == 1
+    assert policy.metrics.snapshot()['retries'] == 0
+
+
+@pytest.mark.parametrize('status', [502, 504])
+def test_retry_gateway_errors(stub_api, make_policy_session, status):
+    policy = RequestPolicy(retry=RetryPolicy(max_retries=2, backoff_base=0.01), sleep=lambda _: None)
+    stub_api.statuses.append(status)
+    assert make_policy_session(policy).lucky_number == 7
+    assert stub_api.hits.__len__() == 2
+    assert policy.metrics.snapshot()['retries'] == 1
+
+
+def test_html_error_page(stub_api, make_session):
+    stub_api.route('Gateway', b'<html><body>502 Bad Gateway</body></html>', status=502)
+    with pytest.raises(exceptions.SynergiaServerError) as error:
+        make_session(cache=cache.DumbCache()).get('Gateway')
+    assert not isinstance(error.value, exceptions.SynergiaMaintenanceError)
+
+
+def test_other_codes(stub_api, make_session):
+    stub_api.route('Limited', b'', status=429)
+    with pytest.raises(exceptions.OtherHTTPResponse):
+        make_session(cache=cache.DumbCache()).get('Limited')
@@ -0,0 +1,59 @@
+import itertools
+import logging
+import sys
+
+sys.path.extend(['./'])
+
+import pytest
+
+from librus_tricks import SessionPool
+from librus_tricks.cache import MemoryCache
+from librus_tricks.classes import SynergiaColor
+
+logging.basicConfig(level=logging.DEBUG,
+                    format='%(asctime)s - %(levelname)s - %(module)s:%(lineno)d - %(funcName)s - %(message)s',
+                    filename='pytest.log')
+
+
+@pytest.fixture
+def api(stub_api):
+    # Każde zapytanie zwraca obiekty innego konta
+    accounts = itertools.count()
+
+    def colors(path):
+        first = next(accounts) * 10 + 1
+        return {'Colors': [{'Id': uid, 'Name': f'Kolor {uid}', 'RGB': 'ff00ff'} for uid in (first, first + 1)]}
+
+    return stub_api.route('Colors', colors)
+
+
+def test_preload_keeps_objects_of_every_account(api, make_session):
+    cache = MemoryCache()
+    cache.add_object(99, SynergiaColor, {'Id': 99, 'Name': 'Kolor 99', 'RGB': '000000'})
+    pool = SessionPool([make_session(cache, '1'), make_session(cache, '2')], max_workers=1)
+
+    results = pool.preload_cache(['colors'], clear=True)
+    assert all(item.error is None for item in results.values())
+    assert api.hits_for('Colors').__len__() == 2
+    assert cache.count_object() == 4
+    assert cache.get_object(99, SynergiaColor) is None
+    for uid in (1, 2, 11, 12):
+        assert cache.get_object(uid, SynergiaColor) is not None
+
+
+def test_preload_without_clear(api, make_session):
+    cache = MemoryCache()
+    cache.add_object(99, SynergiaColor, {'Id': 99, 'Name': 'Kolor 99', 'RGB': '000000'})
+    pool = SessionPool([make_session(cache, '1'), make_session(cache, '2')])
+
+    pool.preload_cache(['colors'])
+    assert cache.count_object() == 5
+
+
+def test_map_collects_errors(stub_api, make_session):
+    stub_api.route('Grades', {'Grades': []})
+    pool = SessionPool([make_session(user_id='1'), make_session(user_id='2')], max_workers=1)
+    stub_api.statuses = [500]
+
+    results = pool.map_all(lambda session: session.get('Grades'))
+    assert sorted(item.error is None for item in results.values()) == [False, True]
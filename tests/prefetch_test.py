@@ -0,0 +1,69 @@
+import logging
+import sys
+
+sys.path.extend(['./'])
+
+import pytest
+
+logging.basicConfig(level=logging.DEBUG,
+                    format='%(asctime)s - %(levelname)s - %(module)s:%(lineno)d - %(funcName)s - %(message)s',
+                    filename='pytest.log')
+
+TEACHERS = {uid: {'Id': uid, 'FirstName': 'Jan', 'LastName': f'Nauczyciel {uid}'} for uid in range(1, 61)}
+SUBJECTS = {uid: {'Id': uid, 'Name': f'Przedmiot {uid}', 'Short': f'P{uid}'} for uid in range(1, 4)}
+CATEGORIES = {
+    uid: {'Id': uid, 'Name': f'Kategoria {uid}', 'CountToTheAverage': True, 'ObligationToPerform': False,
+          'Standard': True, 'Weight': uid}
+    for uid in range(1, 3)
+}
+GRADES = [
+    {'Id': 1000 + number, 'Grade': '5', 'AddDate': '2019-09-10 12:00:00', 'Date': '2019-09-10', 'Semester': 1,
+     'IsConstituent': True, 'IsSemester': False, 'IsSemesterProposition': False, 'IsFinal': False,
+     'IsFinalProposition': False, 'AddedBy': {'Id': number % 60 + 1}, 'Subject': {'Id': number % 3 + 1},
+     'Category': {'Id': number % 2 + 1}, 'Student': {'Id': 1}, 'Comments': [{'Id': 5}]}
+    for number in range(120)
+]
+
+
+def by_ids(key, objects):
+    def respond(path):
+        ids = path.rstrip('/').split('/')[-1]
+        return {key: [objects[int(uid)] for uid in ids.split(',') if uid]}
+
+    return respond
+
+
+@pytest.fixture
+def api(stub_api):
+    return stub_api.route('Grades', {'Grades': GRADES}).route('Users', by_ids('Users', TEACHERS)) \
+        .route('Subjects', by_ids('Subjects', SUBJECTS)).route('Grades/Categories', by_ids('Categories', CATEGORIES))
+
+
+def test_one_request_per_chunk(api, make_session):
+    session = make_session()
+    grades = session.grades(prefetch=('teacher', 'subject', 'category'))
+    assert grades.__len__() == 120
+
+    users, subjects = api.hits_for('Users'), api.hits_for('Subjects')
+    categories = [hit for hit in api.hits if '/Grades/Categories/' in hit]
+    assert users.__len__() == 2  # 60 nauczycieli w paczkach po 50
+    requested = [uid for hit in users for uid in hit.split('/')[-1].split(',') if uid]
+    assert sorted(requested, key=int) == [str(uid) for uid in range(1, 61)]
+    assert subjects.__len__() == 1 and subjects[0].endswith('/Subjects/1,2,3,')
+    assert categories.__len__() == 1 and categories[0].endswith('/Grades/Categories/1,2,')
+
+    hits = api.hits.__len__()
+    for grade in grades:
+        assert {'teacher', 'subject', 'category'}.isdisjoint(grade.objects.pending())
+        assert grade.teacher.last_name == f'Nauczyciel {grade.objects.return_id("teacher")}'
+        assert grade.subject.name.startswith('Przedmiot')
+        assert grade.category.weight in (1, 2)
+    assert api.hits.__len__() == hits
+
+
+def test_chunk_size(api, make_session):
+    session = make_session()
+    grades = session.grades()
+    session.prefetch(grades, 'teacher', chunk_size=7)
+    assert api.hits_for('Users').__len__() == 9
+    assert api.hits_for('Subjects') == []
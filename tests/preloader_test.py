@@ -0,0 +1,120 @@
+import logging
+import sys
+import threading
+import time
+from datetime import timedelta
+
+sys.path.extend(['./'])
+
+import pytest
+
+from librus_tricks.cache import MemoryCache
+from librus_tricks.classes import SynergiaColor, SynergiaLesson, SynergiaSubject
+from librus_tricks.preload import CachePreloader, PreloadEndpoint
+
+logging.basicConfig(level=logging.DEBUG,
+                    format='%(asctime)s - %(levelname)s - %(module)s:%(lineno)d - %(funcName)s - %(message)s',
+                    filename='pytest.log')
+
+COLORS = {'Colors': [{'Id': uid, 'Name': f'Kolor {uid}', 'RGB': 'ff00ff'} for uid in (1, 2, 3)]}
+SUBJECTS = {'Subjects': [{'Id': uid, 'Name': f'Przedmiot {uid}', 'Short': f'P{uid}'} for uid in (1, 2)]}
+LESSONS = {'Lessons': [{'Id': 1, 'Teacher': {'Id': 1}, 'Subject': {'Id': 1}}]}
+
+
+class Concurrency:
+    """
+    Mierzy największą liczbę jednocześnie obsługiwanych zapytań.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+
+    def __call__(self, response):
+        def respond(path):
+            with self.lock:
+                self.active += 1
+                self.peak = max(self.peak, self.active)
+            time.sleep(0.2)
+            with self.lock:
+                self.active -= 1
+            return response
+
+        return respond
+
+
+@pytest.fixture
+def api(stub_api):
+    concurrency = Concurrency()
+    stub_api.route('Colors', concurrency(COLORS))
+    stub_api.route('Subjects', concurrency(SUBJECTS))
+    stub_api.route('Lessons', concurrency(LESSONS))
+    stub_api.concurrency = concurrency
+    return stub_api
+
+
+@pytest.fixture
+def cache():
+    cache = MemoryCache()
+    cache.ttls = {}
+    add_objects = cache.add_objects
+
+    def recording_add_objects(objects, ttl=None):
+        for _, cls, *_ in objects:
+            cache.ttls[cls] = ttl
+        add_objects(objects, ttl)
+
+    cache.add_objects = recording_add_objects
+    return cache
+
+
+@pytest.mark.parametrize('max_workers', [1, 2])
+def test_selected_endpoints_and_workers(api, cache, make_session, max_workers):
+    session = make_session(cache)
+    report = CachePreloader(session, ('colors', 'subjects', 'lessons'), max_workers=max_workers).run()
+
+    assert report.objects == {'colors': 3, 'subjects': 2, 'lessons': 1}
+    assert report.errors == {}
+    assert set(report.timings) == {'colors', 'subjects', 'lessons', 'cache_write'}
+    assert api.hits.__len__() == 3
+    assert all(api.hits_for(path).__len__() == 1 for path in ('Colors', 'Subjects', 'Lessons'))
+    assert api.concurrency.peak == max_workers
+    assert cache.count_object() == 6
+
+
+def test_ttl_follows_class_expire(api, cache, make_session):
+    CachePreloader(make_session(cache), ('colors', 'lessons')).run()
+    assert cache.ttls == {SynergiaColor: timedelta(days=31), SynergiaLesson: timedelta(minutes=5)}
+
+
+def test_custom_endpoint(api, cache, make_session):
+    report = CachePreloader(make_session(cache), (PreloadEndpoint(('Subjects',), SynergiaSubject),)).run()
+    assert report.objects == {'Subjects': 2}
+    assert cache.get_object(2, SynergiaSubject).short_name == 'P2'
+
+
+def test_progress_and_errors(api, cache, make_session):
+    api.route('Subjects', {}, status=500)
+    calls = []
+    preloader = CachePreloader(make_session(cache), ('colors', 'subjects'), progress=lambda *args: calls.append(args))
+    report = preloader.run()
+
+    assert sorted(name for name, *_ in calls) == ['colors', 'subjects']
+    progress = {name: (count, timing, error) for name, count, timing, error in calls}
+    assert progress['colors'][0] == 3 and progress['colors'][1] > 0 and progress['colors'][2] is None
+    assert progress['subjects'][0] == 0 and progress['subjects'][1] is None
+    assert progress['subjects'][2] is report.errors['subjects']
+    assert cache.count_object() == 3
+
+
+def test_clear(api, cache, make_session):
+    session = make_session(cache)
+    cache.add_object(99, SynergiaColor, {'Id': 99, 'Name': 'Kolor 99', 'RGB': '000000'})
+
+    CachePreloader(session, ('colors',)).run()
+    assert cache.get_object(99, SynergiaColor) is not None
+
+    CachePreloader(session, ('colors',)).run(clear=True)
+    assert cache.get_object(99, SynergiaColor) is None
+    assert cache.count_object() == 3
@@ -0,0 +1,52 @@
+import logging
+import sys
+from datetime import datetime, timedelta
+
+sys.path.extend(['./'])
+
+import pytest
+
+from librus_tricks.cache import RedisCache
+from librus_tricks.classes import SynergiaSubject
+
+fakeredis = pytest.importorskip('fakeredis')
+
+logging.basicConfig(level=logging.DEBUG,
+                    format='%(asctime)s - %(levelname)s - %(module)s:%(lineno)d - %(funcName)s - %(message)s',
+                    filename='pytest.log')
+
+
+def subject(uid):
+    return {'Id': uid, 'Name': f'Przedmiot {uid}', 'No': uid, 'Short': 'p', 'IsExtracurricular': False,
+            'IsBlockLesson': False}
+
+
+def test_queries():
+    cache = RedisCache(fakeredis.FakeRedis())
+    loaded = datetime.now() - timedelta(minutes=5)
+    cache.add_query('Grades', {'Grades': ['ą']}, '1', last_load=loaded)
+    cached = cache.get_query('Grades', '1')
+    assert cached.response == {'Grades': ['ą']}
+    assert abs((cached.last_load - loaded).total_seconds()) < 0.01
+    assert cache.count_queries() == 1
+    cache.del_query('Grades', '1')
+    assert cache.get_query('Grades', '1') is None
+
+
+def test_native_ttl():
+    client = fakeredis.FakeRedis()
+    cache = RedisCache(client, ttl=timedelta(minutes=10))
+    cache.add_query('Grades', {}, '1')
+    assert 0 < client.pttl('librus:q:1:Grades') <= 600000
+
+
+def test_bulk_objects():
+    cache = RedisCache(fakeredis.FakeRedis())
+    cache.add_objects((uid, SynergiaSubject, subject(uid)) for uid in range(1, 2501))
+    found = cache.get_objects([1, 2, 2500, 9999], SynergiaSubject)
+    assert sorted(found) == ['1', '2', '2500']
+    assert found['2500'].name == 'Przedmiot 2500'
+    cache.del_object(1)
+    assert cache.get_object(1, SynergiaSubject) is None
+    cache.clear_objects()
+    assert cache.count_object() == 0
@@ -0,0 +1,71 @@
+import copy
+import logging
+import sys
+import weakref
+
+sys.path.extend(['./'])
+
+import pytest
+
+from librus_tricks import classes
+from librus_tricks.cache import MemoryCache, TieredCache
+from librus_tricks.exceptions import ResourceNotKept
+
+logging.basicConfig(level=logging.DEBUG,
+                    format='%(asctime)s - %(levelname)s - %(module)s:%(lineno)d - %(funcName)s - %(message)s',
+                    filename='pytest.log')
+
+ATTENDANCE = {
+    'Id': 1, 'Lesson': {'Id': 2}, 'Date': '2019-09-02', 'AddDate': '2019-09-02 08:00:00', 'LessonNo': 3,
+    'Type': {'Id': 4}, 'AddedBy': {'Id': 5}, 'Student': {'Id': 6},
+}
+
+
+def generic_classes():
+    return [
+        cls for cls in vars(classes).values()
+        if isinstance(cls, type) and issubclass(cls, classes.SynergiaGenericClass)
+    ]
+
+
+@pytest.mark.parametrize('cls', generic_classes())
+def test_no_instance_dict(cls):
+    assert '__dict__' not in dir(cls)
+
+
+def test_relations_are_inline():
+    attendance = classes.SynergiaAttendance.assembly(ATTENDANCE, 'session')
+    assert attendance.objects.return_id('type') == 4
+    assert attendance.objects.pending()['lesson'] == (2, classes.SynergiaLesson)
+    attendance.objects.set_value('type', 'resolved')
+    assert attendance.type == 'resolved'
+    assert 'type' not in attendance.objects.pending()
+    with pytest.raises(KeyError):
+        attendance.objects.return_id('missing')
+
+
+def test_copy_bind_and_weakref():
+    attendance = classes.SynergiaAttendance.assembly(ATTENDANCE, 'session')
+    attendance.objects.set_value('type', 'resolved')
+    assert weakref.ref(attendance)() is attendance
+    assert copy.copy(attendance).lesson_no == 3
+
+    bound = attendance.bind('other')
+    assert bound._session == 'other' and attendance._session == 'session'
+    assert bound.date == attendance.date
+    assert 'type' in bound.objects.pending()
+
+
+def test_resource_kept_only_on_request(monkeypatch):
+    attendance = classes.SynergiaAttendance.assembly(ATTENDANCE, 'session')
+    with pytest.raises(ResourceNotKept):
+        attendance.export_resource()
+    monkeypatch.setattr(classes.SynergiaAttendance, 'keep_resource', True)
+    assert classes.SynergiaAttendance.assembly(ATTENDANCE, 'session').export_resource() == ATTENDANCE
+
+
+def test_tiered_cache_promotes_objects():
+    cache = TieredCache(MemoryCache(), MemoryCache())
+    cache.l2.add_object(1, classes.SynergiaAttendance, ATTENDANCE)
+    assert cache.get_object(1, classes.SynergiaAttendance, session='session').lesson_no == 3
+    assert cache.l1.get_object(1, classes.SynergiaAttendance, session='session') is not None
@@ -0,0 +1,52 @@
+import io
+import logging
+import sys
+from datetime import datetime, timedelta
+
+sys.path.extend(['./'])
+
+import pytest
+
+from librus_tricks.cache import AlchemyCache, MemoryCache, RedisCache
+from librus_tricks.classes import SynergiaSubject
+from librus_tricks.codec import PayloadCompressor
+
+logging.basicConfig(level=logging.DEBUG,
+                    format='%(asctime)s - %(levelname)s - %(module)s:%(lineno)d - %(funcName)s - %(message)s',
+                    filename='pytest.log')
+
+SUBJECT = {'Id': 1, 'Name': 'Matematyka', 'No': 1, 'Short': 'mat', 'IsExtracurricular': False,
+           'IsBlockLesson': False}
+LOADED = datetime.now().replace(microsecond=0) - timedelta(minutes=3)
+
+
+def make_source():
+    cache = AlchemyCache(compression=PayloadCompressor(threshold=0))
+    cache.add_query('https://api.librus.pl/2.0/Subjects', {'Subjects': [SUBJECT]}, '1', last_load=LOADED)
+    cache.add_objects([(1, SynergiaSubject, SUBJECT, LOADED), (2, SynergiaSubject, dict(SUBJECT, Id=2))])
+    return cache
+
+
+@pytest.mark.parametrize('target', [
+    MemoryCache, AlchemyCache, lambda: RedisCache(pytest.importorskip('fakeredis').FakeRedis())
+])
+def test_round_trip(target):
+    snapshot = io.BytesIO()
+    assert tuple(make_source().export_snapshot(snapshot)) == (1, 2)
+
+    cache = target()
+    assert tuple(cache.import_snapshot(io.BytesIO(snapshot.getvalue()))) == (1, 2)
+    cached = cache.get_query('https://api.librus.pl/2.0/Subjects', '1')
+    assert cached.response == {'Subjects': [SUBJECT]}
+    assert cached.last_load == LOADED
+    assert cache.get_object(2, SynergiaSubject).uid == 2
+    assert sorted(str(cached_object.uid) for cached_object in cache.iter_objects()) == ['1', '2']
+
+
+def test_invalid_snapshot():
+    with pytest.raises(ValueError):
+        MemoryCache().import_snapshot(io.BytesIO(b'not a snapshot'))
+    snapshot = io.BytesIO()
+    make_source().export_snapshot(snapshot)
+    with pytest.raises(ValueError):
+        MemoryCache().import_snapshot(io.BytesIO(snapshot.getvalue()[:-8]))
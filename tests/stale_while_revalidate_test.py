@@ -0,0 +1,75 @@
+import logging
+import sys
+import time
+from datetime import timedelta
+
+sys.path.extend(['./'])
+
+import pytest
+
+from librus_tricks import SynergiaClient
+from librus_tricks.cache import StaleWhileRevalidate
+
+logging.basicConfig(level=logging.DEBUG,
+                    format='%(asctime)s - %(levelname)s - %(module)s:%(lineno)d - %(funcName)s - %(message)s',
+                    filename='pytest.log')
+
+DELAY = 0.3
+
+
+def lucky_number(value):
+    return {'LuckyNumber': {'LuckyNumber': value}}
+
+
+def wait_for_refresh(timeout=5):
+    deadline = time.monotonic() + timeout
+    while SynergiaClient.in_flight.__len__() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def session(stub_api, make_session):
+    stub_api.route('LuckyNumbers', lucky_number(7))
+    session = make_session()
+    session.get_cached_response('LuckyNumbers')
+    stub_api.route('LuckyNumbers', lucky_number(8))
+    stub_api.delay = DELAY
+    return session
+
+
+def test_stale_entry_is_returned_and_refreshed_once(stub_api, session):
+    policy = StaleWhileRevalidate(fresh=timedelta(0), max_age=timedelta(hours=1))
+    started = time.perf_counter()
+    stale = [session.get_cached_response('LuckyNumbers', max_lifetime=policy) for _ in range(5)]
+    assert time.perf_counter() - started < DELAY
+    assert stale == [lucky_number(7)] * 5
+
+    wait_for_refresh()
+    assert stub_api.hits.__len__() == 2
+    assert session.get_cached_response('LuckyNumbers') == lucky_number(8)
+    stats = session.stats.snapshot()['LuckyNumbers']
+    assert (stats['stale'], stats['refreshes']) == (5, 2)
+
+
+def test_too_old_entry_blocks(stub_api, session):
+    time.sleep(0.06)
+    started = time.perf_counter()
+    response = session.get_cached_response(
+        'LuckyNumbers', max_lifetime=StaleWhileRevalidate(fresh=timedelta(0), max_age=timedelta(milliseconds=50))
+    )
+    assert time.perf_counter() - started >= DELAY
+    assert response == lucky_number(8)
+    assert session.stats.snapshot()['LuckyNumbers']['stale'] == 0
+    assert stub_api.hits.__len__() == 2
+
+
+def test_failed_background_refresh(stub_api, session):
+    policy = StaleWhileRevalidate(fresh=timedelta(0), max_age=timedelta(hours=1))
+    stub_api.statuses.append(500)
+    assert session.get_cached_response('LuckyNumbers', max_lifetime=policy) == lucky_number(7)
+    wait_for_refresh()
+
+    assert session.get_cached_response('LuckyNumbers', max_lifetime=policy) == lucky_number(7)
+    wait_for_refresh()
+    assert session.get_cached_response('LuckyNumbers') == lucky_number(8)
+    assert stub_api.hits.__len__() == 3
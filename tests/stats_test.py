@@ -0,0 +1,54 @@
+import logging
+import sys
+
+sys.path.extend(['./'])
+
+from librus_tricks.cache import CacheStats, MemoryCache, endpoint_name
+
+logging.basicConfig(level=logging.DEBUG,
+                    format='%(asctime)s - %(levelname)s - %(module)s:%(lineno)d - %(funcName)s - %(message)s',
+                    filename='pytest.log')
+
+
+def test_endpoint_name():
+    assert endpoint_name('https://api.librus.pl/2.0/Users/1,2,') == 'Users'
+    assert endpoint_name('https://api.librus.pl/2.0/Timetables?weekStart=2021-01-04') == 'Timetables'
+    assert endpoint_name(('Grades', 'Categories', 5)) == 'Grades/Categories'
+
+
+def test_counters_and_histogram():
+    stats = CacheStats()
+    stats.add('Grades', 'hits', 3)
+    stats.add('Grades', 'misses')
+    stats.observe_fetch('Grades', 0.02, 100)
+    snapshot = stats.snapshot()
+    assert snapshot['Grades']['fetches'] == 1
+    assert snapshot['Grades']['bytes_fetched'] == 100
+    assert snapshot['Grades']['latency']['buckets'][0.025] == 1
+    assert stats.hit_ratio('Grades') == 0.75
+    stats.reset()
+    assert stats.totals()['hits'] == 0
+
+
+def test_memory_cache_stats():
+    cache = MemoryCache(max_entries=1)
+    cache.add_query('https://api.librus.pl/2.0/Grades', {}, '1')
+    cache.get_query('https://api.librus.pl/2.0/Grades', '1')
+    cache.add_query('https://api.librus.pl/2.0/Users', {}, '1')
+    cache.get_query('https://api.librus.pl/2.0/Grades', '1')
+    snapshot = cache.stats.snapshot()
+    assert snapshot['Grades']['hits'] == 1
+    assert snapshot['Grades']['misses'] == 1
+    assert snapshot['Grades']['evictions'] == 1
+    assert snapshot['Users']['bytes_stored'] > 0
+
+
+def test_session_stats(stub_api, make_session):
+    stub_api.route('LuckyNumbers', {'LuckyNumber': {'LuckyNumber': 7}})
+    session = make_session()
+    for _ in range(3):
+        assert session.get_cached_response('LuckyNumbers')['LuckyNumber']['LuckyNumber'] == 7
+    snapshot = session.stats.snapshot()['LuckyNumbers']
+    assert (snapshot['misses'], snapshot['hits'], snapshot['refreshes'], snapshot['fetches']) == (1, 2, 1, 1)
+    assert snapshot['bytes_fetched'] > 0
+    assert sum(snapshot['latency']['buckets'].values()) == 1
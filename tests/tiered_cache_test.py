@@ -0,0 +1,111 @@
+import logging
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.extend(['./'])
+
+import pytest
+
+from librus_tricks.cache import AlchemyCache, CacheBase, MemoryCache, TieredCache
+from librus_tricks.classes import SynergiaSubject
+from librus_tricks.exceptions import ResourceNotKept
+
+logging.basicConfig(level=logging.DEBUG,
+                    format='%(asctime)s - %(levelname)s - %(module)s:%(lineno)d - %(funcName)s - %(message)s',
+                    filename='pytest.log')
+
+SUBJECT = {'Id': 1, 'Name': 'Matematyka', 'No': 1, 'Short': 'mat', 'IsExtracurricular': False, 'IsBlockLesson': False}
+
+
+def test_write_through():
+    cache = TieredCache(AlchemyCache(), MemoryCache())
+    cache.add_query('Subjects', {'Subjects': []}, '1')
+    cache.add_object(1, SynergiaSubject, SUBJECT)
+    assert cache.l1.get_query('Subjects', '1') is not None
+    assert cache.l2.get_query('Subjects', '1') is not None
+    assert cache.l2.get_object(1, SynergiaSubject).name == 'Matematyka'
+
+
+def test_l1_fill_keeps_last_load():
+    shared = AlchemyCache()
+    loaded = datetime.now() - timedelta(hours=2)
+    shared.add_query('Colors', {'Colors': []}, '1', last_load=loaded)
+    cache = TieredCache(shared)
+    assert cache.l1.get_query('Colors', '1') is None
+    assert cache.get_query('Colors', '1').last_load == loaded
+    assert cache.l1.get_query('Colors', '1').last_load == loaded
+
+
+def test_object_fill_and_delete():
+    shared = AlchemyCache()
+    shared.add_object(1, SynergiaSubject, SUBJECT)
+    cache = TieredCache(shared)
+    assert cache.get_object(1, SynergiaSubject).name == 'Matematyka'
+    assert cache.l1.count_object() == 1
+    cache.del_object(1)
+    assert cache.get_object(1, SynergiaSubject) is None
+
+
+def test_l1_honours_write_ttl():
+    cache = TieredCache(AlchemyCache(), MemoryCache(ttl=timedelta(milliseconds=100)))
+    cache.add_query('Grades', {'Grades': []}, '1', ttl=timedelta(milliseconds=20))
+    cache.add_objects([(1, SynergiaSubject, SUBJECT)], ttl=timedelta(milliseconds=20))
+    cache.add_query('Colors', {'Colors': []}, '1', ttl=timedelta(days=31))
+    time.sleep(0.05)
+    assert cache.l1.get_query('Grades', '1') is None
+    assert cache.l1.get_object(1, SynergiaSubject) is None
+    assert cache.get_query('Grades', '1') is None
+    assert cache.l1.get_query('Colors', '1') is not None
+    time.sleep(0.1)
+    assert cache.l1.get_query('Colors', '1') is None
+    assert cache.l2.get_query('Colors', '1') is not None
+
+
+def test_keep_resources():
+    shared = AlchemyCache()
+    shared.add_object(1, SynergiaSubject, SUBJECT)
+    with pytest.raises(ResourceNotKept):
+        shared.get_object(1, SynergiaSubject).export_resource()
+    assert shared.keep_resources() is shared
+    assert shared.get_object(1, SynergiaSubject).export_resource() == SUBJECT
+    shared.keep_resources(False)
+    assert TieredCache(shared).l2.get_object(1, SynergiaSubject).export_resource() == SUBJECT
+
+
+
+class AssemblingCache(CacheBase):
+    """
+    Backend jak w przykładzie z dokumentacji, składa obiekty przez ``cls.assembly``.
+    """
+
+    def __init__(self):
+        self.objects = {}
+
+    def add_object(self, uid, cls, resource, last_load=None, ttl=None):
+        self.objects[str(uid), cls.__name__] = resource
+
+    def get_object(self, uid, cls, session=None):
+        resource = self.objects.get((str(uid), cls.__name__))
+        return None if resource is None else cls.assembly(resource, session)
+
+    def del_object(self, uid):
+        pass
+
+
+def test_custom_l2_without_resources():
+    shared = AssemblingCache()
+    shared.add_object(1, SynergiaSubject, SUBJECT)
+    cache = TieredCache(shared)
+    assert cache.get_object(1, SynergiaSubject).name == 'Matematyka'
+    assert cache.get_objects([1, 2], SynergiaSubject)['1'].name == 'Matematyka'
+    assert cache.l1.count_object() == 0
+
+
+def test_custom_l2_with_kept_resources(monkeypatch):
+    monkeypatch.setattr(SynergiaSubject, 'keep_resource', True)
+    shared = AssemblingCache()
+    shared.add_object(1, SynergiaSubject, SUBJECT)
+    cache = TieredCache(shared)
+    assert cache.get_object(1, SynergiaSubject).name == 'Matematyka'
+    assert cache.l1.get_object(1, SynergiaSubject).name == 'Matematyka'
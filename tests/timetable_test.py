@@ -0,0 +1,47 @@
+import logging
+import sys
+from datetime import date, datetime
+
+sys.path.extend(['./'])
+
+from librus_tricks import tools
+from librus_tricks.classes import SynergiaTimetable
+
+logging.basicConfig(level=logging.DEBUG,
+                    format='%(asctime)s - %(levelname)s - %(module)s:%(lineno)d - %(funcName)s - %(message)s',
+                    filename='pytest.log')
+
+
+def lesson(number, start, end):
+    return {'LessonNo': str(number), 'HourFrom': start, 'HourTo': end, 'IsCanceled': False,
+            'IsSubstitutionClass': False, 'Subject': {'Id': number, 'Name': f'Przedmiot {number}'},
+            'Teacher': {'Id': 1, 'FirstName': 'Jan', 'LastName': 'Kowalski'}}
+
+
+TIMETABLE = SynergiaTimetable.assembly({
+    '2019-09-02': [[lesson(1, '08:00', '08:45')], [lesson(2, '08:55', '09:40')], []],
+    '2019-09-03': [[], [lesson(3, '08:55', '09:40')]],
+}, None)
+
+
+def test_current_lesson():
+    assert TIMETABLE.current_lesson(datetime(2019, 9, 2, 8, 30)).lesson_no == 1
+    assert TIMETABLE.current_lesson(datetime(2019, 9, 2, 8, 50)) is None
+    assert TIMETABLE.current_lesson(datetime(2019, 9, 2, 7, 0)) is None
+
+
+def test_next_lesson():
+    assert TIMETABLE.next_lesson(datetime(2019, 9, 2, 8, 50)).lesson_no == 2
+    assert TIMETABLE.next_lesson(datetime(2019, 9, 2, 12, 0)).lesson_no == 3
+    assert TIMETABLE.next_lesson(datetime(2019, 9, 3, 12, 0)) is None
+
+
+def test_lessons_between():
+    lessons = TIMETABLE.lessons_between(datetime(2019, 9, 2, 8, 0), datetime(2019, 9, 3, 9, 0))
+    assert [event.lesson_no for event in lessons] == [1, 2, 3]
+    assert TIMETABLE.lessons_between(datetime(2019, 9, 2, 10, 0), datetime(2019, 9, 3, 8, 0)) == tuple()
+
+
+def test_actual_monday_default():
+    assert tools.get_actual_monday().weekday() == 0
+    assert tools.get_actual_monday(datetime(2019, 9, 5)) == date(2019, 9, 2)
@@ -0,0 +1,87 @@
+import logging
+import sys
+
+sys.path.extend(['./'])
+
+import pytest
+
+from librus_tricks import transport as transport_lib
+from librus_tricks.transport import SynergiaTransport
+
+logging.basicConfig(level=logging.DEBUG,
+                    format='%(asctime)s - %(levelname)s - %(module)s:%(lineno)d - %(funcName)s - %(message)s',
+                    filename='pytest.log')
+
+
+@pytest.fixture
+def grades(stub_api):
+    return stub_api.route('Grades', {'Grades': []})
+
+
+def test_sessions_share_adapter(grades, make_session):
+    transport = SynergiaTransport()
+    first = make_session(transport=transport)
+    second = make_session(user_id='2', transport=transport)
+    assert first.session.get_adapter(grades.url) is second.session.get_adapter(grades.url) is transport.adapter
+    assert first.session is not second.session
+    transport.close()
+
+
+def test_closing_session_keeps_pool_open(grades, make_session):
+    transport = SynergiaTransport()
+    first = make_session(transport=transport)
+    second = make_session(user_id='2', transport=transport)
+    first.get('Grades')
+    first.session.close()
+    assert transport.adapter.poolmanager.pools.__len__() == 1
+    assert second.get('Grades') == {'Grades': []}
+    assert grades.hits_for('Grades').__len__() == 2
+    assert not transport.closed
+
+    transport.close()
+    assert transport.closed
+    assert transport.adapter.poolmanager.pools.__len__() == 0
+
+
+def test_pool_sizing():
+    transport = SynergiaTransport(pool_connections=3, max_connections_per_host=5, block=True)
+    assert transport.adapter._pool_connections == 3
+    assert transport.adapter._pool_maxsize == 5
+    assert transport.adapter._pool_block is True
+    assert 'with 5 connections per host' in repr(transport)
+
+    pool = transport.adapter.poolmanager.connection_from_url('https://api.librus.pl/2.0/')
+    assert pool.pool.maxsize == 5
+    assert pool.block is True
+    transport.close()
+
+
+def test_keep_alive_disabled():
+    transport = SynergiaTransport(keep_alive=False)
+    assert transport.new_session().headers['Connection'] == 'close'
+    transport.close()
+
+
+def test_http2_sessions_share_transport(grades, make_session):
+    httpx = pytest.importorskip('httpx')
+    pytest.importorskip('h2')
+    transport = SynergiaTransport(http2=True, max_connections_per_host=4)
+    first = make_session(transport=transport)
+    second = make_session(user_id='2', transport=transport)
+    assert isinstance(first.session, httpx.Client)
+    assert first.get('Grades') == {'Grades': []}
+    first.session.close()
+    assert second.get('Grades') == {'Grades': []}
+    assert grades.hits_for('Grades').__len__() == 2
+    transport.close()
+
+
+def test_default_transport_is_not_closed_by_sessions():
+    default = transport_lib.get_default_transport()
+    default.close()
+    assert not default.closed
+    assert transport_lib.get_default_transport() is default
+
+    transport_lib.close_default_transport()
+    assert default.closed
+    assert transport_lib.get_default_transport() is not default
@@ -0,0 +1,191 @@
+"""
+Porównanie przepustowości backendów cache.
+
+    python tools/cache_benchmark.py [liczba_wpisów]
+    python tools/cache_benchmark.py --threads [liczba_operacji]
+    python tools/cache_benchmark.py --latency [liczba_operacji]
+    python tools/cache_benchmark.py --objects [liczba_obiektów]
+    python tools/cache_benchmark.py --memory [liczba_obiektów]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+sys.path.extend(['./'])
+
+from librus_tricks import codec
+from librus_tricks.cache import AlchemyCache, MemoryCache
+from librus_tricks.classes import SynergiaAttendance, SynergiaGrade
+
+RESPONSE = {'Grades': [
+    {'Id': grade_id, 'Grade': '5', 'Lesson': {'Id': 1}, 'Subject': {'Id': 2}, 'Category': {'Id': 3},
+     'AddedBy': {'Id': 4}, 'Date': '2019-09-02', 'AddDate': '2019-09-02 08:00:00', 'Semester': 1,
+     'IsConstituent': True, 'IsSemester': False, 'IsSemesterProposition': False, 'IsFinal': False,
+     'IsFinalProposition': False}
+    for grade_id in range(20)
+]}
+
+
+def measure(operation, count):
+    started = time.perf_counter()
+    for number in range(count):
+        operation(number)
+    return count / (time.perf_counter() - started)
+
+
+def run(count):
+    backends = {
+        'MemoryCache': MemoryCache(max_entries=count * 2),
+        'AlchemyCache (sqlite :memory:)': AlchemyCache(),
+    }
+    print(f'{"backend":<32} {"add_query/s":>14} {"get_query/s":>14} {"get_query miss/s":>18}')
+    for name, cache in backends.items():
+        add = measure(lambda number: cache.add_query(f'https://api.librus.pl/2.0/Grades/{number}', RESPONSE, '1'),
+                      count)
+        get = measure(lambda number: cache.get_query(f'https://api.librus.pl/2.0/Grades/{number}', '1'), count)
+        miss = measure(lambda number: cache.get_query(f'https://api.librus.pl/2.0/Missing/{number}', '1'), count)
+        print(f'{name:<32} {add:>14,.0f} {get:>14,.0f} {miss:>18,.0f}')
+
+
+def measure_threads(cache, threads, count):
+    """
+    Mieszane obciążenie (9 odczytów na 1 zapis) rozłożone na ``threads`` wątków.
+    """
+    for number in range(100):
+        cache.add_query(f'https://api.librus.pl/2.0/Grades/{number}', RESPONSE, '1')
+
+    def work(thread_no):
+        for number in range(count // threads):
+            uri = f'https://api.librus.pl/2.0/Grades/{(thread_no * 7 + number) % 100}'
+            if number % 10 == 0:
+                cache.add_query(uri, RESPONSE, '1')
+            else:
+                cache.get_query(uri, '1')
+
+    workers = [threading.Thread(target=work, args=(thread_no,)) for thread_no in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return count / (time.perf_counter() - started)
+
+
+def run_threads(count):
+    directory = tempfile.mkdtemp()
+    backends = {
+        'AlchemyCache (sqlite :memory:)': lambda: AlchemyCache(),
+        'AlchemyCache (sqlite file)': lambda: AlchemyCache(f'sqlite:///{os.path.join(directory, "cache.sqlite")}'),
+    }
+    thread_counts = (1, 2, 4, 8)
+    print(f'{"backend":<32}' + ''.join(f'{f"{threads} thr ops/s":>16}' for threads in thread_counts))
+    for name, factory in backends.items():
+        results = []
+        for threads in thread_counts:
+            cache = factory()
+            results.append(measure_threads(cache, threads, count))
+            cache.clear_queries()
+            cache.dispose()
+        print(f'{name:<32}' + ''.join(f'{result:>16,.0f}' for result in results))
+
+
+def percentile(samples, fraction):
+    samples = sorted(samples)
+    return samples[min(samples.__len__() - 1, int(samples.__len__() * fraction))]
+
+
+def measure_latency(cache, count):
+    writes, reads = [], []
+    for number in range(count):
+        uri = f'https://api.librus.pl/2.0/Grades/{number}'
+        started = time.perf_counter()
+        cache.add_query(uri, RESPONSE, '1')
+        writes.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        cache.get_query(uri, '1')
+        reads.append(time.perf_counter() - started)
+    return writes, reads
+
+
+def run_latency(count):
+    directory = tempfile.mkdtemp()
+    backends = {
+        'AlchemyCache (sqlite :memory:)': lambda: AlchemyCache(),
+        'AlchemyCache (sqlite file)': lambda: AlchemyCache(f'sqlite:///{os.path.join(directory, "default.sqlite")}'),
+        'AlchemyCache.on_disk': lambda: AlchemyCache.on_disk(os.path.join(directory, 'on_disk.sqlite')),
+    }
+    print(f'{"backend":<32} {"write p50":>10} {"write p99":>10} {"read p50":>10} {"read p99":>10}')
+    for name, factory in backends.items():
+        writes, reads = measure_latency(factory(), count)
+        print(f'{name:<32}' + ''.join(
+            f' {percentile(samples, fraction) * 1000:>8.3f}ms'
+            for samples in (writes, reads) for fraction in (0.5, 0.99)
+        ))
+
+
+def measure_objects(cache, count, sessions):
+    cache.add_objects(
+        (number, SynergiaGrade, dict(RESPONSE['Grades'][0], Id=number, Student={'Id': 5})) for number in range(count)
+    )
+    for session in sessions:
+        for number in range(count):
+            cache.get_object(number, SynergiaGrade, session=session)
+    started = time.perf_counter()
+    for session in sessions:
+        for number in range(count):
+            cache.get_object(number, SynergiaGrade, session=session)
+    return (time.perf_counter() - started) / (count * sessions.__len__())
+
+
+def run_objects(count):
+    backends = {
+        'MemoryCache': lambda: MemoryCache(max_entries=count * 2),
+        'AlchemyCache (sqlite :memory:)': lambda: AlchemyCache(),
+    }
+    # Obiekty sesji są tu tylko znacznikami, get_object nie wykonuje zapytań http
+    one_session, two_sessions = (object(),), (object(), object())
+    print(f'{"backend":<32} {"assembly":>10} {"kept":>10} {"kept, 2 sessions":>18}')
+    for name, factory in backends.items():
+        results = (
+            measure_objects(factory(), count, one_session),
+            measure_objects(factory().keep_instances(count), count, one_session),
+            measure_objects(factory().keep_instances(count), count, two_sessions),
+        )
+        print(f'{name:<32}' + ''.join(f' {result * 1e6:>8.1f}us' for result in results[:2]) +
+              f' {results[2] * 1e6:>16.1f}us')
+
+
+def run_memory(count):
+    payloads = [codec.dumpb({
+        'Id': number, 'Lesson': {'Id': number % 500}, 'Trip': None, 'Date': '2019-09-02',
+        'AddDate': '2019-09-02 08:00:00', 'LessonNo': number % 9, 'Semester': 1, 'Type': {'Id': number % 4},
+        'AddedBy': {'Id': number % 60}, 'Student': {'Id': number % 30},
+    }) for number in range(count)]
+    session = object()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    attendances = [SynergiaAttendance.assembly(codec.loads(payload), session) for payload in payloads]
+    used = sum(stat.size_diff for stat in tracemalloc.take_snapshot().compare_to(before, 'filename'))
+    tracemalloc.stop()
+    print(f'{attendances.__len__()} SynergiaAttendance: {used / 2 ** 20:.1f} MiB, '
+          f'{used / attendances.__len__():.0f} B per object')
+
+
+if __name__ == '__main__':
+    if '--memory' in sys.argv:
+        sys.argv.remove('--memory')
+        run_memory(int(sys.argv[1]) if sys.argv.__len__() > 1 else 100000)
+    elif '--objects' in sys.argv:
+        sys.argv.remove('--objects')
+        run_objects(int(sys.argv[1]) if sys.argv.__len__() > 1 else 2000)
+    elif '--latency' in sys.argv:
+        sys.argv.remove('--latency')
+        run_latency(int(sys.argv[1]) if sys.argv.__len__() > 1 else 2000)
+    elif '--threads' in sys.argv:
+        sys.argv.remove('--threads')
+        run_threads(int(sys.argv[1]) if sys.argv.__len__() > 1 else 4000)
+    else:
+        run(int(sys.argv[1]) if sys.argv.__len__() > 1 else 5000)